@@ -0,0 +1,83 @@
+"""
+Focus switch latency with and without the timer daemon.
+
+- cold CLI: `tomatempo focus task N` with no daemon (in-process execution)
+- daemon CLI: the same command while a daemon is running
+- daemon client: the socket round trip alone, from an already running process
+
+Usage: PYTHONPATH=src python benchmarks/bench_daemon.py [--runs N]
+(run from the repository root)
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from tomatempo.client import DaemonUnavailable, request
+
+
+def cli(env: dict[str, str], *args: str) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "tomatempo", *args], env=env, check=True, capture_output=True
+    )
+
+
+def time_ms(fn, runs: int) -> float:
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def wait_for(path: Path, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            request(path, "daemon.ping", timeout=1)
+            return
+        except DaemonUnavailable:
+            time.sleep(0.05)
+    raise RuntimeError("daemon did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ttbench") as tmp:
+        sock = Path(tmp) / "daemon.sock"
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(sys.path),
+            "XDG_STATE_HOME": f"{tmp}/state",
+            "XDG_CACHE_HOME": f"{tmp}/cache",
+            "XDG_CONFIG_HOME": f"{tmp}/config",
+            "APP_DAEMON_SOCKET": str(sock),
+        }
+
+        cold = time_ms(lambda i: cli(env, "focus", "task", str(i)), args.runs)
+
+        daemon = subprocess.Popen([sys.executable, "-m", "tomatempo", "daemon", "run"], env=env)
+        try:
+            wait_for(sock)
+            warm = time_ms(lambda i: cli(env, "focus", "task", str(i)), args.runs)
+            hot = time_ms(lambda i: request(sock, "focus.set", {"task_id": i}), args.runs * 50)
+        finally:
+            request(sock, "daemon.stop")
+            daemon.wait()
+
+    print(f"   cold CLI (in-process): {cold:8.2f} ms")
+    print(f"   daemon CLI:            {warm:8.2f} ms")
+    print(f"   daemon client:         {hot:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
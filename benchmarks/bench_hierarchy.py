@@ -0,0 +1,125 @@
+"""
+Hierarchy reads over a synthetic tree: `project show --deep` built from the
+closure table in one query (hierarchy.tree) against walking it a level at a
+time (queries per node for its children and totals, the N+1 pattern), and "all tasks under a project"
+from the closure against the join chain through the parent columns. Also
+times moving a deliverable, which re-links its subtree.
+
+Usage: PYTHONPATH=src python benchmarks/bench_hierarchy.py [--projects N] [--fanout N] [--repeat N]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from functools import partial
+
+from sqlalchemy import Connection, text
+
+from tomatempo.db import dispose_engines, get_engine
+from tomatempo.hierarchy import LEVELS, TreeNode, descendants, move, tree
+from tomatempo.rollups import TomatoRules, get_counts
+from tomatempo.settings import Settings
+
+_CHILDREN = {
+    kind: text(f"SELECT id, name, status FROM {table} WHERE {column} = :id ORDER BY id")
+    for kind, (table, _, column) in LEVELS.items()
+    if column
+}
+_CHILD_KIND = {"project": "initiative", "initiative": "deliverable", "deliverable": "task"}
+
+_TASKS_BY_JOINS = text("""
+SELECT t.id FROM tasks t
+JOIN deliverables d ON d.id = t.deliverable_id
+JOIN initiatives i ON i.id = d.initiative_id
+WHERE i.project_id = :id
+ORDER BY t.id
+""")
+
+
+def populate(conn: Connection, projects: int, fanout: int) -> int:
+    ids = iter(range(1, 10**9))
+    rows: dict[str, list[dict[str, object]]] = {kind: [] for kind in LEVELS}
+    parents: list[int] = []
+    for _ in range(projects):
+        parents.append(next(ids))
+        rows["project"].append({"id": parents[-1], "parent": None})
+    for kind in ("initiative", "deliverable", "task"):
+        children = []
+        for parent in parents:
+            for _ in range(fanout):
+                children.append(next(ids))
+                rows[kind].append({"id": children[-1], "parent": parent})
+        parents = children
+    for kind, (table, _, column) in LEVELS.items():
+        columns = f"id, {column}" if column else "id"
+        values = ":id, :parent" if column else ":id"
+        conn.execute(
+            text(
+                f"INSERT INTO {table} ({columns}, name, status)"
+                f" VALUES ({values}, 'n' || :id, 'active')"
+            ),
+            rows[kind],
+        )
+    return len(rows["task"])
+
+
+def walk(conn: Connection, kind: str, entity_id: int, name: str = "", status: str = "") -> TreeNode:
+    """The tree a query per node, like lazy-loaded relationships would build it."""
+    totals = get_counts(conn, (kind, entity_id))
+    node = TreeNode(kind, entity_id, name, status, totals.seconds, totals.tomatoes)
+    if kind in _CHILD_KIND:
+        for child_id, child_name, child_status in conn.execute(
+            _CHILDREN[_CHILD_KIND[kind]], {"id": entity_id}
+        ):
+            node.children.append(walk(conn, _CHILD_KIND[kind], child_id, child_name, child_status))
+    return node
+
+
+def median_ms(func: Callable[[], object], repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return statistics.median(runs) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--fanout", type=int, default=17, help="children per node")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        engine = get_engine(Settings(database_url=f"sqlite:///{d}/hierarchy.db"))
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            tasks = populate(conn, args.projects, args.fanout)
+        elapsed = time.perf_counter() - started
+        print(f"inserted {tasks:,} tasks (closure kept by triggers) in {elapsed:.1f}s")
+
+        with engine.connect() as conn:
+            closure = median_ms(partial(tree, conn, "project", 1), args.repeat)
+            n_plus_1 = median_ms(partial(walk, conn, "project", 1), args.repeat)
+            print(f"project show --deep: closure {closure:>8.2f} ms  per-level {n_plus_1:>8.2f} ms")
+            closure = median_ms(partial(descendants, conn, "project", 1), args.repeat)
+            joins = median_ms(lambda: conn.execute(_TASKS_BY_JOINS, {"id": 1}).all(), args.repeat)
+            print(f"tasks under project: closure {closure:>8.2f} ms  joins     {joins:>8.2f} ms")
+
+        # The first deliverable, back and forth between the first two initiatives
+        deliverable = args.projects + args.projects * args.fanout + 1
+        runs = []
+        with engine.begin() as conn:
+            for i in range(args.repeat):
+                started = time.perf_counter()
+                move(conn, TomatoRules(), "deliverable", deliverable, args.projects + 2 - i % 2)
+                runs.append(time.perf_counter() - started)
+        print(f"move a deliverable:  {statistics.median(runs) * 1000:>8.2f} ms")
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
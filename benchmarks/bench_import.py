@@ -0,0 +1,68 @@
+"""
+Bulk import throughput: import_file against inserting the same slices one
+transaction at a time through insert_slices (what replaying the history
+through the timer would do).
+
+Usage: PYTHONPATH=src python benchmarks/bench_import.py [--rows N] [--batch-size N]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from tomatempo.db import dispose_engines, get_engine
+from tomatempo.imports import import_file
+from tomatempo.rollups import TomatoRules
+from tomatempo.settings import Settings
+from tomatempo.slices import insert_slices
+from tomatempo.timer import ClosedSlice
+
+T0 = 1_600_000_000
+
+
+def write_history(path: Path, rows: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            start = T0 + i * 1800
+            f.write(json.dumps({"task_id": i % 50 or None, "start": start, "end": start + 1500}))
+            f.write("\n")
+
+
+def per_slice(settings: Settings, rows: int) -> float:
+    rules = TomatoRules()
+    engine = get_engine(settings)
+    started = time.perf_counter()
+    for i in range(rows):
+        start = T0 + i * 1800
+        with engine.begin() as conn:
+            insert_slices(conn, [ClosedSlice(i % 50 or None, start, start + 1500)], rules)
+    return rows / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        history = Path(d) / "history.jsonl"
+        write_history(history, args.rows)
+
+        sample = min(args.rows, 5_000)
+        slow = per_slice(Settings(database_url=f"sqlite:///{d}/per-slice.db"), sample)
+        print(f"per-slice insert: {slow:>10,.0f} rows/s  ({sample:,} rows)")
+
+        settings = Settings(database_url=f"sqlite:///{d}/bulk.db")
+        result = import_file(history, settings=settings, batch_size=args.batch_size)
+        print(
+            f"     import_file: {result.rows_per_sec:>10,.0f} rows/s  ({result.inserted:,} rows,"
+            f" {result.rows_per_sec / slow:.0f}x)"
+        )
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Timer persistence: appending events to the journal (group-committed fsync
+and fsync per event) against rewriting state.json after every event (as
+save_state does, and with an fsync to make it durable), then recovery time:
+load_state against replaying the journal.
+
+Events alternate focus switches on a running timer, each closing a slice.
+
+Usage: PYTHONPATH=src python benchmarks/bench_journal.py [--events N] [--sync-every N]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from tomatempo.journal import TimerJournal
+from tomatempo.timer import TimerService, TimerState, load_state, save_state
+
+T0 = 1_700_000_000
+
+# What persists each event: (command, args, UTC seconds, resulting state)
+Save = Callable[[str, dict[str, Any], int, TimerState], object]
+
+
+def commands(n: int) -> list[tuple[str, dict[str, Any]]]:
+    return [("timer.start", {"duration": 1500})] + [
+        ("focus.set", {"task_id": i % 20 or None}) for i in range(n - 1)
+    ]
+
+
+def persist(n: int, save: Save) -> float:
+    now = [T0]
+    service = TimerService(clock=lambda: now[0])
+    started = time.perf_counter()
+    for cmd, args in commands(n):
+        now[0] += 1
+        service.call(cmd, args)
+        save(cmd, args, now[0], service.state)
+    return n / (time.perf_counter() - started)
+
+
+def save_json(path: Path, fsync: bool) -> Save:
+    def save(cmd: str, args: dict[str, Any], utc: int, state: TimerState) -> None:
+        if not fsync:
+            save_state(path, state)
+            return
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state.to_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    return save
+
+
+def best_ms(func: Callable[[], object], repeat: int = 5) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return min(runs) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=2_000)
+    parser.add_argument("--sync-every", type=int, default=32)
+    args = parser.parse_args()
+    n = args.events
+
+    with tempfile.TemporaryDirectory() as d:
+        state_file = Path(d) / "state.json"
+        rates = {
+            "state.json": persist(n, save_json(state_file, fsync=False)),
+            "state.json+fsync": persist(n, save_json(state_file, fsync=True)),
+        }
+        for label, sync_every in [("journal", args.sync_every), ("journal, fsync each", 1)]:
+            journal_file = Path(d) / f"{sync_every}.journal"
+            # No compaction: recovery below replays all the events
+            journal = TimerJournal(
+                journal_file,
+                Path(d) / f"{sync_every}.json",
+                sync_every=sync_every,
+                compact_bytes=1 << 40,
+            )
+            journal.recover()
+            rates[label] = persist(n, journal.append)
+            journal.close()
+
+        for label, rate in rates.items():
+            print(f"{label:>20}: {rate:>10,.0f} events/s")
+
+        def recover() -> None:
+            journal = TimerJournal(Path(d) / f"{args.sync_every}.journal", Path(d) / "r.json")
+            journal.recover()
+            journal.close()
+
+        print(f"{'load_state':>20}: {best_ms(lambda: load_state(state_file)):>10.3f} ms")
+        print(f"{'journal recover':>20}: {best_ms(recover):>10.3f} ms  ({n:,} events)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Throughput of JSONFormatter in its default and compiled modes.
+
+Usage: PYTHONPATH=src python benchmarks/bench_json_formatter.py [--records N]
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from tomatempo.logs import JSONFormatter
+
+FMT_KEYS = {
+    "level": "levelname",
+    "message": "message",
+    "timestamp": "timestamp",
+    "logger": "name",
+    "module": "module",
+    "function": "funcName",
+    "line": "lineno",
+    "thread_name": "threadName",
+}
+
+
+def make_records(n: int) -> list[logging.LogRecord]:
+    """Records a few microseconds apart, half of them with extra fields."""
+    start = time.time()
+    records = []
+    for i in range(n):
+        record = logging.LogRecord(
+            "tomatempo.timer", logging.DEBUG, __file__, i, "tick %d", (i,), None
+        )
+        record.created = start + i * 1e-5
+        if i % 2:
+            record.task_id = i
+        records.append(record)
+    return records
+
+
+class LegacyJSONFormatter(JSONFormatter):
+    """The formatter as it was before the compiled mode: json.dumps per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(self._prepare_log_dict(record), default=str)
+
+
+def records_per_sec(formatter: JSONFormatter, records: list[logging.LogRecord]) -> float:
+    fmt = formatter.format
+    start = time.perf_counter()
+    for record in records:
+        fmt(record)
+    return len(records) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200_000)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    cases = {
+        "legacy": LegacyJSONFormatter(fmt_keys=FMT_KEYS),
+        "default": JSONFormatter(fmt_keys=FMT_KEYS),
+        "compiled": JSONFormatter(fmt_keys=FMT_KEYS, compiled=True),
+        "compiled+auto": JSONFormatter(fmt_keys=FMT_KEYS, compiled=True, json_backend="auto"),
+    }
+
+    baseline = None
+    for name, formatter in cases.items():
+        rate = records_per_sec(formatter, records)
+        baseline = baseline or rate
+        print(f"{name:>14}: {rate:>12,.0f} records/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
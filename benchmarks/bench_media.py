@@ -0,0 +1,62 @@
+"""
+Media ingestion: a batch of JPEG screenshots with EXIF, attached one at a
+time on the main thread against MediaStore.ingest in a process pool, then
+the same batch again (deduplicated by hash, nothing copied).
+
+Usage: PYTHONPATH=src python benchmarks/bench_media.py [--files N] [--size-kb N] [--workers N]
+"""
+
+import argparse
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+
+from tomatempo import media
+from tomatempo.media import MediaStore, ingest_file
+
+
+def fake_jpeg(path: Path, size: int, seed: int) -> None:
+    exif = b"Exif\x00\x00" + bytes(4000)
+    body = os.urandom(size) + seed.to_bytes(4, "big")
+    with open(path, "wb") as f:
+        f.write(b"\xff\xd8\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif)
+        f.write(b"\xff\xda\x00\x04\x01\x02" + body + b"\xff\xd9")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--size-kb", type=int, default=4096)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    media.POOL_MIN_BYTES = 0  # always use the pool in the batch case
+
+    with tempfile.TemporaryDirectory() as d:
+        sources = [Path(d) / f"shot{i}.jpg" for i in range(args.files)]
+        for i, path in enumerate(sources):
+            fake_jpeg(path, args.size_kb * 1024, i)
+        total_mb = args.files * args.size_kb / 1024
+
+        def report(label: str, seconds: float) -> None:
+            print(f"{label:>22}: {seconds * 1000:>9.1f} ms  {total_mb / seconds:>8,.0f} MB/s")
+
+        started = time.perf_counter()
+        for path in sources:
+            ingest_file(path, Path(d) / "serial")
+        report("one at a time", time.perf_counter() - started)
+
+        store = MediaStore(Path(d) / "pool", workers=args.workers)
+        started = time.perf_counter()
+        store.ingest(sources)
+        report(f"pool ({args.workers} workers)", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        again = store.ingest(sources)
+        assert all(m.stored == "existing" for m in again)
+        report("again (deduplicated)", time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
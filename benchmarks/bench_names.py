@@ -0,0 +1,94 @@
+"""
+Name resolution over a synthetic backlog: loading the saved index (what a
+command or a tab-completion pays when nothing changed), exact, fuzzy and
+prefix lookups on it, against scanning every task name from the database
+per lookup. Also times a full rebuild, paid once after names change.
+
+Usage: PYTHONPATH=src python benchmarks/bench_names.py [--tasks N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from functools import partial
+
+from sqlalchemy import Connection, text
+
+from tomatempo.db import dispose_engines, get_engine
+from tomatempo.names import INDEX_FILE, NameIndex, fold, get_index
+from tomatempo.settings import Settings
+
+WORDS = [
+    "read", "write", "review", "draft", "outline", "extract", "quotes", "notes", "chapter",
+    "revisão", "bibliografia", "plan", "meeting", "email", "slides", "figure", "table",
+    "analysis", "data", "defence", "proof", "lemma", "appendix", "index", "summary",
+]  # fmt: skip
+
+
+def task_names(n: int, rng: random.Random) -> list[str]:
+    return [f"{' '.join(rng.sample(WORDS, rng.randrange(2, 5)))} {i}" for i in range(n)]
+
+
+def scan(conn: Connection, name: str) -> list[int]:
+    """Resolving without the index: every name from the database, folded."""
+    wanted = fold(name)
+    rows = conn.execute(text("SELECT id, name FROM tasks"))
+    return [task_id for task_id, task_name in rows if fold(task_name) == wanted]
+
+
+def median_ms(func: Callable[[], object], repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return statistics.median(runs) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        os.environ["XDG_CACHE_HOME"] = f"{d}/cache"  # the index goes to cache_dir
+        settings = Settings(database_url=f"sqlite:///{d}/names.db")
+        engine = get_engine(settings)
+        names = task_names(args.tasks, random.Random(1))
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO tasks (name, status) VALUES (:name, 'todo')"),
+                [{"name": name} for name in names],
+            )
+
+        started = time.perf_counter()
+        index = get_index(settings)
+        rebuild = time.perf_counter() - started
+        size = (settings.cache_dir / INDEX_FILE).stat().st_size
+        print(f"{args.tasks:,} tasks: rebuild {rebuild * 1000:.0f} ms, index {size / 1e6:.1f} MB")
+
+        target = names[args.tasks // 2]
+        fresh = median_ms(partial(get_index, settings), args.repeat)
+        load = median_ms(partial(NameIndex.load, settings.cache_dir / INDEX_FILE), args.repeat)
+        print(f"index up to date: {fresh:>8.2f} ms  (loading it {load:.2f} ms)")
+        typo = target[:-3].replace("e", "", 1)  # a misspelled start: no prefix matches
+        cases: list[tuple[str, Callable[[], object]]] = [
+            ("exact", partial(index.lookup, "task", target)),
+            ("fuzzy", partial(index.matches, "task", typo)),
+            ("prefix (completion)", partial(index.complete, "task", target[:8])),
+            ("fuzzy (completion)", partial(index.complete, "task", "~" + typo)),
+        ]
+        with engine.connect() as conn:
+            cases.append(("scan (no index)", partial(scan, conn, target)))
+            for label, func in cases:
+                print(f"{label:>20}: {median_ms(func, args.repeat):>8.2f} ms")
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
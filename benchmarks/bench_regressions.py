@@ -0,0 +1,186 @@
+"""
+Regression check for the hot paths: JSONFormatter.format (plain, with extras,
+with exc_info), Settings() (environment only and with a .env file),
+setup_logging and `tomatempo --help` wall time.
+
+Each case is timed as the best of --repeat runs, in seconds per operation,
+and compared with a baseline JSON file. A case slower than the baseline by
+more than --threshold (0.25 = 25%) is a regression and makes the script
+exit with status 1. Baselines depend on the machine: record one with --save
+on the machine that runs the check.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_regressions.py [--save] [--threshold 0.25]
+        [--baseline benchmarks/baseline.json] [--repeat 5] [--only formatter]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+
+from tomatempo.logs import JSONFormatter, _stop_listener, setup_logging
+from tomatempo.settings import Settings
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+FMT_KEYS = {
+    "level": "levelname",
+    "message": "message",
+    "timestamp": "timestamp",
+    "logger": "name",
+    "module": "module",
+    "function": "funcName",
+    "line": "lineno",
+    "thread_name": "threadName",
+}
+
+
+def best_of(func: Callable[[], object], repeat: int, number: int | None = None) -> float:
+    """Best seconds per call over `repeat` runs of `number` calls (auto-sized)."""
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def formatter_cases(repeat: int) -> dict[str, float]:
+    formatter = JSONFormatter(fmt_keys=FMT_KEYS, compiled=True)
+    plain = logging.LogRecord("tomatempo.timer", logging.INFO, __file__, 1, "tick %d", (1,), None)
+    extras = logging.makeLogRecord({**plain.__dict__, "task_id": 7, "elapsed": 12.5})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        exc_info = sys.exc_info()
+    with_exc = logging.LogRecord(
+        "tomatempo.timer", logging.ERROR, __file__, 1, "failed", None, exc_info
+    )
+
+    def fmt(record: logging.LogRecord) -> Callable[[], str]:
+        def run() -> str:
+            record.exc_text = None  # Formatter caches the traceback text
+            return formatter.format(record)
+
+        return run
+
+    return {
+        "formatter.plain": best_of(fmt(plain), repeat),
+        "formatter.extras": best_of(fmt(extras), repeat),
+        "formatter.exc_info": best_of(fmt(with_exc), repeat),
+    }
+
+
+def settings_cases(repeat: int) -> dict[str, float]:
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as d:
+        os.chdir(d)
+        try:
+            results["settings.env"] = best_of(Settings, repeat)
+            Path(d, ".env").write_text("APP_ENVIRONMENT=test\nAPP_LOG_LEVEL=DEBUG\n")
+            results["settings.dotenv"] = best_of(Settings, repeat)
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def logging_cases(repeat: int) -> dict[str, float]:
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    with tempfile.TemporaryDirectory() as d:
+        settings = Settings(app_name="tomatempo-bench")
+        # logs_dir is a cached property: point it at the temp dir
+        settings.__dict__["logs_dir"] = Path(d)
+        try:
+            seconds = best_of(lambda: setup_logging(settings), repeat, number=10)
+        finally:
+            _stop_listener()
+            for handler in root.handlers[:]:
+                root.removeHandler(handler)
+                handler.close()
+            root.handlers[:] = handlers
+            root.setLevel(level)
+    return {"setup_logging": seconds}
+
+
+def cli_cases(repeat: int) -> dict[str, float]:
+    env = {**os.environ, "PYTHONPATH": str(Path(__file__).parents[1] / "src")}
+    argv = [sys.executable, "-m", "tomatempo", "--help"]
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, env=env, check=True, capture_output=True)
+        runs.append(time.perf_counter() - start)
+    return {"cli.help": min(runs)}
+
+
+GROUPS: dict[str, Callable[[int], dict[str, float]]] = {
+    "formatter": formatter_cases,
+    "settings": settings_cases,
+    "logging": logging_cases,
+    "cli": cli_cases,
+}
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    """Print one line per case; returns the cases slower than the threshold allows."""
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            verdict = "new"
+        else:
+            ratio = seconds / base
+            verdict = f"{ratio:.2f}x"
+            if ratio > 1 + threshold:
+                verdict += "  REGRESSION"
+                regressions.append(name)
+        print(f"{name:>20}: {seconds * 1e6:>12,.1f} us  {verdict}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", choices=sorted(GROUPS), action="append")
+    parser.add_argument("--save", action="store_true", help="Write the results as the baseline.")
+    args = parser.parse_args()
+
+    results: dict[str, float] = {}
+    for name in args.only or GROUPS:
+        results.update(GROUPS[name](args.repeat))
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressions = compare(results, stored.get("results", {}), args.threshold)
+
+    if args.save:
+        merged = {**stored.get("results", {}), **results}
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": merged,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        print(f"saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regressions beyond {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Note search latency over a synthetic corpus: the FTS5 index (search with
+notes_fts) against the LIKE fallback used without it, for a common word, a
+rare word, two words, a prefix and an entity-type scope.
+
+Usage: PYTHONPATH=src python benchmarks/bench_search.py [--notes N] [--repeat N]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from functools import partial
+
+from sqlalchemy import text
+
+from tomatempo import search
+from tomatempo.db import dispose_engines, get_engine
+from tomatempo.search import search as search_notes
+from tomatempo.settings import Settings
+
+VOCABULARY = [f"w{i}" for i in range(5_000)]
+QUERIES: list[tuple[str, str | None]] = [
+    ("w3", None),  # common
+    ("w4321", None),  # rare
+    ("w7 w12", None),
+    ("w49*", None),
+    ("w3", "task"),
+]
+
+
+def corpus(n: int, rng: random.Random) -> list[dict[str, object]]:
+    # Zipf-like: low word numbers are much more frequent
+    weights = [1 / (i + 1) for i in range(len(VOCABULARY))]
+    kinds = ["project", "initiative", "deliverable", "task", "task", "task"]
+    return [
+        {
+            "entity_type": rng.choice(kinds),
+            "entity_id": rng.randrange(1, 1_000),
+            "body": " ".join(rng.choices(VOCABULARY, weights, k=rng.randrange(20, 120))),
+            "tags": ",".join(rng.sample(VOCABULARY[:50], 2)),
+            "ts": i,
+        }
+        for i in range(n)
+    ]
+
+
+def median_ms(func: Callable[[], object], repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return statistics.median(runs) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        engine = get_engine(Settings(database_url=f"sqlite:///{d}/search.db"))
+        rows = corpus(args.notes, random.Random(1))
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO notes (entity_type, entity_id, body, tags, pinned,"
+                    " created_ts, updated_ts)"
+                    " VALUES (:entity_type, :entity_id, :body, :tags, 0, :ts, :ts)"
+                ),
+                rows,
+            )
+        print(f"inserted and indexed {args.notes:,} notes in {time.perf_counter() - started:.1f}s")
+
+        has_index = search.has_index
+        with engine.connect() as conn:
+            for query, scope in QUERIES:
+                run = partial(search_notes, conn, query, scope)
+                search.has_index = has_index
+                fts = median_ms(run, args.repeat)
+                hits = len(run())
+                search.has_index = lambda conn: False
+                like = median_ms(run, args.repeat)
+                label = query + (f" --on {scope}" if scope else "")
+                print(f"{label:>16}: fts {fts:>8.2f} ms  like {like:>8.2f} ms  ({hits} hits)")
+        search.has_index = has_index
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
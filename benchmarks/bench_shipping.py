@@ -0,0 +1,73 @@
+"""
+Cost of emitting a record to the file handler and to ShipHandler, with the
+collector up and down. The emitting thread only formats and buffers, so the
+shipping numbers should stay close to the formatter's cost either way.
+
+Usage: PYTHONPATH=src python benchmarks/bench_shipping.py [--records N]
+"""
+
+import argparse
+import logging
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from tomatempo.logs import JSONFormatter
+from tomatempo.shipping import ShipHandler
+
+
+def drain(sock: socket.socket) -> None:
+    try:
+        conn, _ = sock.accept()
+        with conn:
+            while conn.recv(1 << 20):
+                pass
+    except OSError:
+        pass
+
+
+def per_record_us(handler: logging.Handler, records: list[logging.LogRecord]) -> float:
+    start = time.perf_counter()
+    for record in records:
+        handler.handle(record)
+    return (time.perf_counter() - start) / len(records) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+
+    records = [
+        logging.LogRecord("tomatempo.watch", logging.DEBUG, __file__, i, "tick %d", (i,), None)
+        for i in range(args.records)
+    ]
+    formatter = JSONFormatter(fmt_keys={"message": "message", "logger": "name"}, compiled=True)
+
+    with tempfile.TemporaryDirectory(prefix="tt") as d:
+        spill = Path(d) / "log.jsonl"
+        collector = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        collector.bind(f"{d}/up.sock")
+        collector.listen()
+        threading.Thread(target=drain, args=(collector,), daemon=True).start()
+
+        handlers: dict[str, logging.Handler] = {
+            "file": logging.FileHandler(Path(d) / "file.jsonl"),
+            "ship, collector up": ShipHandler(f"unix:{d}/up.sock", spill, buffer_size=args.records),
+            "ship, collector down": ShipHandler(
+                f"unix:{d}/down.sock", spill, buffer_size=args.records
+            ),
+        }
+        for name, handler in handlers.items():
+            handler.setFormatter(formatter)
+            cost = per_record_us(handler, records)
+            handler.close()
+            extra = handler.metrics() if isinstance(handler, ShipHandler) else ""
+            print(f"{name:>21}: {cost:6.2f} us/record {extra}")
+        collector.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Per-task totals over a large slices table: ORM objects vs. columnar arrays.
+
+- orm: session.exec(select(Slice)).all(), then sum in Python
+- columnar: query_columns() + totals_by_task()
+
+Reports wall time and peak traced memory for each.
+
+Usage: PYTHONPATH=src python benchmarks/bench_slices.py [--slices N]
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from sqlalchemy import Engine
+from sqlmodel import Session, select
+
+from tomatempo.db import get_engine
+from tomatempo.models import Slice
+from tomatempo.settings import Settings
+from tomatempo.slices import query_columns, totals_by_task
+
+
+def populate(engine: Engine, n: int) -> None:
+    rows = (
+        (None if i % 10 == 0 else i % 500, i * 60, i * 60 + 45, "break" if i % 7 == 0 else "work")
+        for i in range(n)
+    )
+    with engine.begin() as conn:
+        cursor = conn.connection.driver_connection.cursor()  # type: ignore[union-attr]
+        cursor.executemany(
+            "INSERT INTO slices (task_id, start_ts, end_ts, type, origin) VALUES (?, ?, ?, ?, 'auto')",
+            rows,
+        )
+
+
+def orm_totals(engine: Engine) -> dict[int | None, int]:
+    totals: dict[int | None, int] = {}
+    with Session(engine) as session:
+        for row in session.exec(select(Slice)).all():
+            if row.type == "work":
+                totals[row.task_id] = totals.get(row.task_id, 0) + row.end_ts - row.start_ts
+    return totals
+
+
+def columnar_totals(engine: Engine) -> dict[int | None, int]:
+    with engine.connect() as conn:
+        return totals_by_task(query_columns(conn))
+
+
+def measure(fn: Callable[[Engine], dict[int | None, int]], engine: Engine) -> tuple[float, float]:
+    start = time.perf_counter()
+    fn(engine)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slices", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ttbench") as d:
+        engine = get_engine(Settings(database_url=f"sqlite:///{Path(d) / 'bench.db'}"))
+        populate(engine, args.slices)
+
+        assert orm_totals(engine) == columnar_totals(engine)
+        for name, fn in (("orm", orm_totals), ("columnar", columnar_totals)):
+            elapsed, peak = measure(fn, engine)
+            print(f"{name:>9}: {elapsed:8.2f} s  peak {peak:8.1f} MiB")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Slice inserts under each SQLite PRAGMA profile (see SQLITE_PROFILES).
+
+- per commit: one transaction per slice, like the timer closing slices
+- batched: all slices in a single transaction, like an import
+
+Usage: PYTHONPATH=src python benchmarks/bench_sqlite_profiles.py [--slices N]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import Engine, text
+
+from tomatempo.db import build_engine
+from tomatempo.settings import SQLITE_PROFILES
+
+SCHEMA = """
+CREATE TABLE slices (
+    id INTEGER PRIMARY KEY,
+    task_id INTEGER,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    type TEXT NOT NULL
+)
+"""
+INSERT = text(
+    "INSERT INTO slices (task_id, start_ts, end_ts, type) VALUES (:task_id, :start, :end, 'work')"
+)
+
+
+def rows(n: int) -> list[dict[str, int]]:
+    return [{"task_id": i % 50, "start": i * 60, "end": i * 60 + 59} for i in range(n)]
+
+
+def per_commit(engine: Engine, data: list[dict[str, int]]) -> None:
+    for row in data:
+        with engine.begin() as conn:
+            conn.execute(INSERT, row)
+
+
+def batched(engine: Engine, data: list[dict[str, int]]) -> None:
+    with engine.begin() as conn:
+        conn.execute(INSERT, data)
+
+
+def slices_per_sec(profile: str, fn, data: list[dict[str, int]], tmp: Path) -> float:
+    path = tmp / f"{profile}-{fn.__name__}.db"
+    engine = build_engine(f"sqlite:///{path}", SQLITE_PROFILES[profile])
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA))
+    start = time.perf_counter()
+    fn(engine, data)
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return len(data) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slices", type=int, default=2_000)
+    parser.add_argument("--batched-slices", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ttbench") as d:
+        tmp = Path(d)
+        for fn, n in ((per_commit, args.slices), (batched, args.batched_slices)):
+            data = rows(n)
+            for profile in SQLITE_PROFILES:
+                rate = slices_per_sec(profile, fn, data, tmp)
+                print(f"{fn.__name__:>10} {profile:>9}: {rate:>12,.0f} slices/s")
+
+
+if __name__ == "__main__":
+    main()
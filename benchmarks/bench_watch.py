@@ -0,0 +1,70 @@
+"""
+CPU cost of a `view progress --watch` session while nothing changes.
+
+- naive: run the progress query and repaint the whole screen every tick
+- incremental: watch() (data_version check, changed lines only)
+
+Reports CPU time as a share of the session's wall time, and the number of
+characters written to the terminal.
+
+Usage: PYTHONPATH=src python benchmarks/bench_watch.py [--tasks N] [--ticks N] [--interval S]
+"""
+
+import argparse
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import Connection, Engine
+
+from tomatempo.db import get_engine
+from tomatempo.rollups import TomatoRules
+from tomatempo.settings import Settings
+from tomatempo.slices import insert_slices
+from tomatempo.timer import ClosedSlice
+from tomatempo.watch import CLEAR_SCREEN, LineRenderer, ProgressDashboard, Ticker, watch
+
+
+def populate(engine: Engine, tasks: int) -> None:
+    slices = [ClosedSlice(i % tasks, i * 60, i * 60 + 45) for i in range(tasks * 20)]
+    with engine.begin() as conn:
+        insert_slices(conn, slices, TomatoRules())
+
+
+def naive(conn: Connection, stream: io.StringIO, ticker: Ticker, ticks: int) -> None:
+    dashboard = ProgressDashboard(conn)
+    for _ in range(ticks):
+        dashboard.refresh()
+        stream.write(CLEAR_SCREEN + "\n".join(dashboard.lines(time.time())))
+        ticker.wait()
+
+
+def incremental(conn: Connection, stream: io.StringIO, ticker: Ticker, ticks: int) -> None:
+    watch(ProgressDashboard(conn), LineRenderer(stream), ticker, max_ticks=ticks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ttbench") as d:
+        engine = get_engine(Settings(database_url=f"sqlite:///{Path(d) / 'bench.db'}"))
+        populate(engine, args.tasks)
+
+        for name, fn in (("naive", naive), ("incremental", incremental)):
+            stream = io.StringIO()
+            with engine.connect() as conn:
+                wall, cpu = time.perf_counter(), time.process_time()
+                fn(conn, stream, Ticker(args.interval), args.ticks)
+                wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            chars = len(stream.getvalue())
+            print(f"{name:>11}: cpu {100 * cpu / wall:5.1f}%  wrote {chars:>10,} chars")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
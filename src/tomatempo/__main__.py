@@ -0,0 +1,3 @@
+from tomatempo.cli import app
+
+app(prog_name="tomatempo")
@@ -1,11 +1,137 @@
+"""
+Typer entry point.
+
+Commands are registered lazily in COMMANDS: their modules (and whatever they
+import, like settings, the database or yaml) are only loaded when the command
+runs. `--help`, `--version` and shell completion work from the registry alone.
+"""
+
+import importlib
+from functools import cached_property
+from typing import Annotated, Any, NamedTuple
+
+import click
 import typer
+from typer.core import TyperGroup
+
+from tomatempo import __version__, instrument
+from tomatempo.instrument import span
+
+
+class LazySpec(NamedTuple):
+    target: str  # "package.module:attribute", a Typer app or click command
+    help: str
+
+
+COMMANDS: dict[str, LazySpec] = {
+    "assign": LazySpec("tomatempo.commands.pool:assign_app", "Assign Time Pool minutes to a task."),
+    "daemon": LazySpec("tomatempo.commands.daemon:app", "Run the timer daemon."),
+    "deliverable": LazySpec(
+        "tomatempo.commands.hierarchy:deliverable_app", "Show or move deliverables."
+    ),
+    "events": LazySpec("tomatempo.commands.events:app", "Print or follow change events."),
+    "export": LazySpec("tomatempo.commands.export:app", "Export slices as CSV or JSON."),
+    "focus": LazySpec("tomatempo.commands.focus:app", "Focus a task or the Time Pool."),
+    "hello": LazySpec("tomatempo.commands.hello:app", "Greet someone by name."),
+    "import": LazySpec(
+        "tomatempo.commands.imports:app", "Import slices from an export or Toggl CSV."
+    ),
+    "index": LazySpec("tomatempo.commands.index:app", "Rebuild search and hierarchy indexes."),
+    "initiative": LazySpec("tomatempo.commands.hierarchy:initiative_app", "Show initiatives."),
+    "logs": LazySpec("tomatempo.commands.logs:app", "Search the JSON logs."),
+    "note": LazySpec("tomatempo.commands.notes:app", "Add and search notes."),
+    "project": LazySpec("tomatempo.commands.hierarchy:project_app", "Show projects."),
+    "reassign": LazySpec(
+        "tomatempo.commands.pool:reassign_app", "Move minutes from one task to another."
+    ),
+    "rollup": LazySpec("tomatempo.commands.rollup:app", "Rebuild or check tomato rollups."),
+    "task": LazySpec("tomatempo.commands.hierarchy:task_app", "Move tasks."),
+    "timer": LazySpec("tomatempo.commands.timer:app", "Start, pause and stop the timer."),
+    "view": LazySpec("tomatempo.commands.view:app", "Show dashboards, optionally live."),
+}
+
+
+_COMPLETION_PARAMS = {"install_completion", "show_completion"}
+
+
+class LazyCommand(click.Command):
+    """
+    Stand-in for a registered command. Name and help come from the registry;
+    the real command is imported the first time a context is made for it.
+    """
+
+    def __init__(self, name: str, spec: LazySpec):
+        super().__init__(name, help=spec.help, short_help=spec.help)
+        self.target = spec.target
+
+    @cached_property
+    def command(self) -> click.Command:
+        module_name, attr = self.target.split(":")
+        with span(f"import {self.name}"):
+            obj = getattr(importlib.import_module(module_name), attr)
+        if isinstance(obj, typer.Typer):
+            obj = typer.main.get_command(obj)
+            # Completion is installed from the root app, not per command
+            obj.params = [p for p in obj.params if p.name not in _COMPLETION_PARAMS]
+        return obj
+
+    def make_context(
+        self,
+        info_name: str | None,
+        args: list[str],
+        parent: click.Context | None = None,
+        **extra: Any,
+    ) -> click.Context:
+        return self.command.make_context(info_name, args, parent=parent, **extra)
+
+    def invoke(self, ctx: click.Context) -> Any:
+        return self.command.invoke(ctx)
+
+
+class LazyGroup(TyperGroup):
+    """TyperGroup that adds the lazy COMMANDS next to the eagerly defined ones."""
+
+    def __init__(self, **attrs: Any):
+        super().__init__(**attrs)
+        for name, spec in COMMANDS.items():
+            self.commands.setdefault(name, LazyCommand(name, spec))
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted(self.commands)
+
+
+app = typer.Typer(cls=LazyGroup, no_args_is_help=True)
+
+
+def _print_version(value: bool) -> None:
+    if value:
+        typer.echo(f"tomatempo {__version__}")
+        raise typer.Exit()
+
 
-app = typer.Typer()
+@app.callback()
+def main(
+    ctx: typer.Context,
+    version: Annotated[
+        bool,
+        typer.Option("--version", callback=_print_version, is_eager=True, help="Show version."),
+    ] = False,
+    profile: Annotated[
+        bool, typer.Option("--profile", help="Print time spent per phase on exit.")
+    ] = False,
+):
+    """A Pomodoro based application for time management."""
+    if profile:
+        instrument.enable()
+        # Closed with the context, once the subcommand has run
+        command = span(f"command {ctx.invoked_subcommand}")
+        command.__enter__()
 
+        def report() -> None:
+            command.__exit__(None, None, None)
+            typer.echo(instrument.summary(), err=True)
 
-@app.command()
-def main(name: str):
-    print(f"Hello, {name}")
+        ctx.call_on_close(report)
 
 
 if __name__ == "__main__":
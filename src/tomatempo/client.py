@@ -0,0 +1,122 @@
+"""
+Thin client for the timer commands.
+
+`execute` sends the command to a running daemon and, when there is none,
+runs it in-process against the state file instead. The fast path guesses
+the socket path without building Settings; before running in-process, the
+socket the daemon would use (from Settings, .env included) is tried too.
+Once a request reached a daemon it is never retried in-process: a lost
+answer is reported, not executed twice.
+"""
+
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Any
+
+DEFAULT_TIMEOUT = 5.0
+
+
+class DaemonUnavailable(ConnectionError):
+    """No daemon is listening on the socket."""
+
+
+class CommandError(RuntimeError):
+    """The command ran and was rejected (e.g. pausing a stopped timer)."""
+
+
+class DaemonError(CommandError):
+    """The request was sent but the daemon didn't answer it."""
+
+
+def default_socket_path() -> Path:
+    """
+    Daemon socket as the daemon resolves it with default settings, or
+    APP_DAEMON_SOCKET from the environment. Other overrides (.env, app_name)
+    are picked up by execute() before it falls back to in-process.
+    """
+    if path := os.environ.get("APP_DAEMON_SOCKET"):
+        return Path(path)
+
+    from platformdirs import user_state_dir
+
+    return Path(user_state_dir("tomatempo", "André Carvalho", roaming=True)) / "daemon.sock"
+
+
+def request(
+    path: Path, cmd: str, args: dict[str, Any] | None = None, timeout: float = DEFAULT_TIMEOUT
+) -> dict[str, Any]:
+    """Send one request to the daemon and return its raw response."""
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonUnavailable("Unix domain sockets are not available")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(path))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonUnavailable(str(e)) from e
+        except OSError as e:
+            raise DaemonError(f"can't reach the daemon: {e}") from e
+
+        try:
+            sock.sendall(json.dumps({"cmd": cmd, "args": args or {}}).encode() + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        except OSError as e:  # TimeoutError included
+            raise DaemonError(f"no answer from the daemon: {e}") from e
+
+    if not line:
+        raise DaemonError("daemon closed the connection without answering")
+    try:
+        return json.loads(line)  # type: ignore[no-any-return]
+    except json.JSONDecodeError as e:
+        raise DaemonError(f"invalid answer from the daemon: {e}") from e
+
+
+def execute(cmd: str, **args: Any) -> dict[str, Any]:
+    """Run a timer command through the daemon, or in-process without one."""
+    path = default_socket_path()
+    try:
+        response = request(path, cmd, args)
+    except DaemonUnavailable:
+        response = execute_in_process(cmd, args, tried=path)
+
+    if not response["ok"]:
+        raise CommandError(response["error"])
+    return response["result"]
+
+
+def execute_in_process(cmd: str, args: dict[str, Any], tried: Path | None = None) -> dict[str, Any]:
+    """
+    Cold path: load settings and state, run the command, save the state.
+    A daemon listening where Settings puts it (but not on `tried`) still
+    gets the command.
+    """
+    from tomatempo.daemon import (
+        handle_request,
+        journal_path,
+        record_slice,
+        socket_path,
+        state_path,
+    )
+    from tomatempo.events import EventFeed
+    from tomatempo.journal import fold
+    from tomatempo.settings import get_settings
+    from tomatempo.timer import TimerService, save_state
+
+    settings = get_settings()
+    if (path := socket_path(settings)) != tried:
+        try:
+            return request(path, cmd, args)
+        except DaemonUnavailable:
+            pass
+
+    state_file = state_path(settings)
+    service = TimerService(state=fold(journal_path(settings), state_file), on_close=record_slice)
+    response = handle_request(service, {"cmd": cmd, "args": args})
+    if response["ok"] and cmd != "timer.status":
+        save_state(state_file, service.state)
+        EventFeed.from_settings(settings).publish(cmd, **response["result"])
+    return response
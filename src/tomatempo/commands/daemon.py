@@ -0,0 +1,87 @@
+import subprocess
+import sys
+import time
+
+import typer
+
+from tomatempo.client import DaemonError, DaemonUnavailable, default_socket_path, request
+
+app = typer.Typer(no_args_is_help=True)
+
+
+def _request(cmd: str, timeout: float = 1) -> int | None:
+    """Pid of the daemon answering `cmd`, None when there is no daemon."""
+    try:
+        return request(default_socket_path(), cmd, timeout=timeout)["result"]["pid"]
+    except DaemonUnavailable:
+        return None
+    except DaemonError as e:
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
+
+
+def _ping() -> int | None:
+    return _request("daemon.ping")
+
+
+@app.command()
+def run():
+    """Run the daemon in the foreground."""
+    from tomatempo.daemon import run as run_daemon
+    from tomatempo.settings import get_settings
+
+    try:
+        run_daemon(get_settings())
+    except RuntimeError as e:
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
+
+
+@app.command()
+def start(
+    wait: float = typer.Option(5.0, help="Seconds to wait for the daemon to come up."),
+):
+    """Start the daemon in the background."""
+    if (pid := _ping()) is not None:
+        typer.echo(f"daemon already running (pid {pid})")
+        return
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "tomatempo", "daemon", "run"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if (pid := _ping()) is not None:
+            typer.echo(f"daemon started (pid {pid})")
+            return
+        if (code := process.poll()) is not None:
+            typer.echo(
+                f"error: daemon exited with code {code}; run `tomatempo daemon run` to see why",
+                err=True,
+            )
+            raise typer.Exit(1)
+        time.sleep(0.05)
+
+    typer.echo("error: daemon did not start", err=True)
+    raise typer.Exit(1)
+
+
+@app.command()
+def stop():
+    """Stop the daemon; the timer state is handed back to in-process execution."""
+    if (pid := _request("daemon.stop", timeout=5)) is None:
+        typer.echo("daemon not running")
+        return
+    typer.echo(f"daemon stopped (pid {pid})")
+
+
+@app.command()
+def status():
+    """Show whether the daemon is running."""
+    pid = _ping()
+    typer.echo(f"daemon running (pid {pid})" if pid is not None else "daemon not running")
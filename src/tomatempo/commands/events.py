@@ -0,0 +1,24 @@
+import json
+from typing import Annotated
+
+import typer
+
+from tomatempo.events import EventFeed
+
+app = typer.Typer()
+
+
+@app.command("events")
+def events_cmd(
+    follow: Annotated[
+        bool, typer.Option("--follow", "-f", help="Keep printing new events until Ctrl-C.")
+    ] = False,
+):
+    """Print change events as JSON Lines."""
+    feed = EventFeed.from_settings()
+    events = feed.follow() if follow else iter(feed.read())
+    try:
+        for event in events:
+            typer.echo(json.dumps(event, separators=(",", ":")))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,49 @@
+from pathlib import Path
+from typing import Annotated, get_args
+
+import click
+import typer
+from sqlalchemy.exc import OperationalError
+
+from tomatempo.db import get_engine
+from tomatempo.exports import Compression, ExportError, ExportFormat, export
+from tomatempo.ranges import parse_range
+from tomatempo.settings import get_settings
+
+app = typer.Typer()
+
+
+@app.command("export")
+def export_cmd(
+    range_: Annotated[
+        str | None, typer.Option("--range", help="e.g. this-week or 2025-01-01..2025-03-31.")
+    ] = None,
+    fmt: Annotated[
+        str, typer.Option("--format", click_type=click.Choice(get_args(ExportFormat)))
+    ] = "csv",
+    out: Annotated[Path | None, typer.Option(help="Output file; stdout if omitted.")] = None,
+    compress: Annotated[
+        str | None,
+        typer.Option(
+            click_type=click.Choice(get_args(Compression)),
+            help="Defaults to the --out suffix (.gz, .zst).",
+        ),
+    ] = None,
+):
+    """Export slices as CSV, JSON or JSON Lines."""
+    settings = get_settings()
+    start = end = None
+    if range_ is not None:
+        try:
+            start, end = parse_range(range_, week_start=settings.week_start)
+        except ValueError as e:
+            raise typer.BadParameter(str(e)) from e
+
+    try:
+        with get_engine(settings, read_only=True).connect() as conn:
+            rows = export(conn, out, fmt, start, end, compress)  # type: ignore[arg-type]
+    except (ExportError, OperationalError, OSError) as e:  # OSError: e.g. no --out dir
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
+    if out is not None:
+        typer.echo(f"exported {rows} slices to {out}", err=True)
@@ -0,0 +1,27 @@
+from typing import Annotated
+
+import typer
+
+from tomatempo.commands.timer import run
+from tomatempo.names import EntityRef
+
+app = typer.Typer(no_args_is_help=True)
+
+
+@app.command()
+def task(
+    task_id: Annotated[
+        int,
+        typer.Argument(
+            click_type=EntityRef("task"), metavar="TASK", help='Id, "exact name" or ~fuzzy name.'
+        ),
+    ],
+):
+    """Focus a task; a running timer switches to it without losing time."""
+    run("focus.set", task_id=task_id)
+
+
+@app.command()
+def clear():
+    """Clear the focus; timer minutes go to the Time Pool."""
+    run("focus.set", task_id=None)
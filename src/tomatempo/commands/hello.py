@@ -0,0 +1,9 @@
+import typer
+
+app = typer.Typer()
+
+
+@app.command()
+def hello(name: str):
+    """Greet someone by name."""
+    print(f"Hello, {name}")
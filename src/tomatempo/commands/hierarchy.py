@@ -0,0 +1,114 @@
+from typing import Annotated
+
+import typer
+
+from tomatempo.db import get_engine
+from tomatempo.events import EventFeed
+from tomatempo.hierarchy import LEVELS, HierarchyError, TreeNode, move, tree
+from tomatempo.names import EntityRef
+from tomatempo.rollups import TomatoRules
+from tomatempo.watch import format_seconds
+
+project_app = typer.Typer(no_args_is_help=True)
+initiative_app = typer.Typer(no_args_is_help=True)
+deliverable_app = typer.Typer(no_args_is_help=True)
+task_app = typer.Typer(no_args_is_help=True)
+
+DeepOption = Annotated[bool, typer.Option("--deep", help="Down to the tasks, not just children.")]
+
+
+def ref(
+    kind: str, *, option: str | None = None, help: str = 'Id, "exact name" or ~fuzzy name.'
+) -> typer.models.ParameterInfo:
+    """An argument (or option) naming a `kind` entity, converted to its id."""
+    if option:
+        return typer.Option(option, click_type=EntityRef(kind), metavar=kind.upper(), help=help)
+    return typer.Argument(click_type=EntityRef(kind), metavar=kind.upper(), help=help)
+
+
+def format_tree(node: TreeNode, indent: int = 0) -> list[str]:
+    line = (
+        f"{'  ' * indent}{node.kind} {node.id} {node.name} [{node.status}]"
+        f"  {format_seconds(node.seconds)}  {node.tomatoes} tomatoes"
+    )
+    return [line, *(row for child in node.children for row in format_tree(child, indent + 1))]
+
+
+def _show(kind: str, entity_id: int, deep: bool) -> None:
+    try:
+        with get_engine().connect() as conn:
+            root = tree(conn, kind, entity_id, depth=3 if deep else 1)
+    except HierarchyError as e:
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
+    typer.echo("\n".join(format_tree(root)))
+
+
+def _move(kind: str, entity_id: int, parent_id: int | None) -> None:
+    try:
+        with get_engine().begin() as conn:
+            move(conn, TomatoRules.from_settings(), kind, entity_id, parent_id)
+    except HierarchyError as e:
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
+    EventFeed.from_settings().publish(
+        "hierarchy.moved", entity_type=kind, entity_id=entity_id, parent_id=parent_id
+    )
+    parent = LEVELS[kind][1]
+    target = f"no {parent}" if parent_id is None else f"{parent} {parent_id}"
+    typer.echo(f"moved {kind} {entity_id} to {target}")
+
+
+# Callbacks keep single commands as subcommands: a one-command Typer collapses
+@project_app.callback()
+def project_cmd():
+    """Show projects."""
+
+
+@initiative_app.callback()
+def initiative_cmd():
+    """Show initiatives."""
+
+
+@task_app.callback()
+def task_cmd():
+    """Organize tasks."""
+
+
+@project_app.command("show")
+def project_show(project_id: Annotated[int, ref("project")], deep: DeepOption = False):
+    """Show a project with its totals and initiatives."""
+    _show("project", project_id, deep)
+
+
+@initiative_app.command("show")
+def initiative_show(initiative_id: Annotated[int, ref("initiative")], deep: DeepOption = False):
+    """Show an initiative with its totals and deliverables."""
+    _show("initiative", initiative_id, deep)
+
+
+@deliverable_app.command("show")
+def deliverable_show(deliverable_id: Annotated[int, ref("deliverable")], deep: DeepOption = False):
+    """Show a deliverable with its totals and tasks."""
+    _show("deliverable", deliverable_id, deep)
+
+
+@deliverable_app.command("move")
+def deliverable_move(
+    deliverable_id: Annotated[int, ref("deliverable")],
+    initiative_id: Annotated[int, ref("initiative", option="--to", help="The new initiative.")],
+):
+    """Move a deliverable, with its tasks, to another initiative."""
+    _move("deliverable", deliverable_id, initiative_id)
+
+
+@task_app.command("move")
+def task_move(
+    task_id: Annotated[int, ref("task")],
+    deliverable_id: Annotated[
+        int | None,
+        ref("deliverable", option="--to", help="The new deliverable; omit to detach the task."),
+    ] = None,
+):
+    """Move a task to another deliverable."""
+    _move("task", task_id, deliverable_id)
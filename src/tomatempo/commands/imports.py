@@ -0,0 +1,55 @@
+from pathlib import Path
+from typing import Annotated, get_args
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import click
+import typer
+from sqlalchemy.exc import OperationalError
+
+from tomatempo.imports import BATCH_SIZE, ImportFileError, ImportFormat, import_file
+
+app = typer.Typer()
+
+
+@app.command("import")
+def import_cmd(
+    file: Annotated[Path, typer.Argument(exists=True, dir_okay=False, help="CSV or JSON Lines.")],
+    fmt: Annotated[
+        str | None,
+        typer.Option(
+            "--format",
+            click_type=click.Choice(get_args(ImportFormat)),
+            help="Detected from the file when omitted.",
+        ),
+    ] = None,
+    tz: Annotated[
+        str | None,
+        typer.Option(help="Time zone of timestamps without an offset, e.g. Europe/Lisbon."),
+    ] = None,
+    batch_size: Annotated[int, typer.Option(min=1, help="Rows per transaction.")] = BATCH_SIZE,
+):
+    """Import slices from a tomatempo export or a Toggl CSV; resumes if interrupted."""
+    zone = None
+    if tz is not None:
+        try:
+            zone = ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError) as e:
+            raise typer.BadParameter(f"unknown time zone {tz!r}", param_hint="--tz") from e
+
+    try:
+        result = import_file(file, fmt, zone, batch_size=batch_size)  # type: ignore[arg-type]
+    except (ImportFileError, OperationalError, UnicodeDecodeError) as e:
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
+
+    if result.already_done:
+        typer.echo(f"{file} was already imported ({result.inserted} slices)")
+        return
+    for error in result.errors:
+        typer.echo(f"skipped {error}", err=True)
+    if result.resumed_at:
+        typer.echo(f"resumed after record {result.resumed_at}", err=True)
+    typer.echo(
+        f"imported {result.inserted} slices ({result.skipped} skipped) from {file}"
+        f" in {result.seconds:.1f}s, {result.rows_per_sec:,.0f} rows/s"
+    )
@@ -0,0 +1,28 @@
+import typer
+
+from tomatempo import hierarchy
+from tomatempo.db import get_engine
+from tomatempo.search import create_index, has_index, rebuild
+
+app = typer.Typer(no_args_is_help=True)
+
+
+@app.callback()
+def index_cmd():
+    """Rebuild search and hierarchy indexes."""
+    # A callback keeps `rebuild` a subcommand: a one-command Typer collapses
+
+
+@app.command("rebuild")
+def rebuild_cmd():
+    """Rebuild the notes search index and the hierarchy closure."""
+    engine = get_engine()
+    with engine.begin() as conn:
+        links = hierarchy.rebuild(conn)
+    typer.echo(f"rebuilt the hierarchy ({links} links)")
+    with engine.begin() as conn:
+        if not has_index(conn) and not create_index(conn):
+            typer.echo("no search index on this database (needs SQLite with FTS5)", err=True)
+            raise typer.Exit(1)
+        notes = rebuild(conn)
+    typer.echo(f"rebuilt the search index ({notes} notes)")
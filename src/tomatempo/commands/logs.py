@@ -0,0 +1,45 @@
+import json
+from typing import Annotated
+
+import click
+import typer
+
+from tomatempo.logs import LOG_FILE
+from tomatempo.logstore import LogQuery, parse_since, query
+from tomatempo.settings import get_settings
+
+app = typer.Typer(no_args_is_help=True)
+
+_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+
+@app.callback()
+def logs_cmd():
+    """Search the JSON logs."""
+    # A callback keeps `query` a subcommand: a one-command Typer collapses
+
+
+@app.command("query")
+def query_cmd(
+    since: Annotated[
+        str | None, typer.Option(help="e.g. 1h, 30m or 2025-01-31T10:00 (local time).")
+    ] = None,
+    level: Annotated[
+        str | None,
+        typer.Option(click_type=click.Choice(_LEVELS, case_sensitive=False), help="Minimum level."),
+    ] = None,
+    logger: Annotated[
+        str | None, typer.Option(help="Logger name; its child loggers match too.")
+    ] = None,
+):
+    """Print matching log records as JSON Lines, oldest first."""
+    start = None
+    if since is not None:
+        try:
+            start = parse_since(since)
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--since") from e
+
+    q = LogQuery(since=start, level=level, logger=logger)
+    for entry in query(get_settings().logs_dir / LOG_FILE, q):
+        typer.echo(json.dumps(entry, separators=(",", ":")))
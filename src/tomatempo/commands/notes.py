@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+from typing import Annotated, cast, get_args
+
+import click
+import typer
+
+from tomatempo.db import database_exists, get_engine
+from tomatempo.events import EventFeed
+from tomatempo.notes import EntityType, NoteError, add_note
+from tomatempo.settings import get_settings
+
+app = typer.Typer(no_args_is_help=True)
+
+OnOption = typer.Option("--on", click_type=click.Choice(get_args(EntityType)))
+
+
+@app.command("add")
+def add_cmd(
+    entity_type: Annotated[str, OnOption],
+    entity_id: int,
+    body: Annotated[str, typer.Argument(help="Markdown text.")],
+    tags: Annotated[str | None, typer.Option(help="Comma separated, e.g. plan,reading.")] = None,
+    pin: bool = False,
+    files: Annotated[
+        list[Path] | None,
+        typer.Option("--file", exists=True, dir_okay=False, help="Attach a file (repeatable)."),
+    ] = None,
+):
+    """Add a note to a project, initiative, deliverable or task."""
+    from tomatempo.media import MediaError, MediaStore
+
+    settings = get_settings()
+    try:
+        stored = MediaStore.from_settings(settings).ingest(files or [])
+        with get_engine(settings).begin() as conn:
+            kind = cast(EntityType, entity_type)  # checked by the Choice
+            note_id = add_note(conn, kind, entity_id, body, tags or "", pin, stored)
+    except (NoteError, MediaError) as e:
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
+    EventFeed.from_settings(settings).publish("note.added", note_id=note_id)
+    attached = f" with {len(stored)} attachments" if stored else ""
+    typer.echo(f"added note {note_id} to {entity_type} {entity_id}{attached}")
+
+
+@app.command("search")
+def search_cmd(
+    query: Annotated[str, typer.Argument(help="Words to find; end a word with * for a prefix.")],
+    entity_type: Annotated[str | None, OnOption] = None,
+    limit: Annotated[int, typer.Option(min=1)] = 20,
+):
+    """Search notes, best matches first."""
+    from tomatempo.search import search
+
+    settings = get_settings()
+    hits = []
+    if database_exists(settings):
+        highlight = ("\x1b[1m", "\x1b[22m") if sys.stdout.isatty() else ("**", "**")
+        # Writable: a database from before notes gets the tables and index here
+        with get_engine(settings).connect() as conn:
+            hits = search(conn, query, entity_type, limit, highlight)
+    for hit in hits:
+        snippet = " ".join(hit.snippet.split())
+        typer.echo(f"#{hit.note_id} {hit.entity_type} {hit.entity_id}: {snippet}")
+    if not hits:
+        typer.echo("no notes found", err=True)
@@ -0,0 +1,55 @@
+from typing import Annotated
+
+import typer
+
+from tomatempo.db import get_engine
+from tomatempo.events import EventFeed
+from tomatempo.names import EntityRef
+from tomatempo.pool import AssignError, move
+from tomatempo.rollups import TomatoRules
+from tomatempo.timer import parse_duration
+
+assign_app = typer.Typer()
+reassign_app = typer.Typer()
+
+TaskRef = EntityRef("task")
+
+
+def _move(duration: str, from_task: int | None, to_task: int) -> None:
+    try:
+        seconds = parse_duration(duration)
+    except ValueError as e:
+        raise typer.BadParameter(str(e)) from e
+    try:
+        with get_engine().begin() as conn:
+            move(conn, TomatoRules.from_settings(), seconds, from_task, to_task)
+    except AssignError as e:
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
+    EventFeed.from_settings().publish(
+        "slices.moved", seconds=seconds, from_task=from_task, to_task=to_task
+    )
+    source = "pool" if from_task is None else f"task {from_task}"
+    typer.echo(f"moved {duration} from {source} to task {to_task}")
+
+
+@assign_app.command()
+def assign(
+    duration: Annotated[str, typer.Argument(help="Time to assign, e.g. 20m.")],
+    task_id: Annotated[
+        int,
+        typer.Argument(click_type=TaskRef, metavar="TASK", help='Id, "exact name" or ~fuzzy name.'),
+    ],
+):
+    """Assign Time Pool minutes to a task."""
+    _move(duration, None, task_id)
+
+
+@reassign_app.command()
+def reassign(
+    duration: Annotated[str, typer.Argument(help="Time to move, e.g. 10m.")],
+    from_task: Annotated[int, typer.Option("--from", click_type=TaskRef)],
+    to_task: Annotated[int, typer.Option("--to", click_type=TaskRef)],
+):
+    """Move minutes from one task to another."""
+    _move(duration, from_task, to_task)
@@ -0,0 +1,29 @@
+import typer
+
+from tomatempo.db import get_engine
+from tomatempo.events import EventFeed
+from tomatempo.rollups import TomatoRules, check, rebuild
+
+app = typer.Typer(no_args_is_help=True)
+
+
+@app.command("rebuild")
+def rebuild_cmd():
+    """Recount the tomato rollups from the slices."""
+    with get_engine().begin() as conn:
+        rows = rebuild(conn, TomatoRules.from_settings())
+    EventFeed.from_settings().publish("rollups.rebuilt", rows=rows)
+    typer.echo(f"rebuilt {rows} rollups")
+
+
+@app.command("check")
+def check_cmd():
+    """Compare the tomato rollups with a full recount."""
+    with get_engine().connect() as conn:
+        diffs = check(conn, TomatoRules.from_settings())
+    for (kind, entity_id), (stored, expected) in sorted(diffs.items()):
+        typer.echo(f"{kind} {entity_id}: stored {tuple(stored)}, expected {tuple(expected)}")
+    if diffs:
+        typer.echo(f"{len(diffs)} rollups out of date; run `tomatempo rollup rebuild`", err=True)
+        raise typer.Exit(1)
+    typer.echo("rollups are consistent")
@@ -0,0 +1,60 @@
+from typing import Annotated, Any
+
+import typer
+
+from tomatempo.client import CommandError, execute
+
+app = typer.Typer(no_args_is_help=True)
+
+
+def format_status(status: dict[str, Any]) -> str:
+    state = "running" if status["running"] else "paused" if status["elapsed"] else "stopped"
+    focus = f"task {status['task_id']}" if status["task_id"] is not None else "pool"
+    minutes, seconds = divmod(status["remaining"], 60)
+    return f"{state} | {focus} | {minutes:02d}:{seconds:02d} left"
+
+
+def run(cmd: str, **args: Any) -> None:
+    """Execute a timer command and print the resulting status."""
+    try:
+        status = execute(cmd, **args)
+    except CommandError as e:
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
+    typer.echo(format_status(status))
+
+
+@app.command()
+def start(
+    duration: Annotated[str | None, typer.Argument(help="Countdown, e.g. 25m.")] = None,
+):
+    """Start (or resume) the timer on the focused task, or the Pool."""
+    if duration is None:
+        run("timer.start")
+        return
+
+    from tomatempo.timer import parse_duration
+
+    try:
+        seconds = parse_duration(duration)
+    except ValueError as e:
+        raise typer.BadParameter(str(e)) from e
+    run("timer.start", duration=seconds)
+
+
+@app.command()
+def pause():
+    """Pause the timer, closing the open slice."""
+    run("timer.pause")
+
+
+@app.command()
+def stop():
+    """Stop the timer, closing the open slice and resetting the countdown."""
+    run("timer.stop")
+
+
+@app.command()
+def status():
+    """Show the timer state."""
+    run("timer.status")
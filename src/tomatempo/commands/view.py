@@ -0,0 +1,56 @@
+import time
+
+import typer
+
+from tomatempo.instrument import span
+from tomatempo.settings import get_settings
+from tomatempo.watch import Dashboard, LineRenderer, Ticker, watch
+
+app = typer.Typer(no_args_is_help=True)
+
+WatchOption = typer.Option(False, "--watch", "-w", help="Refresh until Ctrl-C.")
+
+
+def _show(dashboard: Dashboard, watching: bool) -> None:
+    if not watching:
+        dashboard.refresh()
+        with span("render"):
+            typer.echo("\n".join(dashboard.lines(time.time())))
+        return
+    watch(dashboard, LineRenderer(), Ticker(get_settings().view_refresh_rate))
+
+
+@app.command()
+def timer(watching: bool = WatchOption):
+    """Show the timer and the focused task."""
+    from tomatempo.daemon import journal_path, state_path
+    from tomatempo.watch import TimerDashboard
+
+    settings = get_settings()
+    _show(TimerDashboard(state_path(settings), journal_path(settings)), watching)
+
+
+@app.command()
+def progress(watching: bool = WatchOption):
+    """Show time and tomatoes per task."""
+    from sqlalchemy.exc import OperationalError
+
+    from tomatempo.db import database_exists, get_engine
+    from tomatempo.events import EventFeed
+    from tomatempo.watch import Notified, ProgressDashboard
+
+    settings = get_settings()
+    if not database_exists(settings):
+        typer.echo("No time recorded yet.")
+        return
+    try:
+        # Read-only: a dashboard never competes with the timer for the write lock
+        with get_engine(settings, read_only=True).connect() as conn:
+            dashboard: Dashboard = ProgressDashboard(conn)
+            if watching:
+                # Writers publish events: don't even ask SQLite until one does
+                dashboard = Notified(dashboard, EventFeed.from_settings(settings).counter())
+            _show(dashboard, watching)
+    except OperationalError as e:
+        typer.echo(f"error: {e}", err=True)
+        raise typer.Exit(1) from e
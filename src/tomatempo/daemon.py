@@ -0,0 +1,195 @@
+"""
+Long-lived timer daemon.
+
+The daemon owns the timer state (and the logging QueueListener) and answers
+commands over a local Unix socket, so CLI invocations only pay for a socket
+round trip. Protocol: one JSON object per line in each direction.
+
+    -> {"cmd": "focus.set", "args": {"task_id": 12}}
+    <- {"ok": true, "result": {...}}  |  {"ok": false, "error": "..."}
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+from pathlib import Path
+from typing import Any
+
+from tomatempo.events import EventFeed
+from tomatempo.journal import JOURNAL_FILE, TimerJournal
+from tomatempo.logs import setup_logging
+from tomatempo.settings import Settings
+from tomatempo.timer import ClosedSlice, TimerError, TimerService, save_state
+
+logger = logging.getLogger(__name__)
+
+# Commands handled by the daemon itself rather than the timer
+STOP_COMMAND = "daemon.stop"
+PING_COMMAND = "daemon.ping"
+
+
+def socket_path(settings: Settings) -> Path:
+    return settings.daemon_socket or settings.state_dir / "daemon.sock"
+
+
+def state_path(settings: Settings) -> Path:
+    return settings.state_dir / "state.json"
+
+
+def journal_path(settings: Settings) -> Path:
+    return settings.state_dir / JOURNAL_FILE
+
+
+def record_slice(closed: ClosedSlice) -> None:
+    """on_close hook; the database layer is only imported once a slice closes."""
+    from tomatempo.slices import save_slice
+
+    save_slice(closed)
+
+
+def handle_request(service: TimerService, request: dict[str, Any]) -> dict[str, Any]:
+    """Run one protocol request against the timer and build the response."""
+    try:
+        result = service.call(request["cmd"], request.get("args") or {})
+    except (TimerError, TypeError, ValueError, KeyError) as e:
+        return {"ok": False, "error": str(e)}
+    except Exception as e:
+        # The command was rolled back (TimerService.call); report, don't crash
+        logger.exception("command failed", extra={"cmd": request["cmd"]})
+        return {"ok": False, "error": f"command failed: {e}"}
+    return {"ok": True, "result": result}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "DaemonServer"
+
+    # Don't let a stuck client hold the (single) request loop
+    timeout = 5
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                response: dict[str, Any] = {"ok": False, "error": f"invalid request: {e}"}
+            else:
+                response = self.server.dispatch(request)
+
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """
+    Single-threaded server: requests are handled one at a time, so the timer
+    state needs no locking. With a journal, commands are appended to it
+    instead of rewriting the state file.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        service: TimerService,
+        state_file: Path,
+        events: EventFeed | None = None,
+        journal: TimerJournal | None = None,
+    ):
+        self.path = path
+        self.service = service
+        self.state_file = state_file
+        self.events = events
+        self.journal = journal
+        self.stopping = False
+        _remove_stale_socket(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(path), _RequestHandler)
+        os.chmod(path, 0o600)
+
+    def dispatch(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Answer one request; any failure becomes an error response."""
+        try:
+            return self._dispatch(request)
+        except Exception as e:
+            logger.exception("request failed")
+            return {"ok": False, "error": f"daemon error: {e}"}
+
+    def _dispatch(self, request: dict[str, Any]) -> dict[str, Any]:
+        cmd = request.get("cmd")
+        if cmd == PING_COMMAND:
+            return {"ok": True, "result": {"pid": os.getpid()}}
+        if cmd == STOP_COMMAND:
+            self.stopping = True
+            return {"ok": True, "result": {"pid": os.getpid()}}
+        # Pin the clock so the journal replays the command at the same second
+        clock, now = self.service.clock, self.service.now()
+        self.service.clock = lambda: now
+        try:
+            response = handle_request(self.service, request)
+        finally:
+            self.service.clock = clock
+        if response["ok"] and cmd != "timer.status":
+            # Keeps a crash from losing the open slice
+            if self.journal is not None:
+                self.journal.append(
+                    request["cmd"], request.get("args") or {}, now, self.service.state
+                )
+            else:
+                save_state(self.state_file, self.service.state)
+            if self.events is not None:
+                self.events.publish(request["cmd"], **response["result"])
+        return response
+
+    def serve_until_stopped(self, poll_interval: float = 0.5) -> None:
+        self.timeout = poll_interval
+        while not self.stopping:
+            self.handle_request()
+            if self.journal is not None:
+                self.journal.sync_if_due()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.path.unlink(missing_ok=True)
+
+
+def _remove_stale_socket(path: Path) -> None:
+    """Remove a socket file left behind by a daemon that is gone."""
+    if not path.exists():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except ConnectionRefusedError:
+            path.unlink()
+            return
+    raise RuntimeError(f"a daemon is already listening on {path}")
+
+
+def run(settings: Settings) -> None:
+    """Run the daemon in the foreground until it gets a daemon.stop request."""
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("the daemon needs Unix domain sockets")
+
+    setup_logging(settings)
+
+    state_file = state_path(settings)
+    journal = TimerJournal(journal_path(settings), state_file)
+    recovery = journal.recover()
+    if recovery.events or recovery.torn_bytes:
+        # The slices those events closed were recorded when they ran
+        logger.info(
+            "timer state recovered from the journal",
+            extra={"events": recovery.events, "torn_bytes": recovery.torn_bytes},
+        )
+    service = TimerService(state=recovery.state, on_close=record_slice)
+
+    events = EventFeed.from_settings(settings)
+    with DaemonServer(socket_path(settings), service, state_file, events, journal) as server:
+        logger.info("daemon listening", extra={"socket": str(server.path)})
+        try:
+            server.serve_until_stopped()
+        finally:
+            # Compact into the state file, handing it over to in-process execution
+            journal.close(service.state)
+            logger.info("daemon stopped")
@@ -0,0 +1,152 @@
+"""
+Engine and session factory.
+
+Engines are built from Settings.database_url and cached per process, so a
+CLI invocation or the daemon opens SQLite once and keeps the connection.
+Every SQLite connection gets the PRAGMAs from Settings.sqlite, and the
+first writable engine creates any missing table.
+
+Read-only engines open the file with mode=ro and query_only=ON: views and
+reports can read while the timer writes (WAL) without ever taking the write
+lock.
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Engine, create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import SingletonThreadPool
+from sqlmodel import Session, SQLModel
+
+from tomatempo.instrument import span
+from tomatempo.settings import Settings, SqlitePragmas, get_settings
+
+_engines: dict[tuple[str, SqlitePragmas, bool], Engine] = {}
+
+
+def pragma_statements(pragmas: SqlitePragmas, read_only: bool = False) -> list[str]:
+    """PRAGMA statements for a new connection, in the order they are run."""
+    statements = [
+        f"PRAGMA busy_timeout = {pragmas.busy_timeout}",
+        f"PRAGMA mmap_size = {pragmas.mmap_size}",
+        f"PRAGMA cache_size = {pragmas.cache_size}",
+        f"PRAGMA temp_store = {pragmas.temp_store}",
+        f"PRAGMA foreign_keys = {'ON' if pragmas.foreign_keys else 'OFF'}",
+    ]
+    if read_only:
+        statements.append("PRAGMA query_only = ON")
+    else:
+        # journal_mode is stored in the file; synchronous only matters to writers
+        statements.insert(0, f"PRAGMA journal_mode = {pragmas.journal_mode}")
+        statements.append(f"PRAGMA synchronous = {pragmas.synchronous}")
+    return statements
+
+
+def build_engine(url: str, pragmas: SqlitePragmas, read_only: bool = False) -> Engine:
+    """A new engine; most callers want the cached get_engine()."""
+    sa_url = make_url(url)
+    if sa_url.get_backend_name() != "sqlite":
+        if read_only:
+            raise ValueError(f"read-only mode needs SQLite, got {sa_url.get_backend_name()}")
+        return create_engine(sa_url)
+
+    if read_only:
+        if sa_url.database in (None, "", ":memory:"):
+            raise ValueError("read-only mode needs a database file")
+        sa_url = sa_url.set(database=f"file:{sa_url.database}", query={"mode": "ro", "uri": "true"})
+
+    # One connection per thread, kept open for the life of the process
+    engine = create_engine(sa_url, poolclass=SingletonThreadPool)
+    statements = pragma_statements(pragmas, read_only)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_conn: sqlite3.Connection, _record: Any) -> None:
+        cursor = dbapi_conn.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+    return engine
+
+
+def get_engine(settings: Settings | None = None, *, read_only: bool = False) -> Engine:
+    """The process-wide engine for these settings (the singleton by default)."""
+    settings = settings or get_settings()
+    key = (settings.database_url, settings.sqlite, read_only)
+    engine = _engines.get(key)
+    if engine is None:
+        with span("db.open"):
+            if not read_only:
+                _ensure_parent(settings)
+            engine = _engines[key] = build_engine(*key)
+            if not read_only:
+                create_schema(engine, settings)
+    return engine
+
+
+def _sqlite_file(settings: Settings) -> Path | None:
+    url = make_url(settings.database_url)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return Path(url.database)
+    return None
+
+
+def _ensure_parent(settings: Settings) -> None:
+    """SQLite creates the database file, but not its directory (data_dir)."""
+    if (path := _sqlite_file(settings)) is not None:
+        settings.ensure_dir(path.parent)
+
+
+def database_exists(settings: Settings | None = None) -> bool:
+    """False when the SQLite file hasn't been created yet (nothing recorded)."""
+    path = _sqlite_file(settings or get_settings())
+    return path is None or path.exists()
+
+
+def create_schema(engine: Engine, settings: Settings | None = None) -> None:
+    """
+    Create the tables that don't exist yet. Tables derived from slices are
+    filled from them when they are added to a database that has slices, the
+    notes search index from the notes and the hierarchy closure from the
+    parent columns; the names revision gets its row (and triggers).
+    """
+    from tomatempo import models  # noqa: F401 (registers the tables)
+    from tomatempo.hierarchy import create as create_closure
+    from tomatempo.names import create as create_revisions
+    from tomatempo.ranges import rebuild_index
+    from tomatempo.rollups import TomatoRules, rebuild
+    from tomatempo.search import FTS_TABLE, create_index
+
+    existing = set(inspect(engine).get_table_names())
+    SQLModel.metadata.create_all(engine)
+    if FTS_TABLE not in existing and engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            create_index(conn)
+    if "hierarchy" not in existing:
+        with engine.begin() as conn:
+            create_closure(conn)
+    if "revisions" not in existing:
+        with engine.begin() as conn:
+            create_revisions(conn)
+    if "slices" not in existing:
+        return
+
+    with engine.begin() as conn:
+        if "rollups" not in existing:
+            rebuild(conn, TomatoRules.from_settings(settings))
+        if "slice_buckets" not in existing:
+            rebuild_index(conn)
+
+
+def get_session(settings: Settings | None = None, *, read_only: bool = False) -> Session:
+    """A Session on the cached engine; use it as a context manager."""
+    return Session(get_engine(settings, read_only=read_only))
+
+
+def dispose_engines() -> None:
+    """Close every cached engine (tests, and before forking)."""
+    for engine in _engines.values():
+        engine.dispose()
+    _engines.clear()
@@ -0,0 +1,239 @@
+"""
+Change notifications for watchers.
+
+Write paths (timer and focus commands, assign/reassign, rollup rebuild) call
+EventFeed.publish(), which appends one JSON line to the feed and then bumps
+a counter kept in a tiny file under cache_dir:
+
+    events.counter   8 bytes, little-endian sequence number of the last event
+    events.jsonl     {"seq": 3, "ts": 1700000000.0, "kind": "timer.pause", "data": {...}}
+
+Readers map the counter file and compare it with the last value they saw:
+a stat (to notice a recreated file) and a memory read, no database, so any
+number of watchers can check it every few milliseconds. When it moves, they
+read the new feed lines. Past MAX_FEED_BYTES the feed is rotated into
+events.jsonl.1 .. events.jsonl.<SEGMENTS>; followers use `seq` to find
+events that went into a rotated segment before they read them.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent writers aren't serialized
+    fcntl = None  # type: ignore[assignment]
+
+from tomatempo.settings import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FILE = "events.counter"
+FEED_FILE = "events.jsonl"
+MAX_FEED_BYTES = 1 << 20
+SEGMENTS = 5  # rotated feed files kept
+POLL_INTERVAL = 0.05
+
+_COUNTER = struct.Struct("<Q")
+
+
+class ChangeCounter:
+    """Read side of the counter: a read-only mapping of the counter file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._map: mmap.mmap | None = None
+        self._inode: int | None = None
+
+    @property
+    def value(self) -> int:
+        """Sequence number of the last event (0 before the first one)."""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            self.close()
+            return 0
+        if inode != self._inode:
+            # First read, or the file was recreated (e.g. the cache was cleaned)
+            self.close()
+            try:
+                with open(self.path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), _COUNTER.size, access=mmap.ACCESS_READ)
+            except (FileNotFoundError, ValueError):  # ValueError: not sized yet
+                return 0
+            self._inode = inode
+        assert self._map is not None
+        return _COUNTER.unpack_from(self._map)[0]  # type: ignore[no-any-return]
+
+    def wait(self, last: int, timeout: float | None = None, interval: float = POLL_INTERVAL) -> int:
+        """Block until the counter moves past `last` (or `timeout`); returns it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while (value := self.value) == last:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(interval)
+        return value
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._inode = None
+
+
+def _read_complete(f: IO[bytes]) -> Iterator[dict[str, Any]]:
+    """Events from the current position; stops before a half-written line."""
+    while True:
+        pos = f.tell()
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            f.seek(pos)
+            return
+        yield json.loads(line)
+
+
+class EventFeed:
+    """The counter and feed files in `directory` (cache_dir by default)."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.counter_path = directory / COUNTER_FILE
+        self.feed_path = directory / FEED_FILE
+
+    @classmethod
+    def from_settings(cls, settings: Settings | None = None) -> "EventFeed":
+        return cls((settings or get_settings()).cache_dir)
+
+    def counter(self) -> ChangeCounter:
+        return ChangeCounter(self.counter_path)
+
+    def publish(self, kind: str, **data: Any) -> int:
+        """
+        Record an event and wake the readers; returns its sequence number,
+        or 0 if it could not be written (watchers are never worth failing
+        a command for).
+        """
+        try:
+            return self._publish(kind, data)
+        except OSError:
+            logger.warning("could not publish event", extra={"kind": kind}, exc_info=True)
+            return 0
+
+    def _publish(self, kind: str, data: dict[str, Any]) -> int:
+        try:
+            fd = os.open(self.counter_path, os.O_RDWR | os.O_CREAT, 0o600)
+        except FileNotFoundError:
+            # First event: create the dir then, not on every call
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.counter_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)  # released by os.close
+            if os.fstat(fd).st_size < _COUNTER.size:
+                os.ftruncate(fd, _COUNTER.size)
+            with mmap.mmap(fd, _COUNTER.size) as counter:
+                seq: int = _COUNTER.unpack_from(counter)[0] + 1
+                event = {"seq": seq, "ts": round(time.time(), 3), "kind": kind, "data": data}
+                self._append(json.dumps(event, separators=(",", ":")) + "\n")
+                # The line is in the feed before readers see the new value
+                _COUNTER.pack_into(counter, 0, seq)
+        finally:
+            os.close(fd)
+        return seq
+
+    def _segment(self, n: int) -> Path:
+        return self.feed_path.with_name(f"{FEED_FILE}.{n}")
+
+    def _append(self, line: str) -> None:
+        try:
+            if self.feed_path.stat().st_size > MAX_FEED_BYTES:
+                self._rotate()
+        except FileNotFoundError:
+            pass
+        with open(self.feed_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def _rotate(self) -> None:
+        for n in range(SEGMENTS - 1, 0, -1):
+            try:
+                os.replace(self._segment(n), self._segment(n + 1))
+            except FileNotFoundError:
+                pass
+        os.replace(self.feed_path, self._segment(1))
+
+    def _open_feed(self) -> IO[bytes] | None:
+        try:
+            return open(self.feed_path, "rb")
+        except FileNotFoundError:
+            return None
+
+    def _rotated(self, f: IO[bytes]) -> bool:
+        try:
+            return self.feed_path.stat().st_ino != os.fstat(f.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def read(self, after: int = 0) -> list[dict[str, Any]]:
+        """Events with seq > `after` still on disk, rotated segments included."""
+        events: list[dict[str, Any]] = []
+        for path in [*map(self._segment, range(SEGMENTS, 0, -1)), self.feed_path]:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                events.extend(e for e in _read_complete(f) if e["seq"] > after)
+        return events
+
+    def follow(
+        self, from_start: bool = True, interval: float = POLL_INTERVAL
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield events as they are published, forever. Without `from_start`,
+        only events published after this call.
+        """
+        counter = self.counter()
+        # Not a generator itself: the starting point is taken now, not at next()
+        return self._follow(counter, 0 if from_start else counter.value, interval)
+
+    def _follow(
+        self, counter: ChangeCounter, last: int, interval: float
+    ) -> Iterator[dict[str, Any]]:
+        f: IO[bytes] | None = None
+        try:
+            while True:
+                # Sampled before reading: every event up to `seen` is on disk
+                seen = counter.value
+                if seen < last:
+                    last = 0  # the counter was recreated, seq starts over
+                fresh: list[dict[str, Any]] = []
+                if f is not None:
+                    fresh.extend(_read_complete(f))
+                    if self._rotated(f):
+                        # Rotation happens under the writers' lock: the old
+                        # file is complete, drain it and move on
+                        fresh.extend(_read_complete(f))
+                        f.close()
+                        f = None
+                if f is None and (f := self._open_feed()) is not None:
+                    fresh.extend(_read_complete(f))
+                seqs = [e["seq"] for e in fresh if e["seq"] > last]
+                if seen > last and seqs != list(range(last + 1, last + 1 + len(seqs))):
+                    # Events went into rotated segments before we read them
+                    fresh = sorted(self.read(after=last) + fresh, key=lambda e: e["seq"])
+                for event in fresh:
+                    if event["seq"] > last:
+                        last = event["seq"]
+                        yield event
+                counter.wait(seen, interval=interval)
+        finally:
+            counter.close()
+            if f is not None:
+                f.close()
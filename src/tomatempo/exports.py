@@ -0,0 +1,188 @@
+"""
+Streaming exports of slices (csv, json, jsonl).
+
+Rows go from a server-side cursor through a row transform into a chunked
+writer, so memory stays flat whatever the range. The output is written to a
+temp file next to the target, optionally gzip/zstd compressed on the fly,
+and renamed over the target only once complete.
+
+Timestamps and JSON use the same code as the JSON logs
+(JSONFormatter.iso_timestamp and json_dumps).
+"""
+
+import csv
+import io
+import os
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any, Literal
+
+from sqlalchemy import Connection, text
+
+from tomatempo.logs import JSONFormatter, json_dumps
+from tomatempo.ranges import OVERLAPPING_SQL, window_params
+
+ExportFormat = Literal["csv", "json", "jsonl"]
+Compression = Literal["gzip", "zstd"]
+
+FIELDS = ("id", "task_id", "start", "end", "seconds", "type", "origin")
+
+BATCH_SIZE = 5_000
+
+_SUFFIXES: dict[str, Compression] = {".gz": "gzip", ".zst": "zstd"}
+
+_ALL = "SELECT id, task_id, start_ts, end_ts, type, origin FROM slices ORDER BY start_ts, id"
+
+# The bucket-index range query of tomatempo.ranges
+_RANGE = f"""
+SELECT id, task_id, start_ts, end_ts, type, origin FROM slices
+WHERE id IN ({OVERLAPPING_SQL})
+ORDER BY start_ts, id
+"""
+
+
+class ExportError(RuntimeError):
+    """The export can't be written (e.g. missing compression support)."""
+
+
+def iter_batches(
+    conn: Connection,
+    start: int | None = None,
+    end: int | None = None,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[list[Any]]:
+    """
+    Slices overlapping [start, end) (all of them without a range), ordered
+    by start, fetched `batch_size` rows at a time. Slices are not clipped.
+    """
+    if start is not None and end is not None:
+        if end <= start:
+            return
+        query, params = _RANGE, window_params(start, end)
+    elif start is None and end is None:
+        query, params = _ALL, {}
+    else:
+        raise ValueError("a range needs both start and end")
+
+    streaming = conn.execution_options(stream_results=True, yield_per=batch_size)
+    for partition in streaming.execute(text(query), params).partitions(batch_size):
+        yield list(partition)
+
+
+def _records(batches: Iterator[list[Any]]) -> Iterator[list[tuple[Any, ...]]]:
+    """Row transform: ISO timestamps and the slice length."""
+    stamp = JSONFormatter().iso_timestamp
+    for batch in batches:
+        yield [
+            (slice_id, task_id, stamp(start), stamp(end), end - start, kind, origin)
+            for slice_id, task_id, start, end, kind, origin in batch
+        ]
+
+
+def _csv_chunks(batches: Iterator[list[tuple[Any, ...]]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(FIELDS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _json_lines(batches: Iterator[list[tuple[Any, ...]]]) -> Iterator[list[str]]:
+    dumps = json_dumps()
+    for batch in batches:
+        yield [dumps(dict(zip(FIELDS, record, strict=True))) for record in batch]
+
+
+def _jsonl_chunks(batches: Iterator[list[tuple[Any, ...]]]) -> Iterator[str]:
+    for lines in _json_lines(batches):
+        yield "\n".join(lines) + "\n"
+
+
+def _json_chunks(batches: Iterator[list[tuple[Any, ...]]]) -> Iterator[str]:
+    separator = "[\n"
+    for lines in _json_lines(batches):
+        yield separator + ",\n".join(lines)
+        separator = ",\n"
+    yield "[]\n" if separator == "[\n" else "\n]\n"
+
+
+_ENCODERS = {"csv": _csv_chunks, "json": _json_chunks, "jsonl": _jsonl_chunks}
+
+
+def encode(batches: Iterator[list[Any]], fmt: ExportFormat) -> Iterator[str]:
+    """Text chunks of the export, one per batch of rows."""
+    try:
+        encoder = _ENCODERS[fmt]
+    except KeyError:
+        raise ValueError(f"invalid format {fmt}. Use {list(_ENCODERS)}.") from None
+    return encoder(_records(batches))
+
+
+def compression_for(path: Path) -> Compression | None:
+    """Compression implied by the file suffix (.gz, .zst)."""
+    return _SUFFIXES.get(path.suffix)
+
+
+def _open_text(path: Path, compression: Compression | None) -> IO[str]:
+    if compression is None:
+        return open(path, "w", encoding="utf-8", newline="")
+    if compression == "gzip":
+        import gzip
+
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    if compression == "zstd":
+        try:
+            from compression import zstd  # type: ignore[import-not-found, unused-ignore]
+        except ImportError:
+            try:
+                import zstandard as zstd  # type: ignore[import-not-found, unused-ignore]
+            except ImportError:
+                raise ExportError("zstd compression needs Python 3.14+ or zstandard") from None
+        return zstd.open(path, "wt", encoding="utf-8", newline="")  # type: ignore[no-any-return]
+    raise ValueError(f"invalid compression {compression}. Use {list(_SUFFIXES.values())}.")
+
+
+def write_atomic(chunks: Iterator[str], out: Path, compression: Compression | None = None) -> None:
+    """Write the chunks to a temp file and rename it over `out` when done."""
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    try:
+        with _open_text(tmp, compression) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def export(
+    conn: Connection,
+    out: Path | None,
+    fmt: ExportFormat = "csv",
+    start: int | None = None,
+    end: int | None = None,
+    compression: Compression | None = None,
+) -> int:
+    """Export slices to `out` (stdout for None); returns the number of rows."""
+    count = 0
+
+    def counted() -> Iterator[list[Any]]:
+        nonlocal count
+        for batch in iter_batches(conn, start, end):
+            count += len(batch)
+            yield batch
+
+    chunks = encode(counted(), fmt)
+    if out is None:
+        if compression is not None:
+            raise ExportError("compressed output needs --out")
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+    else:
+        write_atomic(chunks, out, compression or compression_for(out))
+    return count
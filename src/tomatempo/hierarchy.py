@@ -0,0 +1,233 @@
+"""
+Closure table for the hierarchy Project -> Initiative -> Deliverable -> Task.
+
+The hierarchy table has one row per (ancestor, descendant) pair, each entity
+being its own ancestor at depth 0. "All tasks under X" is one range scan of
+its primary key, and tree() builds a whole display tree, with the rollup
+totals, from one result set instead of a query per level.
+
+On SQLite, triggers on the four tables keep it current: inserts and deletes,
+and updates of the parent column (a move re-links the whole subtree). Other
+databases only get rebuild(): move() runs it, other writers need `tomatempo
+index rebuild`.
+"""
+
+from dataclasses import dataclass, field
+from typing import Literal, get_args
+
+from sqlalchemy import Connection, text
+
+from tomatempo.rollups import EntityKey, TomatoRules, add_counts, get_counts
+
+EntityType = Literal["project", "initiative", "deliverable", "task"]
+
+# kind: (table, parent kind, parent column)
+LEVELS: dict[str, tuple[str, str | None, str | None]] = {
+    "project": ("projects", None, None),
+    "initiative": ("initiatives", "project", "project_id"),
+    "deliverable": ("deliverables", "initiative", "initiative_id"),
+    "task": ("tasks", "deliverable", "deliverable_id"),
+}
+
+_COLUMNS = "ancestor_type, ancestor_id, descendant_type, descendant_id, depth"
+
+# One branch per level, each a range of the primary key: no OR-joins, no sort
+_TREE = text(
+    " UNION ALL ".join(
+        f"""
+        SELECT h.depth, '{kind}', e.id, e.name, e.status, {f"e.{column}" if column else "NULL"},
+               coalesce(r.seconds, 0), coalesce(r.tomatoes, 0)
+        FROM hierarchy h
+        JOIN {table} e ON e.id = h.descendant_id
+        LEFT JOIN rollups r ON r.entity_type = '{kind}' AND r.entity_id = e.id
+        WHERE h.ancestor_type = :type AND h.ancestor_id = :id
+          AND h.descendant_type = '{kind}' AND h.depth <= :depth
+        """
+        for kind, (table, _, column) in LEVELS.items()
+    )
+)
+
+
+class HierarchyError(ValueError):
+    """Invalid hierarchy operation (e.g. moving under a missing parent)."""
+
+
+@dataclass
+class TreeNode:
+    kind: str
+    id: int
+    name: str
+    status: str
+    seconds: int = 0  # rollup totals of the subtree
+    tomatoes: int = 0
+    children: list["TreeNode"] = field(default_factory=list)
+
+
+def _triggers(kind: str) -> list[str]:
+    table, parent, column = LEVELS[kind]
+    link_ancestors = (
+        f"SELECT ancestor_type, ancestor_id, '{kind}', new.id, depth + 1 FROM hierarchy"
+        f" WHERE descendant_type = '{parent}' AND descendant_id = new.{column} UNION ALL "
+        if parent
+        else ""
+    )
+    statements = [
+        f"""
+        CREATE TRIGGER hierarchy_{kind}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO hierarchy ({_COLUMNS})
+            {link_ancestors}SELECT '{kind}', new.id, '{kind}', new.id, 0;
+        END
+        """,
+        f"""
+        CREATE TRIGGER hierarchy_{kind}_delete AFTER DELETE ON {table} BEGIN
+            DELETE FROM hierarchy
+            WHERE (descendant_type = '{kind}' AND descendant_id = old.id)
+               OR (ancestor_type = '{kind}' AND ancestor_id = old.id);
+        END
+        """,
+    ]
+    if parent:
+        # Unlink the subtree from the old ancestors, link it under the new ones
+        subtree = (
+            f"SELECT descendant_type, descendant_id FROM hierarchy"
+            f" WHERE ancestor_type = '{kind}' AND ancestor_id = new.id"
+        )
+        statements.append(f"""
+        CREATE TRIGGER hierarchy_{kind}_move AFTER UPDATE OF {column} ON {table}
+        WHEN new.{column} IS NOT old.{column} BEGIN
+            DELETE FROM hierarchy
+            WHERE (descendant_type, descendant_id) IN ({subtree})
+              AND (ancestor_type, ancestor_id) NOT IN ({subtree});
+            INSERT INTO hierarchy ({_COLUMNS})
+            SELECT a.ancestor_type, a.ancestor_id, s.descendant_type, s.descendant_id,
+                   a.depth + s.depth + 1
+            FROM hierarchy a, hierarchy s
+            WHERE a.descendant_type = '{parent}' AND a.descendant_id = new.{column}
+              AND s.ancestor_type = '{kind}' AND s.ancestor_id = new.id;
+        END
+        """)
+    return statements
+
+
+def create(conn: Connection) -> int:
+    """Fill the (new) hierarchy table, and add the triggers on SQLite."""
+    if conn.dialect.name == "sqlite":
+        for kind in LEVELS:
+            for statement in _triggers(kind):
+                conn.execute(text(statement))
+    return rebuild(conn)
+
+
+def rebuild(conn: Connection) -> int:
+    """Recompute the closure from the parent columns; returns the number of rows."""
+    conn.execute(text("DELETE FROM hierarchy"))
+    selves = " UNION ALL ".join(
+        f"SELECT '{kind}', id, '{kind}', id, 0 FROM {table}"
+        for kind, (table, _, _) in LEVELS.items()
+    )
+    conn.execute(text(f"INSERT INTO hierarchy ({_COLUMNS}) {selves}"))
+    conn.execute(
+        text(f"""
+        INSERT INTO hierarchy ({_COLUMNS})
+        SELECT 'project', i.project_id, 'initiative', i.id, 1 FROM initiatives i
+        UNION ALL
+        SELECT 'initiative', d.initiative_id, 'deliverable', d.id, 1 FROM deliverables d
+        UNION ALL
+        SELECT 'deliverable', t.deliverable_id, 'task', t.id, 1 FROM tasks t
+        WHERE t.deliverable_id IS NOT NULL
+        UNION ALL
+        SELECT 'project', i.project_id, 'deliverable', d.id, 2
+        FROM deliverables d JOIN initiatives i ON i.id = d.initiative_id
+        UNION ALL
+        SELECT 'initiative', d.initiative_id, 'task', t.id, 2
+        FROM tasks t JOIN deliverables d ON d.id = t.deliverable_id
+        UNION ALL
+        SELECT 'project', i.project_id, 'task', t.id, 3
+        FROM tasks t
+        JOIN deliverables d ON d.id = t.deliverable_id
+        JOIN initiatives i ON i.id = d.initiative_id
+        """)
+    )
+    return conn.execute(text("SELECT count(*) FROM hierarchy")).scalar_one()
+
+
+def ancestors(conn: Connection, kind: str, entity_id: int) -> list[EntityKey]:
+    """Ancestors of an entity, nearest first."""
+    rows = conn.execute(
+        text(
+            "SELECT ancestor_type, ancestor_id FROM hierarchy"
+            " WHERE descendant_type = :type AND descendant_id = :id AND depth > 0"
+            " ORDER BY depth"
+        ),
+        {"type": kind, "id": entity_id},
+    )
+    return [(kind, entity_id) for kind, entity_id in rows]
+
+
+def descendants(conn: Connection, kind: str, entity_id: int, of_type: str = "task") -> list[int]:
+    """Ids of the `of_type` entities under an entity (itself included)."""
+    return list(
+        conn.execute(
+            text(
+                "SELECT descendant_id FROM hierarchy"
+                " WHERE ancestor_type = :type AND ancestor_id = :id AND descendant_type = :of"
+                " ORDER BY descendant_id"
+            ),
+            {"type": kind, "id": entity_id, "of": of_type},
+        ).scalars()
+    )
+
+
+def tree(conn: Connection, kind: str, entity_id: int, depth: int = 3) -> TreeNode:
+    """The subtree of an entity down to `depth` levels, with rollup totals."""
+    rows = conn.execute(_TREE, {"type": kind, "id": entity_id, "depth": depth}).all()
+    nodes = {
+        (node_kind, node_id): TreeNode(node_kind, node_id, name, status, seconds, tomatoes)
+        for _, node_kind, node_id, name, status, _, seconds, tomatoes in rows
+    }
+    if (kind, entity_id) not in nodes:
+        raise HierarchyError(f"{kind} {entity_id} not found")
+    for level, node_kind, node_id, _, _, parent_id, _, _ in rows:
+        if level:
+            parent = nodes[(LEVELS[node_kind][1], parent_id)]  # type: ignore[index]
+            parent.children.append(nodes[(node_kind, node_id)])
+    return nodes[(kind, entity_id)]
+
+
+def _exists(conn: Connection, kind: str, entity_id: int) -> bool:
+    found = conn.execute(text(f"SELECT 1 FROM {LEVELS[kind][0]} WHERE id = :id"), {"id": entity_id})
+    return found.first() is not None
+
+
+def move(
+    conn: Connection, rules: TomatoRules, kind: str, entity_id: int, parent_id: int | None
+) -> list[EntityKey]:
+    """
+    Put an initiative, deliverable or task (and its subtree) under another
+    parent; a task can leave its deliverable with parent_id None. Its rollup
+    totals move from the old ancestors to the new ones. Returns the new
+    ancestors.
+    """
+    if kind not in get_args(EntityType) or LEVELS[kind][1] is None:
+        raise HierarchyError(f"can't move a {kind}")
+    table, parent, column = LEVELS[kind]
+    assert parent is not None
+    if not _exists(conn, kind, entity_id):
+        raise HierarchyError(f"{kind} {entity_id} not found")
+    if parent_id is None and kind != "task":
+        raise HierarchyError(f"a {kind} can't leave its {parent}")
+    if parent_id is not None and not _exists(conn, parent, parent_id):
+        raise HierarchyError(f"{parent} {parent_id} not found")
+
+    counts = get_counts(conn, (kind, entity_id))
+    old = ancestors(conn, kind, entity_id)
+    conn.execute(
+        text(f"UPDATE {table} SET {column} = :parent WHERE id = :id"),
+        {"parent": parent_id, "id": entity_id},
+    )
+    if conn.dialect.name != "sqlite":
+        rebuild(conn)
+    new = ancestors(conn, kind, entity_id)
+    add_counts(conn, rules, old, -counts.seconds, -counts.tomatoes)
+    add_counts(conn, rules, new, counts.seconds, counts.tomatoes)
+    return new
@@ -0,0 +1,256 @@
+"""
+Bulk import of slices from files (tomatempo exports, Toggl CSV).
+
+The input is streamed record by record, normalized to UTC epoch seconds and
+inserted with one executemany per batch, BATCH_SIZE rows per transaction,
+on a connection using the "bulk" SQLite profile (synchronous=OFF, bigger
+cache). The per-slice work done by insert_slices (day buckets, rollups) is
+skipped during the load and done once at the end: rebuild_index and
+rollups.rebuild.
+
+Each batch commits together with its ImportRun row (how many input records
+were consumed), so an interrupted import started again on the same file
+skips what is already in and carries on. A finished file isn't imported
+twice.
+
+Formats:
+- tomatempo: `tomatempo export` output, CSV or JSON Lines (start, end as
+  ISO 8601 or epoch seconds; task_id, type optional);
+- toggl: Toggl Track detailed CSV (Start date, Start time, End date,
+  End time), imported into the Time Pool.
+Timestamps without an offset are read in `tz` (local time by default).
+"""
+
+import csv
+import datetime as dt
+import gzip
+import hashlib
+import json
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Literal, get_args
+
+from sqlalchemy import Connection, Engine, select, text, update
+
+from tomatempo.db import build_engine, get_engine
+from tomatempo.events import EventFeed
+from tomatempo.models import ImportRun
+from tomatempo.ranges import rebuild_index
+from tomatempo.rollups import TomatoRules, rebuild
+from tomatempo.settings import SQLITE_PROFILES, Settings, get_settings
+
+ImportFormat = Literal["tomatempo", "toggl"]
+
+BATCH_SIZE = 50_000
+MAX_ERRORS = 20  # invalid records reported (all of them are counted)
+
+_INSERT = text(
+    "INSERT INTO slices (task_id, start_ts, end_ts, type, origin)"
+    " VALUES (:task_id, :start_ts, :end_ts, :type, 'import')"
+)
+_TOGGL_COLUMNS = {"Start date", "Start time", "End date", "End time"}
+_TYPES = {"work", "break"}
+
+
+class ImportFileError(RuntimeError):
+    """The file can't be imported (unknown format, unreadable header)."""
+
+
+@dataclass
+class ImportResult:
+    source: str
+    format: ImportFormat
+    rows_read: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    resumed_at: int = 0  # records already imported by an interrupted run
+    already_done: bool = False
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return (self.rows_read - self.resumed_at) / self.seconds if self.seconds else 0.0
+
+
+def file_checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _open(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def _is_jsonl(path: Path) -> bool:
+    return path.name.removesuffix(".gz").endswith((".jsonl", ".ndjson"))
+
+
+def detect_format(path: Path) -> ImportFormat:
+    """tomatempo or toggl, from the CSV header (JSON Lines are tomatempo exports)."""
+    if _is_jsonl(path):
+        return "tomatempo"
+    with _open(path) as f:
+        header = set(next(csv.reader(f), []))
+    if _TOGGL_COLUMNS <= header:
+        return "toggl"
+    if {"start", "end"} <= header:
+        return "tomatempo"
+    raise ImportFileError(f"{path}: unknown format (header {sorted(header)})")
+
+
+def read_records(path: Path) -> Iterator[dict[str, Any]]:
+    """Input records as dicts, one at a time."""
+    with _open(path) as f:
+        if _is_jsonl(path):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def to_utc_seconds(value: Any, tz: dt.tzinfo | None = None) -> int:
+    """
+    Epoch seconds from epoch seconds or ISO 8601. Values without an offset
+    are in `tz`, or in local time (with its DST rules) when it's None.
+    """
+    if isinstance(value, int | float) or (isinstance(value, str) and value.strip().isdigit()):
+        return int(value)
+    when = dt.datetime.fromisoformat(str(value).strip())
+    if when.tzinfo is None and tz is not None:
+        when = when.replace(tzinfo=tz)
+    return int(when.timestamp())
+
+
+def normalize(
+    record: dict[str, Any], fmt: ImportFormat, tz: dt.tzinfo | None = None
+) -> dict[str, Any]:
+    """Insert parameters for one record; raises ValueError when it's invalid."""
+    try:
+        if fmt == "toggl":
+            start = to_utc_seconds(f"{record['Start date']}T{record['Start time']}", tz)
+            end = to_utc_seconds(f"{record['End date']}T{record['End time']}", tz)
+            task_id, kind = None, "work"
+        else:
+            start = to_utc_seconds(record["start"], tz)
+            end = to_utc_seconds(record["end"], tz)
+            task_id = int(record["task_id"]) if record.get("task_id") not in (None, "") else None
+            kind = record.get("type") or "work"
+    except KeyError as e:
+        raise ValueError(f"missing {e.args[0]}") from None
+    if end <= start:
+        raise ValueError(f"end {end} is not after start {start}")
+    if kind not in _TYPES:
+        raise ValueError(f"invalid type {kind!r}")
+    return {"task_id": task_id, "start_ts": start, "end_ts": end, "type": kind}
+
+
+def _bulk_engine(settings: Settings) -> Engine:
+    get_engine(settings)  # schema, with the regular settings
+    return build_engine(settings.database_url, SQLITE_PROFILES["bulk"])
+
+
+def _start_run(conn: Connection, checksum: str, source: Path, fmt: ImportFormat) -> ImportRun:
+    row = conn.execute(select(ImportRun).where(ImportRun.checksum == checksum)).first()  # type: ignore[arg-type]
+    if row is not None:
+        return ImportRun(**row._mapping)
+    conn.execute(
+        ImportRun.metadata.tables["imports"].insert(),
+        {"checksum": checksum, "source": str(source), "format": fmt},
+    )
+    return ImportRun(checksum=checksum, source=str(source), format=fmt)
+
+
+def _save_run(conn: Connection, run: ImportRun) -> None:
+    conn.execute(
+        update(ImportRun)
+        .where(ImportRun.checksum == run.checksum)  # type: ignore[arg-type]
+        .values(
+            rows_read=run.rows_read,
+            inserted=run.inserted,
+            skipped=run.skipped,
+            finished=run.finished,
+        )
+    )
+
+
+def import_file(
+    path: Path,
+    fmt: ImportFormat | None = None,
+    tz: dt.tzinfo | None = None,
+    settings: Settings | None = None,
+    batch_size: int = BATCH_SIZE,
+) -> ImportResult:
+    """Import `path` into the database, resuming an interrupted run of the same file."""
+    settings = settings or get_settings()
+    fmt = fmt or detect_format(path)
+    if fmt not in get_args(ImportFormat):
+        raise ImportFileError(f"invalid format {fmt}. Use {list(get_args(ImportFormat))}.")
+    checksum = file_checksum(path)
+    result = ImportResult(str(path), fmt)
+    started = time.perf_counter()
+
+    engine = _bulk_engine(settings)
+    try:
+        with engine.begin() as conn:
+            run = _start_run(conn, checksum, path, fmt)
+        result.resumed_at = run.rows_read
+        if run.finished:
+            result.already_done = True
+        else:
+            _load(engine, run, read_records(path), fmt, tz, batch_size, result)
+            _finish(engine, run, settings)
+        result.rows_read = run.rows_read
+        result.inserted, result.skipped = run.inserted, run.skipped
+    finally:
+        engine.dispose()
+
+    result.seconds = time.perf_counter() - started
+    if not result.already_done:
+        EventFeed.from_settings(settings).publish("slices.imported", rows=result.inserted)
+    return result
+
+
+def _load(
+    engine: Engine,
+    run: ImportRun,
+    records: Iterator[dict[str, Any]],
+    fmt: ImportFormat,
+    tz: dt.tzinfo | None,
+    batch_size: int,
+    result: ImportResult,
+) -> None:
+    records = islice(records, run.rows_read, None)
+    while batch := list(islice(records, batch_size)):
+        rows = []
+        for n, record in enumerate(batch, start=run.rows_read + 1):
+            try:
+                rows.append(normalize(record, fmt, tz))
+            except (ValueError, TypeError) as e:
+                run.skipped += 1
+                if len(result.errors) < MAX_ERRORS:
+                    result.errors.append(f"record {n}: {e}")
+        run.rows_read += len(batch)
+        run.inserted += len(rows)
+        with engine.begin() as conn:
+            if rows:
+                conn.execute(_INSERT, rows)
+            _save_run(conn, run)
+
+
+def _finish(engine: Engine, run: ImportRun, settings: Settings) -> None:
+    """Index and count the new slices once, then mark the run finished."""
+    with engine.begin() as conn:
+        rebuild_index(conn)
+        rebuild(conn, TomatoRules.from_settings(settings))
+        run.finished = True
+        _save_run(conn, run)
@@ -0,0 +1,164 @@
+"""
+Timing spans.
+
+    with span("db.open"):
+        ...
+
+    @timed("render")
+    def render(): ...
+
+Spans nest: a span opened inside another one is recorded under it, with a
+path like "command view/db.open". Durations come from time.perf_counter.
+
+Instrumentation is off by default. span() then returns a shared no-op
+context manager and timed() functions call straight through, so the
+instrumented code pays a global lookup and a call. Once enable()d, every
+finished span is kept (see spans() and summary()) and logged at DEBUG on
+the "tomatempo.instrument" logger with `span`, `span_path` and
+`duration_ms` extras, which JSONFormatter writes as fields.
+"""
+
+import functools
+import logging
+import time
+from collections.abc import Callable
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any, ParamSpec, TypeVar
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+@dataclass(frozen=True)
+class SpanRecord:
+    name: str
+    path: str  # names from the outermost span, joined with "/"
+    depth: int
+    start: float  # perf_counter
+    duration: float  # seconds
+
+
+_enabled = False
+_started = 0.0
+_records: list[SpanRecord] = []
+_current: ContextVar[tuple[str, int]] = ContextVar("tomatempo_span", default=("", 0))
+
+
+class _NoSpan:
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Span:
+    """A running span; use span() rather than building one."""
+
+    __slots__ = ("name", "path", "depth", "_start", "_token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path = name
+        self.depth = 0
+        self._start = 0.0
+        self._token: Token[tuple[str, int]] | None = None
+
+    def __enter__(self) -> "Span":
+        parent, depth = _current.get()
+        if parent:
+            self.path, self.depth = f"{parent}/{self.name}", depth + 1
+        self._token = _current.set((self.path, self.depth))
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        duration = time.perf_counter() - self._start
+        if self._token is not None:
+            _current.reset(self._token)
+        _records.append(SpanRecord(self.name, self.path, self.depth, self._start, duration))
+        logger.debug(
+            "span %s took %.3f ms",
+            self.path,
+            duration * 1000,
+            extra={
+                "span": self.name,
+                "span_path": self.path,
+                "duration_ms": round(duration * 1000, 3),
+            },
+        )
+
+
+def span(name: str) -> Span | _NoSpan:
+    """Context manager timing the block as `name` (a no-op while disabled)."""
+    return Span(name) if _enabled else _NO_SPAN
+
+
+def timed(name: str | None = None) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator timing each call as `name` (the function's qualname by default)."""
+
+    def decorate(func: Callable[P, R]) -> Callable[P, R]:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def enable() -> None:
+    """Start recording spans (and forget earlier ones)."""
+    global _enabled, _started
+    _records.clear()
+    _started = time.perf_counter()
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def spans() -> list[SpanRecord]:
+    """Spans finished since enable(), in the order they ended."""
+    return list(_records)
+
+
+def summary(now: float | None = None) -> str:
+    """
+    Table of calls and total time per span path, nested spans indented
+    under their parent, plus the wall time since enable().
+    """
+    totals: dict[str, list[Any]] = {}  # path -> [depth, name, calls, seconds, first start]
+    for record in _records:
+        entry = totals.setdefault(record.path, [record.depth, record.name, 0, 0.0, record.start])
+        entry[2] += 1
+        entry[3] += record.duration
+        entry[4] = min(entry[4], record.start)
+
+    # Parents before children: a parent starts first but ends (is recorded) last
+    rows = sorted(totals.items(), key=lambda item: (item[1][4], item[1][0]))
+    elapsed = (time.perf_counter() if now is None else now) - _started
+
+    lines = [f"{'phase':<40} {'calls':>6} {'ms':>10}"]
+    for _, (depth, name, calls, seconds, _start) in rows:
+        label = "  " * depth + name
+        lines.append(f"{label:<40} {calls:>6} {seconds * 1000:>10.2f}")
+    lines.append(f"{'total':<40} {'':>6} {elapsed * 1000:>10.2f}")
+    return "\n".join(lines)
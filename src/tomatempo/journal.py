@@ -0,0 +1,298 @@
+"""
+Append-only journal of timer events, for crash recovery of the open timer.
+
+Instead of rewriting state.json after every command, the daemon appends one
+fixed-size record per event to <state_dir>/timer.journal; state.json becomes
+the snapshot the journal is compacted into (with the sequence number of the
+last event it includes).
+
+Record: CRC32 of the body, then the body: sequence number, command, UTC
+seconds (the timer clock the command ran at), monotonic nanoseconds,
+duration and task id. Records are written to the OS right away, so a crash
+of the process loses nothing. fsync is group-committed: once per
+`sync_every` events or `sync_interval` seconds, and on compaction and close,
+so a power loss loses at most that window.
+
+Recovery reads the snapshot, replays the records after its sequence number
+through a TimerService clocked at each record's UTC stamp, and truncates a
+torn or corrupt tail. The slices the replayed events closed aren't recorded
+again: the daemon recorded them when the commands ran.
+"""
+
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
+
+from tomatempo.timer import ClosedSlice, TimerError, TimerService, TimerState
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILE = "timer.journal"
+COMPACT_BYTES = 16 * 1024  # ~400 events, replayed in a few ms
+SYNC_EVERY = 32
+SYNC_INTERVAL = 2.0  # seconds
+
+_MAGIC = b"TTJ1"
+_CRC = struct.Struct("<I")
+_BODY = struct.Struct("<QBqqiq")  # seq, kind, utc, monotonic ns, duration, task id
+RECORD_SIZE = _CRC.size + _BODY.size
+_NONE = -1
+
+# Journaled commands; the index + 1 is the kind stored in the record
+_KINDS = ("timer.start", "timer.pause", "timer.stop", "focus.set")
+
+
+@dataclass(frozen=True)
+class JournalEvent:
+    seq: int
+    cmd: str
+    utc: int
+    mono_ns: int
+    duration: int | None = None
+    task_id: int | None = None
+
+    def args(self) -> dict[str, Any]:
+        """TimerService.call arguments that replay the event."""
+        if self.cmd == "timer.start":
+            return {"duration": self.duration}
+        if self.cmd == "focus.set":
+            return {"task_id": self.task_id}
+        return {}
+
+
+@dataclass
+class Recovery:
+    state: TimerState
+    seq: int  # last event applied
+    events: int = 0  # replayed on top of the snapshot
+    torn_bytes: int = 0  # dropped from the end of the journal
+
+
+def encode(event: JournalEvent) -> bytes:
+    body = _BODY.pack(
+        event.seq,
+        _KINDS.index(event.cmd) + 1,
+        event.utc,
+        event.mono_ns,
+        _NONE if event.duration is None else event.duration,
+        _NONE if event.task_id is None else event.task_id,
+    )
+    return _CRC.pack(zlib.crc32(body)) + body
+
+
+def decode(data: bytes) -> Iterator[JournalEvent]:
+    """Events up to the end of `data` or the first torn or corrupt record."""
+    if not data.startswith(_MAGIC):
+        return
+    for offset in range(len(_MAGIC), len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+        body = data[offset + _CRC.size : offset + RECORD_SIZE]
+        if _CRC.unpack_from(data, offset)[0] != zlib.crc32(body):
+            return
+        seq, kind, utc, mono_ns, duration, task_id = _BODY.unpack(body)
+        if not 0 < kind <= len(_KINDS):
+            return
+        yield JournalEvent(
+            seq,
+            _KINDS[kind - 1],
+            utc,
+            mono_ns,
+            None if duration == _NONE else duration,
+            None if task_id == _NONE else task_id,
+        )
+
+
+def read_journal(path: Path) -> tuple[list[JournalEvent], int, int]:
+    """Events, the length of the valid prefix and the file size."""
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return [], 0, 0
+    events = list(decode(data))
+    valid = len(_MAGIC) + len(events) * RECORD_SIZE if data.startswith(_MAGIC) else 0
+    return events, valid, len(data)
+
+
+def read_snapshot(path: Path) -> tuple[TimerState, int]:
+    """The snapshot state and the sequence number of the last event in it."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return TimerState(), 0
+    return TimerState.from_dict(data), data.get("journal_seq", 0)
+
+
+def write_snapshot(path: Path, state: TimerState, seq: int) -> None:
+    """Durably replace the snapshot: the journal is truncated right after."""
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**state.to_dict(), "journal_seq": seq}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # e.g. Windows can't open directories
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def replay(
+    state: TimerState, events: list[JournalEvent], after: int = 0
+) -> tuple[TimerState, list[ClosedSlice]]:
+    """Apply the events after sequence number `after` to a copy of `state`."""
+    slices: list[ClosedSlice] = []
+    now = [0]
+    service = TimerService(replace(state), on_close=slices.append, clock=lambda: now[0])
+    for event in events:
+        if event.seq <= after:
+            continue
+        now[0] = event.utc
+        try:
+            service.call(event.cmd, event.args())
+        except TimerError as e:
+            logger.warning("journal event skipped", extra={"seq": event.seq, "error": str(e)})
+    return service.state, slices
+
+
+def current_state(journal_file: Path, state_file: Path) -> TimerState:
+    """The state a running daemon has, read only (for watchers)."""
+    state, seq = read_snapshot(state_file)
+    events, _, _ = read_journal(journal_file)
+    return replay(state, events, seq)[0] if events else state
+
+
+class TimerJournal:
+    """
+    Writer side of the journal. recover() opens it; the daemon then calls
+    append() after each successful command and close(state) on exit.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        snapshot: Path,
+        *,
+        sync_every: int = SYNC_EVERY,
+        sync_interval: float = SYNC_INTERVAL,
+        compact_bytes: int = COMPACT_BYTES,
+    ):
+        self.path = path
+        self.snapshot = snapshot
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_bytes = compact_bytes
+        self.seq = 0
+        self.size = 0
+        self._fd: int | None = None
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def recover(self) -> Recovery:
+        """Snapshot plus journal, dropping a torn tail; opens the journal for appends."""
+        state, seq = read_snapshot(self.snapshot)
+        events, valid, size = read_journal(self.path)
+        new_state = replay(state, events, seq)[0]
+        replayed = sum(1 for event in events if event.seq > seq)
+        self.seq = max(seq, events[-1].seq if events else 0)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        torn = max(size - valid, 0)
+        if torn:
+            logger.warning("journal tail dropped", extra={"bytes": torn})
+        if valid == 0:
+            os.ftruncate(self._fd, 0)
+            os.write(self._fd, _MAGIC)
+            valid = len(_MAGIC)
+        elif valid < size:
+            os.ftruncate(self._fd, valid)
+        self.size = valid
+        return Recovery(new_state, self.seq, replayed, torn)
+
+    def append(self, cmd: str, args: dict[str, Any], utc: int, state: TimerState) -> JournalEvent:
+        """
+        Record a command that ran at `utc` and left the timer in `state` (the
+        snapshot written when the journal outgrows compact_bytes).
+        """
+        if self._fd is None:
+            raise RuntimeError("the journal isn't open, call recover() first")
+        self.seq += 1
+        event = JournalEvent(
+            self.seq, cmd, utc, time.monotonic_ns(), args.get("duration"), args.get("task_id")
+        )
+        os.write(self._fd, encode(event))
+        self.size += RECORD_SIZE
+        self._unsynced += 1
+        if self.size >= self.compact_bytes:
+            self.compact(state)
+        elif self._unsynced >= self.sync_every:
+            self.sync()
+        else:
+            self.sync_if_due()
+        return event
+
+    def sync(self) -> None:
+        """fsync the events appended since the last sync, all at once."""
+        if self._fd is not None and self._unsynced:
+            os.fsync(self._fd)
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def sync_if_due(self) -> None:
+        if self._unsynced and time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+
+    def compact(self, state: TimerState) -> None:
+        """Write `state` as the snapshot and empty the journal."""
+        assert self._fd is not None
+        write_snapshot(self.snapshot, state, self.seq)
+        # A crash before the truncation is harmless: the snapshot's
+        # sequence number makes recovery skip the events it includes
+        os.ftruncate(self._fd, len(_MAGIC))
+        os.fsync(self._fd)
+        self.size = len(_MAGIC)
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self, state: TimerState | None = None) -> None:
+        """Compact into `state` if given, else just sync."""
+        if self._fd is None:
+            return
+        if state is not None:
+            self.compact(state)
+        else:
+            self.sync()
+        os.close(self._fd)
+        self._fd = None
+
+
+def fold(journal_file: Path, state_file: Path) -> TimerState:
+    """
+    State for in-process execution: a journal left behind by a daemon that
+    didn't stop cleanly is compacted into the state file first.
+
+    Any record left is compacted away, even if the snapshot already includes
+    it (a crash between write_snapshot and the truncation): in-process saves
+    write state.json without a sequence number, so records kept past this
+    point would be replayed again.
+    """
+    if not journal_file.exists():
+        return read_snapshot(state_file)[0]
+    journal = TimerJournal(journal_file, state_file)
+    recovery = journal.recover()
+    journal.close(recovery.state if journal.size > len(_MAGIC) else None)
+    return recovery.state
@@ -1,14 +1,28 @@
 import atexit
+import copy
 import datetime as dt
+import hashlib
 import json
 import logging
 import logging.config
 import logging.handlers
-from pathlib import Path
-from typing import override
-
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from importlib import resources
+from json.encoder import c_make_encoder, encode_basestring_ascii  # type: ignore [attr-defined]
+from operator import attrgetter, itemgetter
+from typing import Any, Literal, override
+
+from tomatempo import __version__
+from tomatempo.instrument import span, timed
 from tomatempo.settings import Settings
 
+LOG_FILE = "log_tomatempo.jsonl"
+
 LOG_RECORD_BUILTIN_ATTRS = {
     "args",
     "asctime",
@@ -35,20 +49,141 @@ LOG_RECORD_BUILTIN_ATTRS = {
     "taskName",
 }
 
+# Fields computed by the formatter itself instead of read from the record
+ALWAYS_FIELDS = ("message", "timestamp", "exc_info", "stack_info")
+
+JSONBackend = Literal["stdlib", "orjson", "auto"]
+QueuePolicy = Literal["drop", "block"]
+
 
 class JSONFormatter(logging.Formatter):
     """
     Custom Formatter for compose logs in JSONLines format.
+
+    With `compiled=True` the `fmt_keys` mapping is turned into an extraction
+    plan once, at construction time, and timestamps are cached per second.
+    The output stays byte-identical to the default mode as long as the
+    stdlib backend is used.
+
+    `json_backend` selects the serializer: "stdlib" (default), "orjson" or
+    "auto" (orjson when installed, stdlib otherwise). orjson is faster but
+    writes compact JSON, so its output is equivalent, not byte-identical.
     """
 
-    def __init__(self, *, fmt_keys: dict[str, str] | None = None):
+    def __init__(
+        self,
+        *,
+        fmt_keys: dict[str, str] | None = None,
+        compiled: bool = False,
+        json_backend: JSONBackend = "stdlib",
+    ):
         super().__init__()
         self.fmt_keys = fmt_keys if fmt_keys is not None else {}
+        self.compiled = compiled
+        self._dumps = json_dumps(json_backend)
+        self._ts_cache: tuple[int, str] = (0, "")
+
+        if compiled:
+            self._compile_plan()
 
     @override
     def format(self, record: logging.LogRecord) -> str:
+        if self.compiled:
+            return self._dumps(self._extract(record))
+
         message = self._prepare_log_dict(record)
-        return json.dumps(message, default=str)
+        return self._dumps(message)
+
+    def _compile_plan(self) -> None:
+        """
+        Turn fmt_keys into an extraction plan: one attrgetter for the plain
+        record attributes plus an itemgetter that puts them, and the fields
+        computed by the formatter, in fmt_keys order.
+        """
+        consumed: set[str] = set()
+        plain: list[str] = []
+        sources: list[str | int] = []
+
+        for val in self.fmt_keys.values():
+            if val in ALWAYS_FIELDS and val not in consumed:
+                consumed.add(val)
+                sources.append(val)
+            else:
+                sources.append(len(plain))
+                plain.append(val)
+
+        # Computed fields go right after the plain values in the source tuple
+        indices = [
+            src if isinstance(src, int) else len(plain) + ALWAYS_FIELDS.index(src)
+            for src in sources
+        ]
+
+        self._keys = tuple(self.fmt_keys)
+        self._get_plain: Callable[[logging.LogRecord], tuple[Any, ...]]
+        if len(plain) == 1:
+            get_one = attrgetter(plain[0])
+            self._get_plain = lambda record: (get_one(record),)
+        else:
+            self._get_plain = attrgetter(*plain) if plain else lambda record: ()
+
+        self._pick: Callable[[tuple[Any, ...]], tuple[Any, ...]]
+        if len(indices) == 1:
+            index = indices[0]
+            self._pick = lambda source: (source[index],)
+        else:
+            self._pick = itemgetter(*indices) if indices else lambda source: ()
+
+        self._trailing = tuple(i for i, field in enumerate(ALWAYS_FIELDS) if field not in consumed)
+
+    def _extract(self, record: logging.LogRecord) -> dict[str, Any]:
+        """Compiled counterpart of `_prepare_log_dict`."""
+        exc_info = None if record.exc_info is None else self.formatException(record.exc_info)
+        stack_info = None if record.stack_info is None else self.formatStack(record.stack_info)
+
+        fields = (
+            record.getMessage(),
+            self.iso_timestamp(record.created),
+            exc_info,
+            stack_info,
+        )
+
+        message = dict(zip(self._keys, self._pick(self._get_plain(record) + fields), strict=True))
+
+        for i in self._trailing:
+            if (value := fields[i]) is not None:
+                message[ALWAYS_FIELDS[i]] = value
+
+        record_dict = record.__dict__
+        if not LOG_RECORD_BUILTIN_ATTRS.issuperset(record_dict):
+            for key, val in record_dict.items():
+                if key not in LOG_RECORD_BUILTIN_ATTRS:
+                    message[key] = val
+
+        return message
+
+    def iso_timestamp(self, created: float) -> str:
+        """
+        Same output as `datetime.fromtimestamp(created, tz=UTC).isoformat()`,
+        reusing the formatted date and time while the second doesn't change.
+        """
+        # Same split and half-even rounding as math.modf + datetime
+        second = int(created)
+        micro = round((created - second) * 1e6)
+        if micro >= 1_000_000:
+            second += 1
+            micro -= 1_000_000
+        elif micro < 0:
+            second -= 1
+            micro += 1_000_000
+
+        cached_second, prefix = self._ts_cache
+        if second != cached_second or not prefix:
+            prefix = dt.datetime.fromtimestamp(second, tz=dt.UTC).isoformat()[:-6]
+            self._ts_cache = (second, prefix)
+
+        if micro:
+            return f"{prefix}.{micro:06d}+00:00"
+        return prefix + "+00:00"
 
     def _prepare_log_dict(self, record: logging.LogRecord) -> dict[str, str]:
         always_fields = {
@@ -78,45 +213,524 @@ class JSONFormatter(logging.Formatter):
         return message
 
 
+def json_dumps(backend: JSONBackend = "stdlib") -> Callable[[Any], str]:
+    """Resolve the serializer for JSONFormatter (also used by exports)."""
+    if backend in ("orjson", "auto"):
+        try:
+            import orjson  # type: ignore [import-not-found, unused-ignore]
+        except ImportError:
+            if backend == "orjson":
+                raise
+        else:
+            orjson_dumps = orjson.dumps
+
+            def dumps(obj: Any) -> str:
+                return orjson_dumps(obj, default=str).decode()
+
+            return dumps
+    elif backend != "stdlib":
+        raise ValueError(f"invalid json_backend {backend}. Use ['stdlib', 'orjson', 'auto'].")
+
+    # json.dumps(obj, default=str) builds a new encoder on every call; the C
+    # encoder is built once here with the same options (minus the circular
+    # reference check, log payloads are plain trees)
+    if c_make_encoder is None:
+        return json.JSONEncoder(default=str).encode
+
+    iterencode = c_make_encoder(
+        None, str, encode_basestring_ascii, None, ": ", ", ", False, False, True
+    )
+
+    def stdlib_dumps(obj: Any) -> str:
+        return "".join(iterencode(obj, 0))
+
+    return stdlib_dumps
+
+
 class NonErrorFilter(logging.Filter):
     @override
     def filter(self, record: logging.LogRecord) -> bool | logging.LogRecord:
         return record.levelno <= logging.INFO
 
 
-_listener = None
+class _SuppressingFilter(logging.Filter, ABC):
+    """
+    Base for filters that drop repeated records. Records are grouped by
+    (logger, message template), i.e. `record.msg` before formatting, and
+    only those at or below `level` are considered; anything above passes.
+
+    Dropped records are counted per group. Every `summary_interval` seconds
+    (checked when a record comes through) each group with drops gets one
+    "suppressed N similar messages" record, logged through the same logger
+    with `suppressed` and `template` extras.
 
+    Meant for the queue handler, so records are dropped before they are
+    enqueued: the check is a dict lookup under an uncontended lock.
+    """
 
-def setup_logging(settings: Settings):
-    # Make sure log directory exists
-    Path(settings.logs_dir).mkdir(parents=True, exist_ok=True)
+    def __init__(
+        self, level: int | str = logging.INFO, summary_interval: float = 5.0, max_keys: int = 1024
+    ):
+        super().__init__()
+        self.levelno = logging._checkLevel(level)  # type: ignore[attr-defined]
+        self.summary_interval = summary_interval
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._suppressed: dict[tuple[str, Any], list[int]] = {}  # key -> [count, levelno]
+        self._next_summary: float | None = None
+
+    @abstractmethod
+    def allow(self, key: tuple[str, Any], now: float) -> bool:
+        """Whether the record grouped under `key`, created at `now`, passes."""
 
-    # Load yaml and placeholders
-    config_file = Path("./src/tomatempo/config/logging.yaml")
+    @override
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.levelno or "suppressed" in record.__dict__:
+            return True  # above the limit, or one of the summaries
+        msg = record.msg
+        key = (record.name, msg if isinstance(msg, str) else record.lineno)
+        now = record.created
+        summaries = None
+        with self._lock:
+            keep = self.allow(key, now)
+            if not keep:
+                dropped = self._suppressed.setdefault(key, [0, record.levelno])
+                dropped[0] += 1
+                dropped[1] = max(dropped[1], record.levelno)
+            if self._next_summary is None:
+                self._next_summary = now + self.summary_interval
+            elif now >= self._next_summary and self._suppressed:
+                summaries, self._suppressed = self._suppressed, {}
+                self._next_summary = now + self.summary_interval
+        if summaries:
+            self._log_summaries(summaries)
+        return keep
+
+    def _log_summaries(self, summaries: dict[tuple[str, Any], list[int]]) -> None:
+        for (name, template), (count, levelno) in summaries.items():
+            logger = logging.getLogger(name)
+            summary = logger.makeRecord(
+                name,
+                levelno,
+                "(unknown file)",
+                0,
+                "suppressed %d similar messages",
+                (count,),
+                None,
+                extra={"suppressed": count, "template": str(template)},
+            )
+            logger.handle(summary)
+
+
+class RateLimitFilter(_SuppressingFilter):
+    """Token bucket per (logger, message template): `rate` records/s, bursts of `burst`."""
+
+    def __init__(self, rate: float = 20.0, burst: int = 100, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[tuple[str, Any], list[float]] = {}  # key -> [tokens, last]
 
-    import yaml  # type: ignore [import-untyped]
+    @override
+    def allow(self, key: tuple[str, Any], now: float) -> bool:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.clear()
+            self._buckets[key] = [self.burst - 1.0, now]
+            return True
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return True
+        bucket[0] = tokens
+        return False
+
+
+class SampleFilter(_SuppressingFilter):
+    """Keep 1 in `every` records per (logger, message template), the first one included."""
+
+    def __init__(self, every: int = 10, level: int | str = logging.DEBUG, **kwargs: Any):
+        super().__init__(level=level, **kwargs)
+        if every < 1:
+            raise ValueError(f"invalid every {every}. Use 1 or more.")
+        self.every = every
+        self._seen: dict[tuple[str, Any], int] = {}
 
-    with open(config_file) as f_in:
-        cfg = yaml.safe_load(f_in)
+    @override
+    def allow(self, key: tuple[str, Any], now: float) -> bool:
+        seen = self._seen.get(key)
+        if seen is None and len(self._seen) >= self.max_keys:
+            self._seen.clear()
+        seen = (seen or 0) + 1
+        self._seen[key] = seen % self.every
+        return seen % self.every == 1 % self.every
 
-        # Insert log dir
-        cfg["handlers"]["file_json"]["filename"] = str(settings.logs_dir) + "/log_tomatempo.jsonl"
 
-        # Insert log level in root
-        cfg["root"]["level"] = settings.log_level
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler backed by a bounded queue, so a log storm can't grow memory
+    without limit. When the queue is full the record is dropped and counted
+    (policy "drop") or the producer waits for room (policy "block").
+    """
 
-    logging.config.dictConfig(cfg)
+    def __init__(self, maxsize: int = 10_000, policy: QueuePolicy = "drop"):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"invalid policy {policy}. Use ['drop', 'block'].")
+        self.bounded_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize)
+        super().__init__(self.bounded_queue)
+        self.policy = policy
+        self.dropped = 0
+
+    @override
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == "block":
+            self.bounded_queue.put(record)
+            return
+
+        try:
+            self.bounded_queue.put_nowait(record)
+        except queue.Full:
+            # Runs under the handler lock, see Handler.handle
+            self.dropped += 1
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that drains the queue in batches of up to `batch_size`
+    records, waiting at most `flush_interval` seconds for a batch to fill.
+
+    Stream handlers (RotatingFileHandler included) get each batch formatted
+    once and written with a single write, flush and rollover check. Other
+    handlers receive the records one by one, as in QueueListener.
+    """
+
+    _sentinel: Any = None
+
+    def __init__(
+        self,
+        records: "queue.Queue[Any]",
+        *handlers: logging.Handler,
+        respect_handler_level: bool = False,
+        batch_size: int = 512,
+        flush_interval: float = 0.2,
+    ):
+        super().__init__(records, *handlers, respect_handler_level=respect_handler_level)
+        self.records = records
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    @override
+    def enqueue_sentinel(self) -> None:
+        # A bounded queue may be full, wait for the listener to make room
+        self.records.put(self._sentinel)
+
+    def _monitor(self) -> None:
+        q = self.records
+        has_task_done = hasattr(q, "task_done")
+        stop = False
+
+        while not stop:
+            record = self.dequeue(True)
+            if record is self._sentinel:
+                stop = True
+                batch = []
+            else:
+                batch = [record]
+
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        record = q.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    batch.append(record)
+
+            if batch:
+                self.handle_batch(batch)
+
+            if has_task_done:
+                for _ in range(len(batch) + stop):
+                    q.task_done()
+
+    def handle_batch(self, records: list[logging.LogRecord]) -> None:
+        """Offer a batch of records to every handler."""
+        records = [self.prepare(record) for record in records]
+
+        for handler in self.handlers:
+            if self.respect_handler_level:
+                selected = [record for record in records if record.levelno >= handler.level]
+            else:
+                selected = records
+
+            if not selected:
+                continue
+
+            if isinstance(handler, logging.StreamHandler):
+                _write_batch(handler, selected)
+            else:
+                for record in selected:
+                    handler.handle(record)
+
+
+def _write_batch(handler: logging.StreamHandler, records: list[logging.LogRecord]) -> None:
+    """Format a batch of records and write them to the handler's stream at once."""
+    lines = []
+    for record in records:
+        rv = handler.filter(record)
+        if not rv:
+            continue
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        try:
+            lines.append(handler.format(record) + handler.terminator)
+        except Exception:
+            handler.handleError(record)
+
+    if not lines:
+        return
+
+    payload = "".join(lines)
+
+    handler.acquire()
+    try:
+        if isinstance(handler, logging.handlers.RotatingFileHandler) and handler.maxBytes > 0:
+            # One size check per batch instead of one per record
+            stream = handler.stream or handler._open()
+            handler.stream = stream
+            position = stream.seek(0, 2)
+            if position and position + len(payload) >= handler.maxBytes:
+                handler.doRollover()
+
+        if isinstance(handler, logging.FileHandler) and handler.stream is None:
+            handler.stream = handler._open()
+
+        handler.stream.write(payload)
+        handler.flush()
+    except Exception:
+        handler.handleError(records[-1])
+    finally:
+        handler.release()
+
+
+# ------- Config ------
+#
+# config/logging.yaml is the source of truth. Parsing it means importing
+# PyYAML on every start, so the parsed and validated dict is cached as JSON
+# under cache_dir, keyed by the package version and the file's hash.
+# DEFAULT_LOGGING_CONFIG mirrors the shipped file and is used when PyYAML
+# isn't installed.
+
+LOGGING_CACHE_FILE = "logging.json"
+
+DEFAULT_LOGGING_CONFIG: dict[str, Any] = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "root": {"level": "${LOG_LEVEL}", "handlers": ["stderr", "file_json", "queue_handler"]},
+    "formatters": {
+        "simple": {
+            "format": "[%(levelname)s|%(module)s|L%(lineno)d] %(asctime)s: %(message)s",
+            "datefmt": "%Y-%m-%dT%H:%M:%S%z",
+        },
+        "json": {
+            "()": "tomatempo.logs.JSONFormatter",
+            "compiled": True,
+            "fmt_keys": {
+                "level": "levelname",
+                "message": "message",
+                "timestamp": "timestamp",
+                "logger": "name",
+                "module": "module",
+                "function": "funcName",
+                "line": "lineno",
+                "thread_name": "threadName",
+            },
+        },
+    },
+    "filters": {
+        "rate_limit": {
+            "()": "tomatempo.logs.RateLimitFilter",
+            "rate": 20,
+            "burst": 100,
+            "level": "INFO",
+        },
+        "sample_debug": {"()": "tomatempo.logs.SampleFilter", "every": 1},
+    },
+    "handlers": {
+        "stderr": {
+            "class": "logging.StreamHandler",
+            "level": "WARNING",
+            "formatter": "simple",
+            "stream": "ext://sys.stdout",
+        },
+        "file_json": {
+            "class": "tomatempo.logstore.CompressingRotatingFileHandler",
+            "level": "DEBUG",
+            "formatter": "json",
+            "filename": "${LOG_FILE}",
+            "maxBytes": 20000000,
+            "backupCount": 20,
+            "compression": "gzip",
+        },
+        "queue_handler": {
+            "()": "tomatempo.logs.BoundedQueueHandler",
+            "maxsize": 10000,
+            "policy": "drop",
+            "filters": ["rate_limit", "sample_debug"],
+        },
+    },
+}
+
+
+def validate_logging_config(cfg: dict[str, Any]) -> None:
+    """
+    The checks setup_logging relies on, done once when the config is
+    compiled: dictConfig version, the handlers and filters it fills in,
+    and every reference pointing to a defined entry.
+    """
+    if cfg.get("version") != 1:
+        raise ValueError("logging config: version must be 1")
+    handlers = cfg.get("handlers", {})
+    formatters = cfg.get("formatters", {})
+    filters = cfg.get("filters", {})
+    for name in ("file_json", "queue_handler"):
+        if name not in handlers:
+            raise ValueError(f"logging config: missing handler {name!r}")
+    for name in ("rate_limit", "sample_debug"):
+        if name not in filters:
+            raise ValueError(f"logging config: missing filter {name!r}")
+    for name in cfg.get("root", {}).get("handlers", []):
+        if name not in handlers:
+            raise ValueError(f"logging config: root uses undefined handler {name!r}")
+    for name, handler in handlers.items():
+        if (formatter := handler.get("formatter")) is not None and formatter not in formatters:
+            raise ValueError(f"logging config: {name} uses undefined formatter {formatter!r}")
+        for filter_name in handler.get("filters", []):
+            if filter_name not in filters:
+                raise ValueError(f"logging config: {name} uses undefined filter {filter_name!r}")
+
+
+def _parse_logging_yaml(text: str) -> dict[str, Any]:
+    try:
+        import yaml  # type: ignore [import-untyped]
+    except ImportError:
+        return copy.deepcopy(DEFAULT_LOGGING_CONFIG)
+    return yaml.safe_load(text)  # type: ignore[no-any-return]
+
+
+def load_logging_config(settings: Settings) -> dict[str, Any]:
+    """
+    The packaged logging.yaml as a dictConfig dict, placeholders unfilled.
+    Read from the JSON cache while it matches; parsed, validated and cached
+    otherwise.
+    """
+    data = (resources.files("tomatempo") / "config" / "logging.yaml").read_bytes()
+    key = f"{__version__}:{hashlib.sha256(data).hexdigest()}"
+    cache = settings.cache_dir / LOGGING_CACHE_FILE
+
+    try:
+        cached = json.loads(cache.read_text(encoding="utf-8"))
+        if cached["key"] == key:
+            return cached["config"]  # type: ignore[no-any-return]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    cfg = _parse_logging_yaml(data.decode("utf-8"))
+    validate_logging_config(cfg)
+    try:
+        settings.ensure_dir(cache.parent)
+        tmp = cache.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"key": key, "config": cfg}), encoding="utf-8")
+        os.replace(tmp, cache)
+    except OSError:
+        pass  # a read-only cache only costs the parse next time
+    return cfg
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+@timed("setup_logging")
+def setup_logging(settings: Settings):
+    # Make sure log directory exists
+    settings.ensure_dir(settings.logs_dir)
+
+    # Load the config (shipped in the package) and fill the placeholders
+    with span("logging.config"):
+        cfg = load_logging_config(settings)
+
+    # Insert log dir
+    log_file = str(settings.logs_dir / LOG_FILE)
+    cfg["handlers"]["file_json"]["filename"] = log_file
+
+    # Shipping replaces the file handler; the file only gets the spill
+    if settings.log_ship_address:
+        file_json = cfg["handlers"].pop("file_json")
+        cfg["handlers"]["ship"] = {
+            "()": "tomatempo.shipping.ShipHandler",
+            "level": "DEBUG",
+            "formatter": "json",
+            "address": settings.log_ship_address,
+            "spill_file": log_file,
+            "spill_max_bytes": file_json.get("maxBytes", 0),
+            "spill_backup_count": file_json.get("backupCount", 0),
+            "spill_compression": file_json.get("compression", "gzip"),
+            "buffer_size": settings.log_ship_buffer,
+            "batch_size": settings.log_batch_size,
+        }
+        handlers = cfg["root"]["handlers"]
+        handlers[handlers.index("file_json")] = "ship"
+
+    # Insert log level in root
+    cfg["root"]["level"] = settings.log_level
+
+    # Insert queue bounds
+    cfg["handlers"]["queue_handler"]["maxsize"] = settings.log_queue_size
+    cfg["handlers"]["queue_handler"]["policy"] = settings.log_queue_policy
+
+    # Producer-side filters; the disabled ones are left out entirely
+    filters = cfg["filters"]
+    filters["rate_limit"]["rate"] = settings.log_rate_limit
+    filters["rate_limit"]["burst"] = settings.log_rate_burst
+    filters["sample_debug"]["every"] = settings.log_debug_sample
+    enabled = cfg["handlers"]["queue_handler"].setdefault("filters", [])
+    if not settings.log_rate_limit and "rate_limit" in enabled:
+        enabled.remove("rate_limit")
+    if settings.log_debug_sample == 1 and "sample_debug" in enabled:
+        enabled.remove("sample_debug")
+
+    with span("logging.dictConfig"):
+        logging.config.dictConfig(cfg)
 
     # Get root logger
     root = logging.getLogger()
     # Get the queue handler
-    qh = next(h for h in root.handlers if isinstance(h, logging.handlers.QueueHandler))
+    qh = next(h for h in root.handlers if isinstance(h, BoundedQueueHandler))
     # Get other handlers
     targets = [h for h in root.handlers if h is not qh]
 
     global _listener
 
-    _listener = logging.handlers.QueueListener(qh.queue, *targets, respect_handler_level=True)
+    _stop_listener()
+
+    _listener = BatchingQueueListener(
+        qh.bounded_queue,
+        *targets,
+        respect_handler_level=True,
+        batch_size=settings.log_batch_size,
+        flush_interval=settings.log_flush_interval_ms / 1000,
+    )
     _listener.start()
 
     # Remove targets from root to avoid duplicates
@@ -124,7 +738,17 @@ def setup_logging(settings: Settings):
         root.removeHandler(h)
 
     # Clean and go out
-    atexit.register(lambda: (_listener.stop() if _listener else None))
+    atexit.unregister(_stop_listener)
+    atexit.register(_stop_listener)
+
+
+def _stop_listener() -> None:
+    """Flush pending records and stop the listener thread."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 LOGGER = logging.getLogger()
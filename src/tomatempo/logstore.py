@@ -0,0 +1,356 @@
+"""
+Compressed, indexed log segments.
+
+CompressingRotatingFileHandler rotates the JSONL log like
+RotatingFileHandler, but renames the full file to a timestamped segment and
+hands it to a background thread, so the QueueListener only pays for a
+rename. The thread compresses the segment in blocks of `block_lines` lines,
+each block an independent gzip member (or zstd frame); the concatenation is
+still a valid .gz/.zst file. A sidecar index records, per segment and per
+block: first/last timestamp, level counts, logger names and the block's
+byte offset and length.
+
+query() reads the indexes first and decompresses only the blocks that can
+hold matching records.
+
+    log_tomatempo.jsonl                          active file
+    log_tomatempo.1700000000123456789.jsonl      rotated, not compressed yet
+    log_tomatempo.1700000000123456789.jsonl.gz   compressed segment
+    log_tomatempo.1700000000123456789.jsonl.gz.idx
+"""
+
+import datetime as dt
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sys
+import time
+import traceback
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal, override
+
+Compression = Literal["gzip", "zstd"]
+
+BLOCK_LINES = 1_000
+INDEX_SUFFIX = ".idx"
+
+_SUFFIXES: dict[str, Compression] = {".gz": "gzip", ".zst": "zstd"}
+_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+_SEGMENT_RE = re.compile(r"\.(\d+)\.jsonl(?:\.(?:gz|zst))?$")
+
+Codec = tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+
+def codec(compression: Compression) -> Codec:
+    """(compress, decompress) for one block."""
+    if compression == "gzip":
+        import gzip
+
+        return (lambda data: gzip.compress(data, mtime=0)), gzip.decompress
+    if compression == "zstd":
+        try:
+            from compression import zstd  # type: ignore[import-not-found, unused-ignore]
+        except ImportError:
+            try:
+                import zstandard  # type: ignore[import-not-found, unused-ignore]
+            except ImportError:
+                raise ValueError("zstd compression needs Python 3.14+ or zstandard") from None
+            return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+        return zstd.compress, zstd.decompress
+    raise ValueError(f"invalid compression {compression}. Use {list(_SUFFIXES.values())}.")
+
+
+def _suffix(compression: Compression) -> str:
+    return next(s for s, c in _SUFFIXES.items() if c == compression)
+
+
+def _timestamp(entry: dict[str, Any]) -> float | None:
+    try:
+        return dt.datetime.fromisoformat(entry["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+@dataclass
+class _Block:
+    offset: int
+    length: int
+    lines: int
+    first: float | None
+    last: float | None
+    levels: dict[str, int]
+    loggers: list[str]
+
+
+def _summarize(lines: list[bytes]) -> tuple[float | None, float | None, dict[str, int], set[str]]:
+    first = last = None
+    levels: dict[str, int] = {}
+    loggers: set[str] = set()
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if (ts := _timestamp(entry)) is not None:
+            first = ts if first is None else min(first, ts)
+            last = ts if last is None else max(last, ts)
+        level = str(entry.get("level"))
+        levels[level] = levels.get(level, 0) + 1
+        if (name := entry.get("logger")) is not None:
+            loggers.add(str(name))
+    return first, last, levels, loggers
+
+
+def compress_segment(
+    raw: Path, compression: Compression = "gzip", block_lines: int = BLOCK_LINES
+) -> Path:
+    """Compress a rotated segment in blocks and write its index; returns the new path."""
+    compress = codec(compression)[0]
+    target = raw.with_name(raw.name + _suffix(compression))
+    # Per process: two handlers on the same base file may pick up the same segment
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    blocks: list[_Block] = []
+    offset = 0
+
+    with open(raw, "rb") as src, open(tmp, "wb") as dst:
+        while True:
+            lines = [line for _, line in zip(range(block_lines), src, strict=False)]
+            if not lines:
+                break
+            data = compress(b"".join(lines))
+            dst.write(data)
+            first, last, levels, loggers = _summarize(lines)
+            blocks.append(
+                _Block(offset, len(data), len(lines), first, last, levels, sorted(loggers))
+            )
+            offset += len(data)
+
+    index = {
+        "compression": compression,
+        "first": min((b.first for b in blocks if b.first is not None), default=None),
+        "last": max((b.last for b in blocks if b.last is not None), default=None),
+        "levels": _merge_levels(b.levels for b in blocks),
+        "blocks": [b.__dict__ for b in blocks],
+    }
+    index_tmp = tmp.with_name(tmp.name + INDEX_SUFFIX)
+    index_tmp.write_text(json.dumps(index), encoding="utf-8")
+    # Segment first: an index without its segment is never left behind
+    os.replace(tmp, target)
+    os.replace(index_tmp, target.with_name(target.name + INDEX_SUFFIX))
+    raw.unlink()
+    return target
+
+
+def _merge_levels(all_levels: Iterable[dict[str, int]]) -> dict[str, int]:
+    merged: dict[str, int] = {}
+    for levels in all_levels:
+        for level, count in levels.items():
+            merged[level] = merged.get(level, 0) + count
+    return merged
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler whose rotated files are compressed and indexed in a
+    background thread. `backupCount` compressed segments are kept.
+    """
+
+    def __init__(
+        self,
+        filename: str | os.PathLike[str],
+        mode: str = "a",
+        maxBytes: int = 0,
+        backupCount: int = 0,
+        encoding: str | None = None,
+        delay: bool = False,
+        errors: str | None = None,
+        compression: Compression = "gzip",
+        block_lines: int = BLOCK_LINES,
+    ):
+        codec(compression)  # fail at configuration time, not at the first rollover
+        super().__init__(filename, mode, maxBytes, backupCount, encoding, delay, errors)
+        self.compression: Compression = compression
+        self.block_lines = block_lines
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: list[Future[Path]] = []
+        # Segments rotated by a process that exited before compressing them
+        for raw in segments(Path(self.baseFilename)):
+            if raw.suffix == ".jsonl":
+                self._submit(raw)
+
+    def segment_path(self) -> Path:
+        base = Path(self.baseFilename)
+        return base.with_name(f"{base.stem}.{time.time_ns()}{base.suffix}")
+
+    @override
+    def doRollover(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None  # type: ignore[assignment]
+        if os.path.exists(self.baseFilename):
+            raw = self.segment_path()
+            os.rename(self.baseFilename, raw)
+            self._submit(raw)
+        if not self.delay:
+            self.stream = self._open()
+
+    def _submit(self, raw: Path) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="log-compress")
+        self._pending = [f for f in self._pending if not f.done()]
+        future = self._executor.submit(self._compress, raw)
+        future.add_done_callback(self._report)
+        self._pending.append(future)
+
+    def _report(self, future: Future[Path]) -> None:
+        """Compression runs off the logging path: report failures like handleError does."""
+        if future.cancelled() or (e := future.exception()) is None:
+            return
+        if logging.raiseExceptions and sys.stderr:
+            sys.stderr.write(
+                f"--- Logging error ---\nCan't compress a segment of {self.baseFilename}\n"
+            )
+            traceback.print_exception(e, file=sys.stderr)
+
+    def _compress(self, raw: Path) -> Path:
+        target = compress_segment(raw, self.compression, self.block_lines)
+        if self.backupCount > 0:
+            compressed = [p for p in segments(Path(self.baseFilename)) if p.suffix != ".jsonl"]
+            for old in compressed[: -self.backupCount]:
+                old.with_name(old.name + INDEX_SUFFIX).unlink(missing_ok=True)
+                old.unlink(missing_ok=True)
+        return target
+
+    def wait(self) -> None:
+        """Block until the segments rotated so far are compressed."""
+        for future in self._pending:
+            future.result()
+        self._pending.clear()
+
+    @override
+    def close(self) -> None:
+        super().close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def segments(base: Path) -> list[Path]:
+    """Rotated segments of the `base` log file, oldest first."""
+    found = []
+    for path in base.parent.glob(f"{base.stem}.*{base.suffix}*"):
+        if (match := _SEGMENT_RE.search(path.name)) is not None:
+            found.append((int(match.group(1)), path))
+    return [path for _, path in sorted(found)]
+
+
+# ------- Query ------
+
+
+@dataclass(frozen=True)
+class LogQuery:
+    since: float | None = None
+    until: float | None = None
+    level: str | None = None  # minimum level
+    logger: str | None = None  # the logger or its children
+
+    def _levels(self) -> set[str] | None:
+        if self.level is None:
+            return None
+        return set(_LEVELS[_LEVELS.index(self.level.upper()) :])
+
+    def may_match(self, summary: dict[str, Any]) -> bool:
+        """Whether a segment or block with this index summary can hold a match."""
+        first, last = summary.get("first"), summary.get("last")
+        if self.since is not None and last is not None and last < self.since:
+            return False
+        if self.until is not None and first is not None and first >= self.until:
+            return False
+        if (levels := self._levels()) is not None and not levels & set(summary["levels"]):
+            return False
+        loggers = summary.get("loggers")
+        return self.logger is None or loggers is None or any(map(self._logger_matches, loggers))
+
+    def _logger_matches(self, name: str) -> bool:
+        assert self.logger is not None
+        return name == self.logger or name.startswith(self.logger + ".")
+
+    def matches(self, entry: dict[str, Any]) -> bool:
+        if self.since is not None or self.until is not None:
+            ts = _timestamp(entry)
+            if ts is None:
+                return False
+            if self.since is not None and ts < self.since:
+                return False
+            if self.until is not None and ts >= self.until:
+                return False
+        if (levels := self._levels()) is not None and entry.get("level") not in levels:
+            return False
+        return self.logger is None or self._logger_matches(str(entry.get("logger")))
+
+
+def _entries(lines: Iterable[bytes], q: LogQuery) -> Iterator[dict[str, Any]]:
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if q.matches(entry):
+            yield entry
+
+
+def _read_index(segment: Path) -> dict[str, Any] | None:
+    try:
+        return json.loads(segment.with_name(segment.name + INDEX_SUFFIX).read_text("utf-8"))  # type: ignore[no-any-return]
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _query_segment(segment: Path, q: LogQuery) -> Iterator[dict[str, Any]]:
+    if segment.suffix == ".jsonl":
+        with open(segment, "rb") as f:
+            yield from _entries(f, q)
+        return
+    index = _read_index(segment)
+    if index is None:
+        return  # still being compressed: its index is written last
+    if not q.may_match(index):
+        return
+    decompress = codec(index["compression"])[1]
+    with open(segment, "rb") as f:
+        for block in index["blocks"]:
+            if not q.may_match(block):
+                continue
+            f.seek(block["offset"])
+            yield from _entries(decompress(f.read(block["length"])).splitlines(), q)
+
+
+def query(log_file: Path, q: LogQuery) -> Iterator[dict[str, Any]]:
+    """Matching records from the rotated segments and the active file, oldest first."""
+    for segment in segments(log_file):
+        yield from _query_segment(segment, q)
+    try:
+        f = open(log_file, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        yield from _entries(f, q)
+
+
+def parse_since(spec: str, now: float | None = None) -> float:
+    """A duration ago ("90m", "1h") or an ISO date/time (local unless it has an offset)."""
+    from tomatempo.timer import parse_duration
+
+    try:
+        return (time.time() if now is None else now) - parse_duration(spec)
+    except ValueError:
+        pass
+    try:
+        return dt.datetime.fromisoformat(spec).timestamp()
+    except ValueError:
+        raise ValueError(f"invalid time {spec!r}. Use e.g. 1h, 30m or 2025-01-31T10:00.") from None
@@ -0,0 +1,324 @@
+"""
+Content-addressed store for note attachments.
+
+Files live under <data_dir>/media/<2 hex>/<sha256><suffix>, named by the
+SHA-256 of the source file. The hash is computed by streaming the file, and
+a file already in the store is found before anything is copied.
+
+JPEG and PNG files lose their metadata on the way in (APP1 Exif/XMP, APP13
+IPTC and comments; eXIf, text and tIME chunks). The file is copied without
+those byte ranges, the image data is never decoded. The EXIF orientation
+goes too. Files with nothing to strip, and other formats, are reflinked
+or hardlinked into the store when it is on the same filesystem, else
+copied. A hardlink shares the inode with the source, so editing the source
+in place changes the attachment.
+
+Batches big enough to pay for it are ingested in a process pool, one file
+per task. Thumbnails (optional, they need Pillow) go to a ThumbnailCache in
+cache_dir, which evicts the least recently used ones past its size budget.
+"""
+
+import hashlib
+import importlib.util
+import logging
+import os
+import shutil
+import struct
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from multiprocessing import get_context
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Literal
+
+if TYPE_CHECKING:
+    # Pool workers import this module: keep pydantic out of them
+    from tomatempo.settings import MediaLink, Settings
+
+logger = logging.getLogger(__name__)
+
+MEDIA_DIR = "media"
+THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_SIZE = 256  # px, longest side
+CHUNK_SIZE = 1 << 20
+# Spawning the pool takes ~100 ms, about what hashing and copying 30-60 MB
+# takes on one core: worth it for thumbnails (decoding) or this much input
+POOL_MIN_BYTES = 64 << 20
+
+Stored = Literal["existing", "stripped", "reflink", "hardlink", "copy"]
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_DROP = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+_JPEG_DROP = {0xE1, 0xED, 0xFE}  # APP1 (Exif, XMP), APP13 (IPTC), COM
+_FICLONE = 0x40049409  # Linux ioctl: share the extents of another file
+
+
+class MediaError(RuntimeError):
+    """A file can't be attached (missing, or thumbnails without Pillow)."""
+
+
+@dataclass(frozen=True)
+class StoredMedia:
+    source: Path
+    digest: str  # SHA-256 of the source
+    path: Path
+    size: int
+    stored: Stored
+    thumbnail: Path | None = None
+
+
+def file_digest(path: Path) -> tuple[str, int]:
+    """SHA-256 (hex) and size of a file, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def metadata_ranges(path: Path) -> list[tuple[int, int]]:
+    """Byte ranges (start, end) holding metadata in a JPEG or PNG file."""
+    with open(path, "rb") as f:
+        head = f.read(8)
+        if head.startswith(b"\xff\xd8"):
+            return _jpeg_ranges(f)
+        if head == _PNG_SIGNATURE:
+            return _png_ranges(f)
+    return []
+
+
+def _jpeg_ranges(f: IO[bytes]) -> list[tuple[int, int]]:
+    ranges = []
+    f.seek(2)
+    while True:
+        start = f.tell()
+        if f.read(1) != b"\xff":
+            break  # not a marker: leave the rest alone
+        while (byte := f.read(1)) == b"\xff":
+            pass  # fill bytes
+        if not byte or byte in (b"\xda", b"\xd9"):
+            break  # start of scan (image data) or end of image
+        marker = byte[0]
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            continue  # no length
+        if len(data := f.read(2)) < 2:
+            break
+        (length,) = struct.unpack(">H", data)
+        end = f.tell() + length - 2
+        if marker in _JPEG_DROP:
+            ranges.append((start, end))
+        f.seek(end)
+    return ranges
+
+
+def _png_ranges(f: IO[bytes]) -> list[tuple[int, int]]:
+    ranges = []
+    while len(header := f.read(8)) == 8:
+        length, kind = struct.unpack(">I4s", header)
+        start = f.tell() - 8
+        end = start + 12 + length  # length, type, data, CRC
+        if kind in _PNG_DROP:
+            ranges.append((start, end))
+        if kind == b"IEND":
+            break
+        f.seek(end)
+    return ranges
+
+
+def copy_without(source: Path, target: Path, ranges: list[tuple[int, int]]) -> None:
+    """Copy `source` to `target` leaving out the byte ranges."""
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        for start, end in ranges:
+            left = start - src.tell()
+            while left > 0 and (chunk := src.read(min(left, CHUNK_SIZE))):
+                dst.write(chunk)
+                left -= len(chunk)
+            src.seek(end)
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:  # other filesystem, or no reflinks (ext4, tmpfs)
+            return False
+    return True
+
+
+def _place(source: Path, target: Path, ranges: list[tuple[int, int]], link: "MediaLink") -> Stored:
+    """Write `source` (less `ranges`) at `target` through a temporary file."""
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    stored: Stored = "copy"
+    try:
+        if ranges:
+            copy_without(source, tmp, ranges)
+            stored = "stripped"
+        elif link == "reflink" and _reflink(source, tmp):
+            stored = "reflink"
+        elif link == "hardlink":
+            try:
+                os.link(source, tmp)
+                stored = "hardlink"
+            except OSError:  # e.g. another filesystem
+                pass
+        if stored == "copy":
+            shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return stored
+
+
+def ingest_file(
+    source: Path,
+    root: Path,
+    strip_exif: bool = True,
+    link: "MediaLink" = "reflink",
+    thumbnails: "ThumbnailCache | None" = None,
+) -> StoredMedia:
+    """Store one file under `root` (unless it's there already)."""
+    digest, size = file_digest(source)
+    target = root / digest[:2] / (digest + source.suffix.lower())
+    if target.exists():
+        stored: Stored = "existing"
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        ranges = metadata_ranges(source) if strip_exif else []
+        stored = _place(source, target, ranges, link)
+    thumbnail = thumbnails.ensure(digest, source) if thumbnails is not None else None
+    return StoredMedia(source, digest, target, size, stored, thumbnail)
+
+
+@dataclass(frozen=True)
+class ThumbnailCache:
+    """
+    PNG thumbnails by source digest. Reads refresh a file's mtime, and
+    evict() removes the oldest files until the cache fits in `budget` bytes.
+    """
+
+    root: Path
+    budget: int
+    size: int = THUMBNAIL_SIZE
+
+    def path(self, digest: str) -> Path:
+        return self.root / f"{digest}-{self.size}.png"
+
+    def get(self, digest: str) -> Path | None:
+        path = self.path(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def ensure(self, digest: str, source: Path) -> Path | None:
+        """The thumbnail of `source`, made if needed; None if it isn't an image."""
+        if (path := self.get(digest)) is not None:
+            return path
+        from PIL import (  # type: ignore[import-not-found, unused-ignore]
+            Image,
+            ImageOps,
+            UnidentifiedImageError,
+        )
+
+        path = self.path(digest)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with Image.open(source) as image:
+                thumb = ImageOps.exif_transpose(image)
+                thumb.thumbnail((self.size, self.size))
+                if thumb.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+                    thumb = thumb.convert("RGB")
+                thumb.save(tmp, "PNG")
+            os.replace(tmp, path)
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            return None
+        finally:
+            tmp.unlink(missing_ok=True)
+        return path
+
+    def evict(self) -> int:
+        """Remove least recently used thumbnails past the budget; returns how many."""
+        try:
+            entries = [
+                (e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in os.scandir(self.root)
+            ]
+        except FileNotFoundError:
+            return 0
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.budget:
+                break
+            Path(path).unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+class MediaStore:
+    def __init__(
+        self,
+        root: Path,
+        *,
+        strip_exif: bool = True,
+        link: "MediaLink" = "reflink",
+        thumbnails: ThumbnailCache | None = None,
+        workers: int | None = None,
+    ):
+        if thumbnails is not None and importlib.util.find_spec("PIL") is None:
+            raise MediaError("thumbnails need Pillow (pip install pillow)")
+        self.root = root
+        self.strip_exif = strip_exif
+        self.link = link
+        self.thumbnails = thumbnails
+        self.workers = workers or os.cpu_count() or 1
+
+    @classmethod
+    def from_settings(cls, settings: "Settings") -> "MediaStore":
+        thumbnails = None
+        if settings.media_thumbnails:
+            thumbnails = ThumbnailCache(
+                settings.cache_dir / THUMBNAIL_DIR, settings.media_thumbnail_cache_mb << 20
+            )
+        return cls(
+            settings.ensure_dir(settings.data_dir / MEDIA_DIR),
+            strip_exif=settings.media_strip_exif,
+            link=settings.media_link,
+            thumbnails=thumbnails,
+        )
+
+    def ingest(self, paths: Sequence[Path]) -> list[StoredMedia]:
+        """Store the files, in a process pool when the batch is worth it."""
+        missing = [str(p) for p in paths if not p.is_file()]
+        if missing:
+            raise MediaError(f"not a file: {', '.join(missing)}")
+        args = (repeat(self.root), repeat(self.strip_exif), repeat(self.link))
+        if self._use_pool(paths):
+            with ProcessPoolExecutor(
+                min(self.workers, len(paths)), mp_context=get_context("spawn")
+            ) as pool:
+                results = list(pool.map(ingest_file, paths, *args, repeat(self.thumbnails)))
+        else:
+            results = list(map(ingest_file, paths, *args, repeat(self.thumbnails)))
+        if self.thumbnails is not None:
+            self.thumbnails.evict()
+        logger.debug(
+            "media ingested",
+            extra={"files": len(results), "stored": [r.stored for r in results]},
+        )
+        return results
+
+    def _use_pool(self, paths: Sequence[Path]) -> bool:
+        if self.workers < 2 or len(paths) < 2:
+            return False
+        return self.thumbnails is not None or sum(p.stat().st_size for p in paths) >= POOL_MIN_BYTES
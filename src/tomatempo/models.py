@@ -0,0 +1,166 @@
+"""
+Database tables (SQLModel).
+
+Timestamps are UTC epoch seconds, like everywhere else in the timer.
+"""
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class Slice(SQLModel, table=True):
+    """A closed run of the timer. task_id NULL means the Time Pool."""
+
+    __tablename__ = "slices"
+
+    id: int | None = Field(default=None, primary_key=True)
+    task_id: int | None = Field(default=None, index=True)
+    start_ts: int = Field(index=True)
+    end_ts: int
+    type: str = "work"  # work | break
+    origin: str = "auto"  # auto | manual | import
+
+
+# ------- Hierarchy: Project -> Initiative -> Deliverable -> Task ------
+
+
+class Project(SQLModel, table=True):
+    __tablename__ = "projects"
+
+    id: int | None = Field(default=None, primary_key=True)
+    name: str
+    status: str = "active"
+
+
+class Initiative(SQLModel, table=True):
+    __tablename__ = "initiatives"
+
+    id: int | None = Field(default=None, primary_key=True)
+    project_id: int = Field(foreign_key="projects.id", index=True)
+    name: str
+    status: str = "active"
+
+
+class Deliverable(SQLModel, table=True):
+    __tablename__ = "deliverables"
+
+    id: int | None = Field(default=None, primary_key=True)
+    initiative_id: int = Field(foreign_key="initiatives.id", index=True)
+    name: str
+    status: str = "open"
+
+
+class Task(SQLModel, table=True):
+    __tablename__ = "tasks"
+
+    id: int | None = Field(default=None, primary_key=True)
+    deliverable_id: int | None = Field(default=None, foreign_key="deliverables.id", index=True)
+    name: str
+    status: str = "todo"
+
+
+class HierarchyLink(SQLModel, table=True):
+    """
+    Closure of the hierarchy (see tomatempo.hierarchy): one row per ancestor
+    and descendant, every entity being its own ancestor at depth 0.
+    """
+
+    __tablename__ = "hierarchy"
+    # The primary key finds descendants; this one ancestors
+    __table_args__ = (Index("ix_hierarchy_descendant", "descendant_type", "descendant_id"),)
+
+    ancestor_type: str = Field(primary_key=True)
+    ancestor_id: int = Field(primary_key=True)
+    descendant_type: str = Field(primary_key=True)
+    descendant_id: int = Field(primary_key=True)
+    depth: int
+
+
+class Rollup(SQLModel, table=True):
+    """
+    Materialized work time per entity (see tomatempo.rollups). entity_type is
+    pool|task|deliverable|initiative|project; the pool has entity_id 0.
+    """
+
+    __tablename__ = "rollups"
+
+    entity_type: str = Field(primary_key=True)
+    entity_id: int = Field(primary_key=True)
+    seconds: int = 0
+    tomatoes: int = 0
+    remainder: int = 0  # seconds - tomatoes * tomato length
+
+
+class SliceBucket(SQLModel, table=True):
+    """
+    Day buckets a slice overlaps (see tomatempo.ranges): a range query looks
+    up its days here instead of scanning slices by start_ts.
+    """
+
+    __tablename__ = "slice_buckets"
+
+    bucket: int = Field(primary_key=True)  # UTC day: ts // 86400
+    slice_id: int = Field(primary_key=True, foreign_key="slices.id", index=True)
+
+
+class ImportRun(SQLModel, table=True):
+    """
+    Progress of a `tomatempo import`, updated in the transaction of each
+    batch: an interrupted import resumes after the last committed row.
+    """
+
+    __tablename__ = "imports"
+
+    id: int | None = Field(default=None, primary_key=True)
+    checksum: str = Field(unique=True)  # sha256 of the input file
+    source: str
+    format: str
+    rows_read: int = 0  # input records consumed, valid or not
+    inserted: int = 0
+    skipped: int = 0
+    finished: bool = False
+
+
+class Revision(SQLModel, table=True):
+    """
+    Counters that triggers bump when some data changes, so that caches built
+    from it (e.g. the name index, see tomatempo.names) can tell they are stale.
+    """
+
+    __tablename__ = "revisions"
+
+    key: str = Field(primary_key=True)
+    value: int = 0
+
+
+# ------- Notes ------
+
+
+class Note(SQLModel, table=True):
+    """
+    Markdown text on a project, initiative, deliverable or task. On SQLite
+    the notes_fts index (see tomatempo.search) follows it through triggers.
+    """
+
+    __tablename__ = "notes"
+
+    id: int | None = Field(default=None, primary_key=True)
+    entity_type: str = Field(index=True)  # project | initiative | deliverable | task
+    entity_id: int = Field(index=True)
+    body: str
+    tags: str = ""  # comma separated
+    pinned: bool = False
+    created_ts: int
+    updated_ts: int
+
+
+class NoteAttachment(SQLModel, table=True):
+    """A file in the media store (see tomatempo.media) attached to a note."""
+
+    __tablename__ = "note_attachments"
+
+    note_id: int = Field(primary_key=True, foreign_key="notes.id")
+    digest: str = Field(primary_key=True, index=True)  # sha256 of the file
+    name: str  # file name as attached
+    path: str  # in the media dir
+    size: int
@@ -0,0 +1,385 @@
+"""
+Name resolution for projects, initiatives, deliverables and tasks.
+
+Commands take an entity as `12` (an id, used as given), `"Extract quotes"`
+(the exact name, ignoring case and accents) or `~xtrct quot` (fuzzy: names
+starting with it first, then ranked by shared trigrams). A name that fits
+more than one entity is an error listing the candidates.
+
+Names are looked up in an index persisted in cache_dir: the names of each
+kind sorted for prefix lookups (shell completion) and a trigram -> entries
+map for fuzzy ones. It is loaded with marshal and only rebuilt when the
+database changed: on SQLite, triggers bump the 'names' row of the revisions
+table when a name is added, changed or removed, and checking it is one
+query through the sqlite3 module, no SQLAlchemy. Other databases use the
+event counter (see tomatempo.events) instead.
+"""
+
+import bisect
+import heapq
+import marshal
+import os
+import sqlite3
+import unicodedata
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import click
+from click.shell_completion import CompletionItem
+
+if TYPE_CHECKING:
+    from sqlalchemy import Connection
+
+    from tomatempo.settings import Settings
+
+INDEX_FILE = "names.index"
+FORMAT = 1  # bump when the index layout changes
+MIN_SIMILARITY = 0.3  # Dice coefficient of the trigram sets
+AMBIGUITY_MARGIN = 0.1  # a fuzzy best match must beat the next one by this
+CANDIDATES = 5  # listed in an ambiguity error
+
+_TABLES = {
+    "project": "projects",
+    "initiative": "initiatives",
+    "deliverable": "deliverables",
+    "task": "tasks",
+}
+
+
+class ResolveError(ValueError):
+    """A name that matches no entity, or more than one."""
+
+    def __init__(self, message: str, candidates: Iterable["Match"] = ()):
+        self.candidates = list(candidates)
+        if self.candidates:
+            message += "\n" + "\n".join(f"  {m.id:>6}  {m.name}" for m in self.candidates)
+        super().__init__(message)
+
+
+@dataclass(frozen=True)
+class Match:
+    kind: str
+    id: int
+    name: str
+    score: float = 1.0  # trigram similarity; 1.0 for exact and prefix lookups
+
+
+def fold(name: str) -> str:
+    """Lowercase, no accents, single spaces: the form names are compared in."""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+def trigrams(folded: str) -> set[str]:
+    """Trigrams of each word, padded so that word starts weigh more."""
+    return {
+        padded[i : i + 3]
+        for word in folded.split()
+        for padded in [f"  {word} "]
+        for i in range(len(padded) - 2)
+    }
+
+
+class _Names:
+    """The names of one kind, sorted by their folded form."""
+
+    def __init__(
+        self, ids: array, names: list[str], folded: list[str], sizes: array, grams: dict[str, bytes]
+    ):
+        self.ids = ids
+        self.names = names
+        self.folded = folded
+        self.sizes = sizes  # trigrams per name
+        self.grams = grams  # trigram -> positions, as array("I") bytes
+
+    @classmethod
+    def build(cls, rows: Iterable[tuple[int, str]]) -> "_Names":
+        entries = sorted((fold(name), entity_id, name) for entity_id, name in rows)
+        postings: dict[str, array] = {}
+        sizes = array("H")
+        for pos, (folded, _, _) in enumerate(entries):
+            grams = trigrams(folded)
+            sizes.append(min(len(grams), 0xFFFF))
+            for gram in grams:
+                postings.setdefault(gram, array("I")).append(pos)
+        return cls(
+            array("q", (e[1] for e in entries)),
+            [e[2] for e in entries],
+            [e[0] for e in entries],
+            sizes,
+            {gram: positions.tobytes() for gram, positions in postings.items()},
+        )
+
+    @classmethod
+    def load(cls, data: dict[str, Any]) -> "_Names":
+        ids, sizes = array("q"), array("H")
+        ids.frombytes(data["ids"])
+        sizes.frombytes(data["sizes"])
+        return cls(ids, data["names"], data["folded"], sizes, data["grams"])
+
+    def dump(self) -> dict[str, Any]:
+        return {
+            "ids": self.ids.tobytes(),
+            "names": self.names,
+            "folded": self.folded,
+            "sizes": self.sizes.tobytes(),
+            "grams": self.grams,
+        }
+
+    def exact(self, folded: str) -> range:
+        return range(
+            bisect.bisect_left(self.folded, folded), bisect.bisect_right(self.folded, folded)
+        )
+
+    def prefix(self, folded: str, limit: int) -> range:
+        start = bisect.bisect_left(self.folded, folded)
+        end = start
+        while end < min(start + limit, len(self.folded)) and self.folded[end].startswith(folded):
+            end += 1
+        return range(start, end)
+
+    def fuzzy(self, query: str, limit: int) -> list[tuple[float, int]]:
+        """
+        (score, position) of the best matches: names starting with the query
+        (score 1.0, the exact one first), then by trigram similarity.
+        """
+        folded = fold(query)
+        first = [(1.0, pos) for pos in self.prefix(folded, limit)] if folded else []
+        grams = trigrams(folded)
+        if not grams or len(first) >= limit:
+            return first
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            if (posting := self.grams.get(gram)) is not None:
+                positions = array("I")
+                positions.frombytes(posting)
+                shared.update(positions)
+        # Dice >= MIN_SIMILARITY needs this many shared trigrams at least
+        least = MIN_SIMILARITY * (len(grams) + 1) / 2
+        total, sizes = len(grams), self.sizes
+        best = heapq.nlargest(
+            limit,
+            (
+                (2 * count / (total + sizes[pos]), pos)
+                for pos, count in shared.items()
+                if count >= least
+            ),
+        )
+        seen = {pos for _, pos in first}
+        rest = [(score, pos) for score, pos in best if score >= MIN_SIMILARITY and pos not in seen]
+        return (first + rest)[:limit]
+
+
+class NameIndex:
+    """Names of every kind, as of `revision` of the database."""
+
+    def __init__(self, database: str, revision: int, kinds: dict[str, _Names]):
+        self.database = database
+        self.revision = revision
+        self.kinds = kinds
+
+    @classmethod
+    def build(cls, conn: "Connection", settings: "Settings") -> "NameIndex":
+        from sqlalchemy import text
+
+        # Read first: a rename landing in between makes the index look stale, not fresh
+        revision = read_revision(conn, settings)
+        kinds = {
+            kind: _Names.build(
+                (row[0], row[1]) for row in conn.execute(text(f"SELECT id, name FROM {table}"))
+            )
+            for kind, table in _TABLES.items()
+        }
+        return cls(settings.database_url, revision, kinds)
+
+    @classmethod
+    def load(cls, path: Path) -> "NameIndex | None":
+        """The index saved at `path`; None if missing or unreadable."""
+        try:
+            data = marshal.loads(path.read_bytes())
+            if data["format"] != FORMAT:
+                return None
+            kinds = {kind: _Names.load(names) for kind, names in data["kinds"].items()}
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            return None
+        return cls(data["database"], data["revision"], kinds)
+
+    def save(self, path: Path) -> None:
+        data = {
+            "format": FORMAT,
+            "database": self.database,
+            "revision": self.revision,
+            "kinds": {kind: names.dump() for kind, names in self.kinds.items()},
+        }
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(marshal.dumps(data))
+        os.replace(tmp, path)
+
+    def _names(self, kind: str) -> _Names:
+        return self.kinds.get(kind) or _Names.build([])
+
+    def _match(self, kind: str, pos: int, score: float = 1.0) -> Match:
+        names = self._names(kind)
+        return Match(kind, names.ids[pos], names.names[pos], score)
+
+    def matches(self, kind: str, query: str, limit: int = CANDIDATES) -> list[Match]:
+        """Fuzzy matches for `query`, best first."""
+        return [
+            self._match(kind, pos, score) for score, pos in self._names(kind).fuzzy(query, limit)
+        ]
+
+    def lookup(self, kind: str, ref: str) -> int:
+        """The id `ref` (id, "exact name" or ~fuzzy name) refers to."""
+        ref = ref.strip()
+        if ref.isdigit():
+            return int(ref)
+        if ref.startswith("~"):
+            return self._lookup_fuzzy(kind, ref[1:].strip())
+        if len(ref) > 1 and ref[0] == ref[-1] and ref[0] in "\"'":
+            ref = ref[1:-1]
+        found = [self._match(kind, pos) for pos in self._names(kind).exact(fold(ref))]
+        if len(found) == 1:
+            return found[0].id
+        if found:
+            raise ResolveError(f'{kind} "{ref}" is ambiguous, use an id:', found[:CANDIDATES])
+        raise ResolveError(f'no {kind} named "{ref}"', self.matches(kind, ref))
+
+    def _lookup_fuzzy(self, kind: str, query: str) -> int:
+        ranked = self._names(kind).fuzzy(query, CANDIDATES)
+        if not ranked:
+            raise ResolveError(f'no {kind} like "{query}"')
+        folded = fold(query)
+        names = self._names(kind).folded
+        exact = [pos for _, pos in ranked if names[pos] == folded]
+        if len(exact) == 1:
+            return self._match(kind, exact[0]).id
+        if not exact and (len(ranked) == 1 or ranked[0][0] - ranked[1][0] >= AMBIGUITY_MARGIN):
+            return self._match(kind, ranked[0][1]).id
+        candidates = [self._match(kind, pos, score) for score, pos in ranked]
+        raise ResolveError(f'{kind} "~{query}" is ambiguous:', candidates)
+
+    def complete(self, kind: str, incomplete: str, limit: int = 50) -> list[Match]:
+        """Names for shell completion: fuzzy after `~`, otherwise by prefix."""
+        if incomplete.startswith("~"):
+            return self.matches(kind, incomplete[1:], limit)
+        names = self._names(kind)
+        return [
+            self._match(kind, pos) for pos in names.prefix(fold(incomplete.lstrip("\"'")), limit)
+        ]
+
+
+# ------- Revisions ------
+
+
+def create(conn: "Connection") -> None:
+    """Add the names revision, and the triggers that bump it on SQLite."""
+    from sqlalchemy import text
+
+    conn.execute(text("INSERT INTO revisions (key, value) VALUES ('names', 0)"))
+    if conn.dialect.name != "sqlite":
+        return
+    bump = "UPDATE revisions SET value = value + 1 WHERE key = 'names';"
+    for kind, table in _TABLES.items():
+        for event in ("INSERT", "DELETE", "UPDATE OF name"):
+            name = f"names_{kind}_{event.split()[0].lower()}"
+            conn.execute(text(f"CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN {bump} END"))
+
+
+def read_revision(conn: "Connection", settings: "Settings") -> int:
+    from sqlalchemy import text
+
+    if conn.dialect.name != "sqlite":
+        return _event_count(settings)
+    row = conn.execute(text("SELECT value FROM revisions WHERE key = 'names'")).first()
+    return 0 if row is None else row[0]
+
+
+def sqlite_file(database_url: str) -> Path | None:
+    """The file of a sqlite:/// URL (parsed by hand: SQLAlchemy is slow to import)."""
+    scheme, sep, rest = database_url.partition(":///")
+    path = rest.split("?")[0]
+    if scheme.split("+")[0] != "sqlite" or not sep or path in ("", ":memory:"):
+        return None
+    return Path(path)
+
+
+def _event_count(settings: "Settings") -> int:
+    from tomatempo.events import EventFeed
+
+    return EventFeed.from_settings(settings).counter().value
+
+
+def current_revision(settings: "Settings") -> int | None:
+    """The names revision of the database; None if it can't be read cheaply."""
+    if not settings.database_url.startswith("sqlite"):
+        return _event_count(settings)
+    path = sqlite_file(settings.database_url)
+    if path is None or not path.exists():
+        return None
+    try:
+        conn = sqlite3.connect(f"{path.absolute().as_uri()}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM revisions WHERE key = 'names'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:  # a database from before the revisions table
+        return None
+    return None if row is None else row[0]
+
+
+def get_index(settings: "Settings | None" = None) -> NameIndex:
+    """The name index of the database, rebuilt (and saved) if out of date."""
+    if settings is None:
+        # Here, not at import: ids are resolved without the settings stack
+        from tomatempo.settings import get_settings
+
+        settings = get_settings()
+    path = settings.cache_dir / INDEX_FILE
+    index = NameIndex.load(path)
+    revision = current_revision(settings)
+    if index is not None and index.database == settings.database_url and index.revision == revision:
+        return index
+
+    from tomatempo.db import database_exists, get_engine
+
+    if not database_exists(settings):
+        return NameIndex(settings.database_url, 0, {})
+    with get_engine(settings).connect() as conn:
+        index = NameIndex.build(conn, settings)
+    settings.ensure_dir(path.parent)
+    index.save(path)
+    return index
+
+
+def resolve(kind: str, ref: str, settings: "Settings | None" = None) -> int:
+    """The id of the `kind` entity `ref` refers to; ResolveError if none or several."""
+    ref = ref.strip()
+    if ref.isdigit():  # ids don't need the index
+        return int(ref)
+    return get_index(settings).lookup(kind, ref)
+
+
+class EntityRef(click.ParamType):
+    """Click type for an id, "exact name" or ~fuzzy name; converts to the id."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.name = kind
+
+    def convert(self, value: Any, param: click.Parameter | None, ctx: click.Context | None) -> int:
+        if isinstance(value, int):
+            return value
+        try:
+            return resolve(self.kind, value)
+        except ResolveError as e:
+            self.fail(str(e), param, ctx)
+
+    def shell_complete(
+        self, ctx: click.Context, param: click.Parameter, incomplete: str
+    ) -> list[CompletionItem]:
+        matches = get_index().complete(self.kind, incomplete)
+        return [CompletionItem(m.name, help=f"{m.kind} {m.id}") for m in matches]
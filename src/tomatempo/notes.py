@@ -0,0 +1,81 @@
+"""
+Notes on projects, initiatives, deliverables and tasks.
+
+Attachments are stored in the media store first (see tomatempo.media), then
+the note and its attachment rows are inserted in one transaction.
+"""
+
+import time
+from collections.abc import Sequence
+from typing import Literal, get_args
+
+from sqlalchemy import Connection, insert, text
+
+from tomatempo.media import StoredMedia
+from tomatempo.models import Note, NoteAttachment
+
+EntityType = Literal["project", "initiative", "deliverable", "task"]
+
+_TABLES: dict[EntityType, str] = {
+    "project": "projects",
+    "initiative": "initiatives",
+    "deliverable": "deliverables",
+    "task": "tasks",
+}
+
+
+class NoteError(ValueError):
+    """Invalid note (e.g. on an entity that doesn't exist)."""
+
+
+def parse_tags(text: str | None) -> str:
+    """Comma separated tags, trimmed and without duplicates."""
+    tags = dict.fromkeys(t.strip() for t in (text or "").split(","))
+    return ",".join(t for t in tags if t)
+
+
+def add_note(
+    conn: Connection,
+    entity_type: EntityType,
+    entity_id: int,
+    body: str,
+    tags: str = "",
+    pinned: bool = False,
+    attachments: Sequence[StoredMedia] = (),
+) -> int:
+    """Insert a note (and its attachments); returns the note id."""
+    if entity_type not in get_args(EntityType):
+        raise NoteError(f"invalid entity type {entity_type}. Use {list(get_args(EntityType))}.")
+    if not body.strip():
+        raise NoteError("empty note")
+    exists = conn.execute(
+        text(f"SELECT 1 FROM {_TABLES[entity_type]} WHERE id = :id"), {"id": entity_id}
+    ).first()
+    if exists is None:
+        raise NoteError(f"{entity_type} {entity_id} not found")
+
+    now = int(time.time())
+    note_id = conn.execute(
+        insert(Note).values(
+            entity_type=entity_type,
+            entity_id=entity_id,
+            body=body,
+            tags=parse_tags(tags),
+            pinned=pinned,
+            created_ts=now,
+            updated_ts=now,
+        )
+    ).inserted_primary_key[0]  # type: ignore[index]
+    rows = {
+        media.digest: {
+            "note_id": note_id,
+            "digest": media.digest,
+            "name": media.source.name,
+            "path": str(media.path),
+            "size": media.size,
+        }
+        for media in attachments
+    }
+    if rows:
+        conn.execute(insert(NoteAttachment), list(rows.values()))
+    return note_id
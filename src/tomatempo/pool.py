@@ -0,0 +1,94 @@
+"""
+Time Pool assignment.
+
+assign() gives pool work time to a task and reassign() moves it between
+tasks. Slices are taken oldest first and the last one is split when only
+part of it is needed, so time is moved, never copied. Rollups and the day
+buckets are updated in the same transaction.
+"""
+
+from sqlalchemy import Connection, text
+
+from tomatempo.ranges import index_slices, reindex_slice
+from tomatempo.rollups import TomatoRules, apply_slice
+
+
+class AssignError(ValueError):
+    """Invalid assignment (e.g. more time than the source has)."""
+
+
+def _owner(task_id: int | None) -> str:
+    return "task_id IS NULL" if task_id is None else "task_id = :owner"
+
+
+def balance(conn: Connection, task_id: int | None) -> int:
+    """Work seconds owned by a task, or by the pool for None."""
+    return conn.execute(
+        text(
+            f"SELECT coalesce(sum(end_ts - start_ts), 0) FROM slices"
+            f" WHERE type = 'work' AND {_owner(task_id)}"
+        ),
+        {"owner": task_id},
+    ).scalar_one()
+
+
+def move(
+    conn: Connection,
+    rules: TomatoRules,
+    seconds: int,
+    from_task: int | None,
+    to_task: int | None,
+) -> None:
+    """Move `seconds` of work time from one owner to another."""
+    if seconds <= 0:
+        raise AssignError("nothing to move")
+    if from_task == to_task:
+        raise AssignError("source and target are the same")
+    available = balance(conn, from_task)
+    if available < seconds:
+        raise AssignError(f"only {available}s available, {seconds}s requested")
+
+    rows = conn.execute(
+        text(
+            f"SELECT id, start_ts, end_ts, origin FROM slices"
+            f" WHERE type = 'work' AND {_owner(from_task)} ORDER BY start_ts, id"
+        ),
+        {"owner": from_task},
+    )
+    left = seconds
+    for slice_id, start_ts, end_ts, origin in rows.fetchall():
+        duration = end_ts - start_ts
+        taken = min(duration, left)
+        conn.execute(
+            text("UPDATE slices SET task_id = :task, end_ts = :end WHERE id = :id"),
+            {"task": to_task, "end": start_ts + taken, "id": slice_id},
+        )
+        apply_slice(conn, rules, from_task, -duration)
+        apply_slice(conn, rules, to_task, taken)
+        if taken < duration:
+            # The rest of the slice stays with its owner
+            reindex_slice(conn, slice_id, start_ts, start_ts + taken)
+            rest_id = conn.execute(
+                text(
+                    "INSERT INTO slices (task_id, start_ts, end_ts, type, origin)"
+                    " VALUES (:task, :start, :end, 'work', :origin) RETURNING id"
+                ),
+                {"task": from_task, "start": start_ts + taken, "end": end_ts, "origin": origin},
+            ).scalar_one()
+            index_slices(conn, [(rest_id, start_ts + taken, end_ts)])
+            apply_slice(conn, rules, from_task, duration - taken)
+        left -= taken
+        if not left:
+            break
+
+
+def assign(conn: Connection, rules: TomatoRules, seconds: int, task_id: int) -> None:
+    """Give `seconds` of Time Pool work to a task."""
+    move(conn, rules, seconds, None, task_id)
+
+
+def reassign(
+    conn: Connection, rules: TomatoRules, seconds: int, from_task: int, to_task: int
+) -> None:
+    """Move `seconds` of work from one task to another."""
+    move(conn, rules, seconds, from_task, to_task)
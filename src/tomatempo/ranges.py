@@ -0,0 +1,145 @@
+"""
+Time ranges and the range-query layer over slices.
+
+A plain index on slices.start_ts can't find the slices that start before a
+window and end inside it without scanning everything before the window.
+Instead, every slice is listed in slice_buckets under each UTC day it
+overlaps, and a range query reads the slices of the window's days only.
+Partial overlaps are clipped to the window in SQL.
+
+Queries stick to SQL that SQLite and Postgres both run (CASE instead of the
+two-argument min/max, which Postgres spells LEAST/GREATEST).
+"""
+
+from collections.abc import Iterable
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import Connection, text
+
+from tomatempo.settings import WeekStart
+
+BUCKET_SECONDS = 86_400
+
+# Ids of the slices overlapping [:start, :end) on days :first..:last (see
+# window_params); the range queries here, in slices and in exports build on it
+OVERLAPPING_SQL = """
+SELECT id FROM slices
+WHERE id IN (SELECT slice_id FROM slice_buckets WHERE bucket BETWEEN :first AND :last)
+  AND end_ts > :start AND start_ts < :end
+"""
+
+_SECONDS_BY_TASK = text(f"""
+SELECT task_id, sum(
+    CASE WHEN end_ts < :end THEN end_ts ELSE :end END
+    - CASE WHEN start_ts > :start THEN start_ts ELSE :start END
+)
+FROM slices
+WHERE id IN ({OVERLAPPING_SQL}) AND (type = 'work' OR :breaks = 1)
+GROUP BY task_id
+""")
+
+
+def buckets(start: int, end: int) -> range:
+    """Day buckets overlapped by [start, end)."""
+    if end <= start:
+        return range(0)
+    return range(start // BUCKET_SECONDS, (end - 1) // BUCKET_SECONDS + 1)
+
+
+def index_slices(conn: Connection, spans: Iterable[tuple[int, int, int]]) -> None:
+    """Add (slice_id, start_ts, end_ts) to the bucket index."""
+    rows = [
+        {"bucket": bucket, "slice_id": slice_id}
+        for slice_id, start, end in spans
+        for bucket in buckets(start, end)
+    ]
+    if rows:
+        conn.execute(
+            text("INSERT INTO slice_buckets (bucket, slice_id) VALUES (:bucket, :slice_id)"), rows
+        )
+
+
+def reindex_slice(conn: Connection, slice_id: int, start: int, end: int) -> None:
+    """Refresh a slice's buckets after its bounds changed."""
+    conn.execute(text("DELETE FROM slice_buckets WHERE slice_id = :id"), {"id": slice_id})
+    index_slices(conn, [(slice_id, start, end)])
+
+
+def rebuild_index(conn: Connection) -> int:
+    """Rebuild the bucket index from the slices table; returns slices indexed."""
+    conn.execute(text("DELETE FROM slice_buckets"))
+    spans = [(i, s, e) for i, s, e in conn.execute(text("SELECT id, start_ts, end_ts FROM slices"))]
+    index_slices(conn, spans)
+    return len(spans)
+
+
+def window_params(start: int, end: int) -> dict[str, int]:
+    """Parameters of OVERLAPPING_SQL for a non-empty [start, end)."""
+    days = buckets(start, end)
+    return {"start": start, "end": end, "first": days.start, "last": days.stop - 1}
+
+
+def overlapping_ids(conn: Connection, start: int, end: int) -> list[int]:
+    """Ids of the slices overlapping [start, end), through the bucket index."""
+    if end <= start:
+        return []
+    return list(conn.execute(text(OVERLAPPING_SQL), window_params(start, end)).scalars())
+
+
+def seconds_by_task(
+    conn: Connection, start: int, end: int, include_breaks: bool = False
+) -> dict[int | None, int]:
+    """Slice-seconds inside [start, end) per task (None: the Time Pool)."""
+    if end <= start:
+        return {}
+    params = {**window_params(start, end), "breaks": int(include_breaks)}
+    return {task_id: int(seconds) for task_id, seconds in conn.execute(_SECONDS_BY_TASK, params)}
+
+
+# ------- Named ranges ------
+
+
+def _local_midnight(day: date) -> int:
+    return int(datetime.combine(day, time()).astimezone().timestamp())
+
+
+def parse_range(
+    spec: str, now: float | None = None, week_start: WeekStart = "monday"
+) -> tuple[int, int]:
+    """
+    [start, end) in UTC seconds for today, yesterday, this-week, last-week,
+    this-month, last-month, a day (2025-01-31) or days (2025-01-01..2025-01-31,
+    both included). Days are local calendar days.
+    """
+    today = datetime.fromtimestamp(now).date() if now is not None else date.today()
+    spec = spec.strip().lower()
+    one_day = timedelta(days=1)
+
+    if spec in ("today", "yesterday"):
+        first = today if spec == "today" else today - one_day
+        last = first
+    elif spec in ("this-week", "last-week"):
+        offset = today.weekday() if week_start == "monday" else (today.weekday() + 1) % 7
+        first = today - timedelta(days=offset)
+        if spec == "last-week":
+            first -= timedelta(days=7)
+        last = first + timedelta(days=6)
+    elif spec in ("this-month", "last-month"):
+        first = today.replace(day=1)
+        if spec == "last-month":
+            first = (first - one_day).replace(day=1)
+        last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - one_day
+    else:
+        try:
+            begin, _, finish = spec.partition("..")
+            first = date.fromisoformat(begin)
+            last = date.fromisoformat(finish) if finish else first
+        except ValueError:
+            raise ValueError(
+                f"invalid range {spec!r}. Use today, this-week, last-month, "
+                "2025-01-31 or 2025-01-01..2025-01-31."
+            ) from None
+        if last < first:
+            raise ValueError(f"invalid range {spec!r}: it ends before it starts")
+
+    return _local_midnight(first), _local_midnight(last + one_day)
@@ -0,0 +1,211 @@
+"""
+Materialized tomato counts.
+
+The rollups table keeps (seconds, tomatoes, remainder) of work time for the
+Time Pool, every task and, through the hierarchy, every deliverable,
+initiative and project. It is updated incrementally, in the transaction that
+writes the slices, so views never recount history. rebuild() recomputes it
+from the slices table and check() compares the two.
+
+Tomatoes are earned by tasks (or the pool); parents add up their children's
+seconds and tomatoes:
+
+- cumulative: a task has seconds // length tomatoes (49m = 1 tomato + 24m);
+- segment-strict: each slice counts on its own, so only full-length slices
+  earn tomatoes.
+
+Moving a task or a subtree (tomatempo.hierarchy.move) carries its counts
+from the old ancestors to the new ones.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from sqlalchemy import Connection, text
+
+from tomatempo.settings import CountingMode, Settings, get_settings
+
+POOL_KEY = ("pool", 0)
+
+_UPSERT = text("""
+INSERT INTO rollups (entity_type, entity_id, seconds, tomatoes, remainder)
+VALUES (:type, :id, :seconds, :tomatoes, :seconds - :tomatoes * :length)
+ON CONFLICT (entity_type, entity_id) DO UPDATE SET
+    seconds = rollups.seconds + :seconds,
+    tomatoes = rollups.tomatoes + :tomatoes,
+    remainder = rollups.seconds + :seconds - (rollups.tomatoes + :tomatoes) * :length
+""")
+
+_ANCESTORS = text("""
+SELECT d.id, i.id, p.id
+FROM tasks t
+LEFT JOIN deliverables d ON d.id = t.deliverable_id
+LEFT JOIN initiatives i ON i.id = d.initiative_id
+LEFT JOIN projects p ON p.id = i.project_id
+WHERE t.id = :task_id
+""")
+
+_TASK_TOTALS = text("""
+SELECT task_id, sum(end_ts - start_ts), sum((end_ts - start_ts) / :length)
+FROM slices
+WHERE type = 'work'
+GROUP BY task_id
+""")
+
+_HIERARCHY = text("""
+SELECT t.id, d.id, i.id, p.id
+FROM tasks t
+LEFT JOIN deliverables d ON d.id = t.deliverable_id
+LEFT JOIN initiatives i ON i.id = d.initiative_id
+LEFT JOIN projects p ON p.id = i.project_id
+""")
+
+EntityKey = tuple[str, int]
+
+
+class Counts(NamedTuple):
+    seconds: int
+    tomatoes: int
+    remainder: int
+
+
+@dataclass(frozen=True)
+class TomatoRules:
+    length: int = 25 * 60
+    mode: CountingMode = "cumulative"
+
+    @classmethod
+    def from_settings(cls, settings: Settings | None = None) -> "TomatoRules":
+        settings = settings or get_settings()
+        return cls(settings.tomato_length, settings.tomato_counting_mode)
+
+    def tomatoes_delta(self, task_seconds: int, seconds: int) -> int:
+        """
+        Tomatoes a task gains when a slice of `seconds` is added to the
+        `task_seconds` it already has (negative seconds: the slice is removed).
+        """
+        if self.mode == "segment-strict":
+            whole = abs(seconds) // self.length
+            return whole if seconds >= 0 else -whole
+        return (task_seconds + seconds) // self.length - task_seconds // self.length
+
+
+def _task_key(task_id: int | None) -> EntityKey:
+    return POOL_KEY if task_id is None else ("task", task_id)
+
+
+def _parent_keys(ids: Sequence[int | None]) -> list[EntityKey]:
+    """(deliverable, initiative, project) ids as keys, skipping missing levels."""
+    return [
+        (kind, entity_id)
+        for kind, entity_id in zip(("deliverable", "initiative", "project"), ids, strict=True)
+        if entity_id is not None
+    ]
+
+
+def _ancestors(conn: Connection, task_id: int | None) -> list[EntityKey]:
+    if task_id is None:
+        return []
+    row = conn.execute(_ANCESTORS, {"task_id": task_id}).first()
+    return [] if row is None else _parent_keys(row)
+
+
+def get_counts(conn: Connection, key: EntityKey) -> Counts:
+    row = conn.execute(
+        text(
+            "SELECT seconds, tomatoes, remainder FROM rollups"
+            " WHERE entity_type = :type AND entity_id = :id"
+        ),
+        {"type": key[0], "id": key[1]},
+    ).first()
+    return Counts(*row) if row is not None else Counts(0, 0, 0)
+
+
+def apply_slice(conn: Connection, rules: TomatoRules, task_id: int | None, seconds: int) -> None:
+    """
+    Add a work slice of `seconds` to its task (None: the pool) and the task's
+    ancestors; a negative `seconds` takes a slice of that length away.
+    """
+    if seconds == 0:
+        return
+    key = _task_key(task_id)
+    task_seconds = get_counts(conn, key).seconds
+    tomatoes = rules.tomatoes_delta(task_seconds, seconds)
+    add_counts(conn, rules, [key, *_ancestors(conn, task_id)], seconds, tomatoes)
+
+
+def add_counts(
+    conn: Connection, rules: TomatoRules, keys: Sequence[EntityKey], seconds: int, tomatoes: int
+) -> None:
+    """Add `seconds` and `tomatoes` (or take them away, if negative) to each key."""
+    if not (keys and (seconds or tomatoes)):
+        return
+    conn.execute(
+        _UPSERT,
+        [
+            {
+                "type": kind,
+                "id": entity_id,
+                "seconds": seconds,
+                "tomatoes": tomatoes,
+                "length": rules.length,
+            }
+            for kind, entity_id in keys
+        ],
+    )
+
+
+def recount(conn: Connection, rules: TomatoRules) -> dict[EntityKey, Counts]:
+    """Rollups computed from scratch out of the slices table."""
+    tasks: dict[EntityKey, tuple[int, int]] = {}
+    for task_id, seconds, strict in conn.execute(_TASK_TOTALS, {"length": rules.length}):
+        tomatoes = strict if rules.mode == "segment-strict" else seconds // rules.length
+        tasks[_task_key(task_id)] = (int(seconds), int(tomatoes))
+
+    parents = {row[0]: _parent_keys(row[1:]) for row in conn.execute(_HIERARCHY)}
+    totals = dict(tasks)
+    for (kind, task_id), (seconds, tomatoes) in tasks.items():
+        if kind != "task":
+            continue
+        for parent in parents.get(task_id, []):
+            old_seconds, old_tomatoes = totals.get(parent, (0, 0))
+            totals[parent] = (old_seconds + seconds, old_tomatoes + tomatoes)
+
+    return {
+        key: Counts(seconds, tomatoes, seconds - tomatoes * rules.length)
+        for key, (seconds, tomatoes) in totals.items()
+        if seconds
+    }
+
+
+def rebuild(conn: Connection, rules: TomatoRules) -> int:
+    """Replace the rollups with a full recount; returns the number of rows."""
+    counts = recount(conn, rules)
+    conn.execute(text("DELETE FROM rollups"))
+    if counts:
+        conn.execute(
+            text(
+                "INSERT INTO rollups (entity_type, entity_id, seconds, tomatoes, remainder)"
+                " VALUES (:type, :id, :seconds, :tomatoes, :remainder)"
+            ),
+            [{"type": k[0], "id": k[1], **c._asdict()} for k, c in counts.items()],
+        )
+    return len(counts)
+
+
+def check(conn: Connection, rules: TomatoRules) -> dict[EntityKey, tuple[Counts, Counts]]:
+    """Rows that differ from a full recount, as {key: (stored, expected)}."""
+    expected = recount(conn, rules)
+    stored = {
+        (kind, entity_id): Counts(*values)
+        for kind, entity_id, *values in conn.execute(
+            text("SELECT entity_type, entity_id, seconds, tomatoes, remainder FROM rollups")
+        )
+    }
+    zero = Counts(0, 0, 0)
+    return {
+        key: (stored.get(key, zero), expected.get(key, zero))
+        for key in stored.keys() | expected.keys()
+        if stored.get(key, zero) != expected.get(key, zero)
+    }
@@ -0,0 +1,185 @@
+"""
+Full-text search over notes.
+
+On SQLite, notes_fts is an FTS5 index over notes.body and notes.tags
+(external content: it stores the index, not a copy of the text). Triggers
+on notes keep it current, so writers don't know about it. Results are
+ranked by BM25, with tag matches weighted double, and get a snippet with
+the matches highlighted. A word ending in `*` matches as a prefix; the
+prefix='2 3' indexes make short prefixes cheap.
+
+Other databases (or SQLite built without FTS5) fall back to a
+case-insensitive LIKE per word over body and tags. That is a full scan and
+returns the most recently updated notes first.
+"""
+
+import re
+from dataclasses import dataclass
+
+from sqlalchemy import Connection, and_, func, or_, select, text
+from sqlalchemy.exc import OperationalError
+
+from tomatempo.models import Note
+
+FTS_TABLE = "notes_fts"
+
+_DDL = [
+    """
+    CREATE VIRTUAL TABLE notes_fts USING fts5(
+        body, tags,
+        content='notes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    # `ORDER BY rank` then uses these weights: body 1, tags 2
+    "INSERT INTO notes_fts (notes_fts, rank) VALUES ('rank', 'bm25(1.0, 2.0)')",
+    """
+    CREATE TRIGGER notes_fts_insert AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts (rowid, body, tags) VALUES (new.id, new.body, new.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER notes_fts_delete AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, body, tags)
+        VALUES ('delete', old.id, old.body, old.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER notes_fts_update AFTER UPDATE OF body, tags ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, body, tags)
+        VALUES ('delete', old.id, old.body, old.tags);
+        INSERT INTO notes_fts (rowid, body, tags) VALUES (new.id, new.body, new.tags);
+    END
+    """,
+]
+
+_SEARCH = text("""
+SELECT n.id, n.entity_type, n.entity_id,
+       snippet(notes_fts, -1, :open, :close, '…', :words), notes_fts.rank
+FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid
+WHERE notes_fts MATCH :query AND (:entity_type IS NULL OR n.entity_type = :entity_type)
+ORDER BY notes_fts.rank
+LIMIT :limit
+""")
+
+_WORD = re.compile(r"\w+\*?")
+SNIPPET_WORDS = 12
+
+
+@dataclass(frozen=True)
+class NoteHit:
+    note_id: int
+    entity_type: str
+    entity_id: int
+    snippet: str
+    rank: float = 0.0  # BM25, lower is better; 0 without FTS
+
+
+def words(query: str) -> list[str]:
+    """The words of a query; a trailing `*` marks a prefix."""
+    return _WORD.findall(query)
+
+
+def match_query(query: str) -> str:
+    """FTS5 query matching notes with every word (quoted: no operators)."""
+    return " ".join(f'"{w.rstrip("*")}"' + ("*" if w.endswith("*") else "") for w in words(query))
+
+
+def has_index(conn: Connection) -> bool:
+    if conn.dialect.name != "sqlite":
+        return False
+    found = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    return found is not None
+
+
+def create_index(conn: Connection) -> bool:
+    """
+    Create notes_fts and its triggers and index the existing notes. False
+    when the database can't have it (not SQLite, or no FTS5).
+    """
+    if conn.dialect.name != "sqlite":
+        return False
+    try:
+        for statement in _DDL:
+            conn.execute(text(statement))
+    except OperationalError:  # no such module: fts5
+        return False
+    rebuild(conn)
+    return True
+
+
+def rebuild(conn: Connection) -> int:
+    """Re-index every note; returns how many there are."""
+    conn.execute(text("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')"))
+    conn.execute(text("INSERT INTO notes_fts (notes_fts) VALUES ('optimize')"))
+    return conn.execute(text("SELECT count(*) FROM notes")).scalar_one()
+
+
+def search(
+    conn: Connection,
+    query: str,
+    entity_type: str | None = None,
+    limit: int = 20,
+    highlight: tuple[str, str] = ("**", "**"),
+) -> list[NoteHit]:
+    """Notes matching every word of `query`, best first."""
+    if not words(query):
+        return []
+    if not has_index(conn):
+        return _search_like(conn, query, entity_type, limit, highlight)
+    rows = conn.execute(
+        _SEARCH,
+        {
+            "query": match_query(query),
+            "entity_type": entity_type,
+            "limit": limit,
+            "open": highlight[0],
+            "close": highlight[1],
+            "words": SNIPPET_WORDS,
+        },
+    )
+    return [NoteHit(*row) for row in rows]
+
+
+def _search_like(
+    conn: Connection,
+    query: str,
+    entity_type: str | None,
+    limit: int,
+    highlight: tuple[str, str],
+) -> list[NoteHit]:
+    notes = Note.metadata.tables["notes"].c
+    terms = [w.rstrip("*").lower() for w in words(query)]
+    conditions = [
+        or_(
+            func.lower(notes.body).contains(t, autoescape=True),
+            func.lower(notes.tags).contains(t, autoescape=True),
+        )
+        for t in terms
+    ]
+    if entity_type is not None:
+        conditions.append(notes.entity_type == entity_type)
+    rows = conn.execute(
+        select(notes.id, notes.entity_type, notes.entity_id, notes.body)
+        .where(and_(*conditions))
+        .order_by(notes.updated_ts.desc(), notes.id.desc())
+        .limit(limit)
+    )
+    return [
+        NoteHit(note_id, kind, entity_id, make_snippet(body, terms, highlight))
+        for note_id, kind, entity_id, body in rows
+    ]
+
+
+def make_snippet(body: str, terms: list[str], highlight: tuple[str, str], width: int = 80) -> str:
+    """A window of `body` around the first term found, with the terms highlighted."""
+    lowered = body.lower()
+    first = min((i for t in terms if (i := lowered.find(t)) >= 0), default=0)
+    start = max(first - width // 3, 0)
+    window = body[start : start + width]
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+    marked = pattern.sub(lambda m: f"{highlight[0]}{m.group(0)}{highlight[1]}", window)
+    return ("…" if start else "") + marked + ("…" if start + width < len(body) else "")
@@ -1,14 +1,37 @@
+import hashlib
+import json
 import logging
+import os
+import types
 from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Annotated, Literal
+from typing import Annotated, Any, Literal, TypeVar, Union, get_args, get_origin
 
 from platformdirs import PlatformDirs
-from pydantic import Field, computed_field, field_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    ValidationInfo,
+    computed_field,
+    field_validator,
+)
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from tomatempo import __version__
+from tomatempo.instrument import span
+from tomatempo.timer import parse_duration
+
 Environment = Literal["dev", "staging", "prod", "test"]
 LogName = Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+QueuePolicy = Literal["drop", "block"]
+JournalMode = Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"]
+SyncMode = Literal["OFF", "NORMAL", "FULL", "EXTRA"]
+TempStore = Literal["DEFAULT", "FILE", "MEMORY"]
+CountingMode = Literal["cumulative", "segment-strict"]
+WeekStart = Literal["monday", "sunday"]
+MediaLink = Literal["reflink", "hardlink", "copy"]
 
 _LOG_MAP: dict[LogName, int] = {
     "DEBUG": logging.DEBUG,
@@ -18,6 +41,38 @@ _LOG_MAP: dict[LogName, int] = {
     "CRITICAL": logging.CRITICAL,
 }
 
+DATABASE_FILE = "tomatempo.db"
+
+
+class SqlitePragmas(BaseModel):
+    """
+    PRAGMAs applied to every SQLite connection (see tomatempo.db).
+    Override single values with e.g. APP_SQLITE__SYNCHRONOUS=FULL.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    journal_mode: JournalMode = "WAL"
+    synchronous: SyncMode = "NORMAL"
+    mmap_size: Annotated[int, Field(ge=0)] = 256 * 1024 * 1024  # bytes
+    cache_size: int = -16_000  # negative: KiB, positive: pages
+    temp_store: TempStore = "MEMORY"
+    busy_timeout: Annotated[int, Field(ge=0)] = 5_000  # ms
+    foreign_keys: bool = True
+
+    @field_validator("journal_mode", "synchronous", "temp_store", mode="before")
+    @classmethod
+    def _upper(cls, v: str) -> str:
+        return str(v).upper()
+
+
+# Named presets, mostly for benchmarks and bulk jobs. "balanced" is the default.
+SQLITE_PROFILES: dict[str, SqlitePragmas] = {
+    "durable": SqlitePragmas(synchronous="FULL"),
+    "balanced": SqlitePragmas(),
+    "bulk": SqlitePragmas(synchronous="OFF", cache_size=-64_000),
+}
+
 
 class Settings(BaseSettings):
     """
@@ -31,7 +86,8 @@ class Settings(BaseSettings):
 
     - Includes normalization and validation of environment and log_level;
     - Exposes computed properties (is_prod, debug, log_level_numeric);
-    - Manages configuration, cache, and log directories using platformdirs;
+    - Resolves config, data, state, cache and log directories using platformdirs
+      (once per instance; they are only created by ensure_dir());
     - Can be used as a singleton via get_settings().
     """
 
@@ -45,8 +101,53 @@ class Settings(BaseSettings):
     environment: Environment = "dev"
     log_level: LogName = "INFO"
 
-    # Database
-    database_url: Annotated[str, Field(validate_default=True)] = "sqlite:///./data.db"
+    # Logging queue: records per batch write, max wait for a batch to fill,
+    # queue bound and what to do when it is full
+    log_batch_size: Annotated[int, Field(gt=0)] = 512
+    log_flush_interval_ms: Annotated[int, Field(ge=0)] = 200
+    log_queue_size: Annotated[int, Field(gt=0)] = 10_000
+    log_queue_policy: QueuePolicy = "drop"
+
+    # Repeated records, per (logger, message template), dropped before they
+    # are queued: INFO and below past `log_rate_limit` per second (bursts of
+    # `log_rate_burst`, 0 turns it off), and all but 1 in `log_debug_sample`
+    # DEBUG records. Drops are logged as "suppressed N similar messages".
+    log_rate_limit: Annotated[float, Field(ge=0)] = 20.0
+    log_rate_burst: Annotated[int, Field(gt=0)] = 100
+    log_debug_sample: Annotated[int, Field(ge=1)] = 1
+
+    # Ship JSON logs to a local collector (unix:PATH or HOST:PORT) instead
+    # of writing the JSONL file, which then only gets what couldn't be sent
+    log_ship_address: str | None = None
+    log_ship_buffer: Annotated[int, Field(gt=0)] = 10_000
+
+    # Database; empty means tomatempo.db in data_dir
+    database_url: Annotated[str, Field(validate_default=True)] = ""
+    sqlite: SqlitePragmas = SqlitePragmas()
+
+    # Tomatoes: length in seconds (or a duration like "25m") and how they are
+    # counted. Changing either needs `tomatempo rollup rebuild`.
+    tomato_length: Annotated[int, Field(gt=0)] = 25 * 60
+    tomato_counting_mode: CountingMode = "cumulative"
+    week_start: WeekStart = "monday"
+
+    # Seconds between `view ... --watch` refreshes
+    view_refresh_rate: Annotated[float, Field(gt=0)] = 1.0
+
+    # Note attachments (<data_dir>/media): strip JPEG/PNG metadata, how files
+    # with nothing to strip get into the store (reflink and hardlink fall back
+    # to a copy across filesystems), thumbnails (need Pillow) and the size of
+    # the thumbnail cache in cache_dir
+    media_strip_exif: bool = True
+    media_link: MediaLink = "reflink"
+    media_thumbnails: bool = False
+    media_thumbnail_cache_mb: Annotated[int, Field(ge=0)] = 64
+
+    # Daemon socket, defaults to <state_dir>/daemon.sock
+    daemon_socket: Path | None = None
+
+    # Dirs already handed out by ensure_dir()
+    _created_dirs: set[Path] = PrivateAttr(default_factory=set)
 
     # Config dictionary
     model_config = SettingsConfigDict(
@@ -77,6 +178,37 @@ class Settings(BaseSettings):
             raise ValueError(f"invalid environment {v}. Use {valid}.")
         return v  # type: ignore[return-value]
 
+    @field_validator("log_ship_address")
+    @classmethod
+    def _validate_log_ship_address(cls, v: str | None) -> str | None:
+        """Validate log_ship_address"""
+        if v:
+            from tomatempo.shipping import parse_address
+
+            parse_address(v)
+        return v
+
+    @field_validator("database_url")
+    @classmethod
+    def _default_database_url(cls, v: str, info: ValidationInfo) -> str:
+        """Default to a file in data_dir, not the working directory"""
+        if v:
+            return v
+        dirs = PlatformDirs(
+            appname=info.data.get("app_name", "tomatempo"),
+            appauthor=info.data.get("app_author"),
+            roaming=info.data.get("roaming", True),
+        )
+        return f"sqlite:///{Path(dirs.user_data_dir) / DATABASE_FILE}"
+
+    @field_validator("tomato_length", mode="before")
+    @classmethod
+    def _parse_tomato_length(cls, v: int | str) -> int | str:
+        """Accept durations like 25m or 1h"""
+        if isinstance(v, str) and not v.strip().isdigit():
+            return parse_duration(v)
+        return v
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def log_level_numeric(self) -> int:
@@ -100,35 +232,158 @@ class Settings(BaseSettings):
         return PlatformDirs(appname=self.app_name, appauthor=self.app_author, roaming=self.roaming)
 
     @computed_field  # type: ignore[prop-decorator]
-    @property
+    @cached_property
     def cache_dir(self) -> Path:
-        p = Path(self._dirs.user_cache_dir)
-        if self.ensure_dirs:
-            p.mkdir(parents=True, exist_ok=True)
-        return p
+        return Path(self._dirs.user_cache_dir)
 
     @computed_field  # type: ignore[prop-decorator]
-    @property
+    @cached_property
     def logs_dir(self) -> Path:
-        p = Path(self._dirs.user_log_dir)
-        if self.ensure_dirs:
-            p.mkdir(parents=True, exist_ok=True)
-        return p
+        return Path(self._dirs.user_log_dir)
 
     @computed_field  # type: ignore[prop-decorator]
-    @property
+    @cached_property
     def config_dir(self) -> Path:
-        p = Path(self._dirs.user_config_dir)
-        if self.ensure_dirs:
-            p.mkdir(parents=True, exist_ok=True)
-        return p
+        return Path(self._dirs.user_config_dir)
+
+    @computed_field  # type: ignore[prop-decorator]
+    @cached_property
+    def data_dir(self) -> Path:
+        return Path(self._dirs.user_data_dir)
+
+    @computed_field  # type: ignore[prop-decorator]
+    @cached_property
+    def state_dir(self) -> Path:
+        return Path(self._dirs.user_state_dir)
+
+    def ensure_dir(self, path: Path) -> Path:
+        """
+        Create `path` before its first write. Reading the dir properties never
+        touches the disk; writers call this instead, and each directory costs
+        at most one mkdir per Settings instance.
+        """
+        if path not in self._created_dirs:
+            if self.ensure_dirs:
+                path.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(path)
+        return path
+
+
+# ------- Snapshot cache ------
+#
+# Building Settings re-reads .env, scans every APP_* variable and runs the
+# validators. get_settings() stores the resolved values under the cache dir,
+# keyed by a fingerprint of everything they were resolved from, and rebuilds
+# the instance with model_construct (no validation) while it still matches.
+
+SNAPSHOT_FILE = "settings.json"
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def _default_dirs() -> PlatformDirs:
+    """Platform dirs for the default identity, usable before Settings exists."""
+    fields = Settings.model_fields
+    return PlatformDirs(
+        appname=fields["app_name"].default,
+        appauthor=fields["app_author"].default,
+        roaming=fields["roaming"].default,
+    )
+
+
+def snapshot_path() -> Path:
+    return Path(_default_dirs().user_cache_dir) / SNAPSHOT_FILE
+
+
+def settings_fingerprint() -> str:
+    """Hash of the environment, .env, config file, dirs and code Settings depend on."""
+    prefix = Settings.model_config["env_prefix"].upper()
+    env = sorted((k.upper(), v) for k, v in os.environ.items() if k.upper().startswith(prefix))
+
+    sources = [
+        Path(Settings.model_config["env_file"]).absolute(),  # type: ignore[arg-type]
+        Path(
+            os.environ.get("TOMATEMPO_CONFIG")
+            or Path(_default_dirs().user_config_dir) / "config.yaml"
+        ),
+        Path(__file__),  # a new field or default invalidates old snapshots
+    ]
+    stats: list[tuple[str, int | None, int | None]] = []
+    for source in sources:
+        try:
+            st = source.stat()
+        except OSError:
+            stats.append((str(source), None, None))
+        else:
+            stats.append((str(source), st.st_mtime_ns, st.st_size))
+
+    # The default dirs (and database_url) follow XDG_*_HOME and HOME
+    dirs = _default_dirs()
+    resolved = [dirs.user_data_dir, dirs.user_cache_dir, dirs.user_config_dir, dirs.user_state_dir]
+
+    payload = json.dumps([__version__, env, stats, resolved], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def save_settings_snapshot(settings: Settings, fingerprint: str) -> None:
+    path = snapshot_path()
+    if not settings.ensure_dirs and not path.parent.exists():
+        return
+
+    snapshot = {
+        "fingerprint": fingerprint,
+        "fields_set": sorted(settings.model_fields_set),
+        "values": settings.model_dump(mode="json", include=set(Settings.model_fields)),
+    }
+    settings.ensure_dir(path.parent)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(snapshot), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_settings_snapshot(fingerprint: str) -> Settings | None:
+    """Settings from the snapshot, or None when it is missing or stale."""
+    try:
+        snapshot = json.loads(snapshot_path().read_text(encoding="utf-8"))
+        if snapshot["fingerprint"] != fingerprint:
+            return None
+        return _construct(Settings, snapshot["values"], set(snapshot["fields_set"]))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _construct(model: type[M], values: dict[str, Any], fields_set: set[str]) -> M:
+    """model_construct, turning JSON values back into the field types."""
+    restored = {
+        name: _from_json(model.model_fields[name].annotation, value)
+        for name, value in values.items()
+    }
+    return model.model_construct(fields_set, **restored)
+
+
+def _from_json(annotation: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    if get_origin(annotation) in (Union, types.UnionType):
+        annotation = next(a for a in get_args(annotation) if a is not type(None))
+    if annotation is Path:
+        return Path(value)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _construct(annotation, value, set(value))
+    return value
 
 
 @lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Singleton with cache enabled"""
+    """Singleton with cache enabled, backed by the on-disk snapshot"""
 
-    return Settings()
+    with span("settings"):
+        fingerprint = settings_fingerprint()
+        settings = load_settings_snapshot(fingerprint)
+        if settings is None:
+            settings = Settings()
+            save_settings_snapshot(settings, fingerprint)
+    return settings
 
 
 def reload_settings() -> Settings:
@@ -0,0 +1,244 @@
+"""
+Log shipping to a local collector.
+
+ShipHandler sends formatted records (JSONFormatter output, one JSON object
+per line) to a collector listening on a Unix or TCP socket. emit() only
+appends the line to a bounded buffer; an asyncio loop in a background thread
+drains it in batches, one socket write per batch. The thread emitting the
+record never waits for the network:
+
+- collector down: the buffered lines are spilled to the JSONL log file
+  (rotated and compressed like the file handler it replaces) and the
+  connection is retried with exponential backoff;
+- buffer full (collector too slow): the record is dropped and counted.
+
+Counters (queued, sent, spilled, dropped) are kept on the handler, see
+ShipHandler.metrics().
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import override
+
+from tomatempo.logstore import CompressingRotatingFileHandler, Compression
+
+BATCH_SIZE = 512
+FLUSH_INTERVAL = 0.2
+MAX_BACKOFF = 5.0
+CLOSE_TIMEOUT = 5.0
+
+
+def parse_address(address: str) -> tuple[str, str | int]:
+    """
+    ("unix", path) or (host, port) from "unix:/run/collector.sock",
+    "tcp:127.0.0.1:5170" or "127.0.0.1:5170".
+    """
+    if address.startswith("unix:"):
+        return "unix", address.removeprefix("unix:")
+    host, sep, port = address.removeprefix("tcp:").rpartition(":")
+    if not sep or not host or not port.isdigit():
+        raise ValueError(f"invalid log collector address {address!r}. Use unix:PATH or HOST:PORT.")
+    return host, int(port)
+
+
+class ShipHandler(logging.Handler):
+    """Non-blocking handler that ships records to a log collector."""
+
+    def __init__(
+        self,
+        address: str,
+        spill_file: str | Path | None = None,
+        buffer_size: int = 10_000,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        reconnect_delay: float = 0.1,
+        autostart: bool = True,
+        spill_max_bytes: int = 0,
+        spill_backup_count: int = 0,
+        spill_compression: Compression = "gzip",
+    ):
+        super().__init__()
+        self.address = parse_address(address)
+        self.spill_file = Path(spill_file) if spill_file is not None else None
+        self._spill_handler = (
+            CompressingRotatingFileHandler(
+                self.spill_file,
+                maxBytes=spill_max_bytes,
+                backupCount=spill_backup_count,
+                encoding="utf-8",
+                delay=True,
+                compression=spill_compression,
+            )
+            if self.spill_file is not None
+            else None
+        )
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.reconnect_delay = reconnect_delay
+
+        # deque.append/popleft are thread safe: emit() appends, the loop pops
+        self._buffer: deque[str] = deque()
+        self.queued = self.sent = self.spilled = self.dropped = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._backoff = reconnect_delay
+        self._next_attempt = 0.0
+        self._thread = threading.Thread(target=self._serve, name="log-shipper", daemon=True)
+        if autostart:
+            self.start()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def metrics(self) -> dict[str, int]:
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+            "buffered": len(self._buffer),
+        }
+
+    @override
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record) + "\n"
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._buffer) >= self.buffer_size:
+            self.dropped += 1
+            return
+        self._buffer.append(line)
+        self.queued += 1
+        # Wake the loop for a new burst or a full batch, not for every line
+        size = len(self._buffer)
+        if (size == 1 or size >= self.batch_size) and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    @override
+    def close(self) -> None:
+        """Send (or spill) what is buffered and stop the loop thread."""
+        if self._thread.is_alive():
+            self._closing = True
+            self._loop.call_soon_threadsafe(self._wake.set)
+            self._thread.join(CLOSE_TIMEOUT)
+        elif not self._loop.is_closed():
+            self._spill(self._take(len(self._buffer)))
+        if not self._loop.is_closed() and not self._thread.is_alive():
+            self._loop.close()
+            if self._spill_handler is not None:
+                self._spill_handler.close()
+        super().close()
+
+    # ------- Loop thread ------
+
+    def _serve(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wake.clear()
+            closing = self._closing
+
+            if self._writer is None and time.monotonic() >= self._next_attempt:
+                await self._connect()
+            if self._writer is not None:
+                await self._send()
+            if self._writer is None:
+                self._spill(self._take(len(self._buffer)))
+
+            if closing and not self._buffer:
+                break
+        await self._disconnect()
+
+    async def _connect(self) -> None:
+        kind, target = self.address
+        try:
+            if kind == "unix":
+                connect = asyncio.open_unix_connection(str(target))
+            else:
+                connect = asyncio.open_connection(kind, int(target))
+            self._reader, self._writer = await asyncio.wait_for(connect, self.flush_interval * 5)
+        except (OSError, TimeoutError):
+            self._next_attempt = time.monotonic() + self._backoff
+            self._backoff = min(self._backoff * 2, MAX_BACKOFF)
+            return
+        self._backoff = self.reconnect_delay
+
+    async def _send(self) -> None:
+        assert self._reader is not None
+        assert self._writer is not None
+        if self._reader.at_eof():
+            # The collector hung up; don't write into a dead connection
+            await self._disconnect()
+            return
+        while batch := self._take(self.batch_size):
+            try:
+                self._writer.write("".join(batch).encode())
+                await asyncio.wait_for(self._writer.drain(), self.flush_interval * 5)
+            except (OSError, TimeoutError):
+                # The batch may be partly delivered; spilling it keeps every
+                # record at least once
+                self._spill(batch)
+                await self._disconnect()
+                self._next_attempt = time.monotonic() + self._backoff
+                return
+            self.sent += len(batch)
+
+    async def _disconnect(self) -> None:
+        if self._writer is not None:
+            writer, self._writer = self._writer, None
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    def _take(self, n: int) -> list[str]:
+        popleft = self._buffer.popleft
+        return [popleft() for _ in range(min(n, len(self._buffer)))]
+
+    def _spill(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        data = "".join(lines)
+        spill = self._spill_handler
+        try:
+            if spill is None:
+                raise FileNotFoundError("no spill file")
+            spill.acquire()
+            try:
+                if spill.stream is None:
+                    spill.stream = spill._open()
+                # Rotated between batches, like the file handler between records
+                size = spill.stream.tell()
+                if spill.maxBytes and size and size + len(data) >= spill.maxBytes:
+                    spill.doRollover()
+                    spill.stream = spill._open()
+                spill.stream.write(data)
+                spill.stream.flush()
+            finally:
+                spill.release()
+        except OSError:
+            self.acquire()  # emit() counts drops too, under the handler lock
+            try:
+                self.dropped += len(lines)
+            finally:
+                self.release()
+            return
+        self.spilled += len(lines)
@@ -0,0 +1,186 @@
+"""
+Slice storage and the columnar query path used by reports and exports.
+
+Reports scan every slice in a range. Rather than building a Slice object per
+row, query_columns() streams rows from the cursor in chunks straight into
+typed arrays (8 bytes per value), and the totals_* helpers aggregate over
+those columns. On SQLite the rows come from the sqlite3 cursor itself;
+other databases go through SQLAlchemy with the same SQL.
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from sqlalchemy import Connection, insert, text
+
+from tomatempo.db import get_engine
+from tomatempo.models import Slice
+from tomatempo.ranges import OVERLAPPING_SQL, index_slices, window_params
+from tomatempo.rollups import TomatoRules, apply_slice
+from tomatempo.settings import Settings
+from tomatempo.timer import ClosedSlice
+
+# task_id column value for Time Pool slices (NULL in the table)
+POOL = -1
+
+CHUNK_SIZE = 10_000
+
+_COLUMNS_SQL = """
+SELECT coalesce(task_id, -1), start_ts, end_ts, type = 'break'
+FROM slices
+WHERE end_ts > :start AND start_ts < :end
+ORDER BY start_ts
+"""
+
+# A bounded range reads only the slices of its days (see tomatempo.ranges)
+_COLUMNS_IN_BUCKETS_SQL = f"""
+SELECT coalesce(task_id, -1), start_ts, end_ts, type = 'break'
+FROM slices
+WHERE id IN ({OVERLAPPING_SQL})
+ORDER BY start_ts
+"""
+
+# Bounds used when a range end is open
+_MIN_TS = -(2**63)
+_MAX_TS = 2**63 - 1
+
+
+@dataclass
+class SliceColumns:
+    """Slices as parallel arrays; row i is (task_id[i], start_ts[i], ...)."""
+
+    task_id: array = field(default_factory=lambda: array("q"))
+    start_ts: array = field(default_factory=lambda: array("q"))
+    end_ts: array = field(default_factory=lambda: array("q"))
+    is_break: array = field(default_factory=lambda: array("b"))
+
+    def __len__(self) -> int:
+        return len(self.start_ts)
+
+    def extend(self, rows: list[tuple[int, int, int, int]]) -> None:
+        if not rows:
+            return
+        task_id, start_ts, end_ts, is_break = zip(*rows, strict=True)
+        self.task_id.extend(task_id)
+        self.start_ts.extend(start_ts)
+        self.end_ts.extend(end_ts)
+        self.is_break.extend(is_break)
+
+
+def iter_chunks(
+    conn: Connection,
+    start: int | None = None,
+    end: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[list[tuple[int, int, int, int]]]:
+    """
+    Raw (task_id, start_ts, end_ts, is_break) rows overlapping [start, end),
+    ordered by start_ts, `chunk_size` at a time. Pool slices have task_id POOL.
+    """
+    if start is not None and end is not None:
+        if end <= start:
+            return
+        query, params = _COLUMNS_IN_BUCKETS_SQL, window_params(start, end)
+    else:
+        query = _COLUMNS_SQL
+        params = {
+            "start": _MIN_TS if start is None else start,
+            "end": _MAX_TS if end is None else end,
+        }
+
+    if conn.dialect.name != "sqlite":
+        streaming = conn.execution_options(stream_results=True, yield_per=chunk_size)
+        for partition in streaming.execute(text(query), params).partitions(chunk_size):
+            yield [tuple(row) for row in partition]
+        return
+
+    # sqlite3 takes the same :named parameters; its cursor skips building a
+    # Row per slice, which is most of the cost of a large scan
+    cursor = conn.connection.driver_connection.cursor()  # type: ignore[union-attr]
+    try:
+        cursor.execute(query, params)
+        while rows := cursor.fetchmany(chunk_size):
+            yield rows
+    finally:
+        cursor.close()
+
+
+def query_columns(
+    conn: Connection,
+    start: int | None = None,
+    end: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> SliceColumns:
+    """Slices overlapping [start, end) (either end may be open) as columns."""
+    columns = SliceColumns()
+    for rows in iter_chunks(conn, start, end, chunk_size):
+        columns.extend(rows)
+    return columns
+
+
+def totals_by_task(
+    columns: SliceColumns,
+    start: int | None = None,
+    end: int | None = None,
+    include_breaks: bool = False,
+) -> dict[int | None, int]:
+    """
+    Seconds per task (None for the Time Pool), with slices clipped to
+    [start, end). Breaks are left out unless `include_breaks`.
+    """
+    lo = _MIN_TS if start is None else start
+    hi = _MAX_TS if end is None else end
+    totals: dict[int, int] = {}
+    get = totals.get
+    for task_id, s, e, brk in zip(
+        columns.task_id, columns.start_ts, columns.end_ts, columns.is_break, strict=True
+    ):
+        if brk and not include_breaks:
+            continue
+        if s < lo:
+            s = lo
+        if e > hi:
+            e = hi
+        if e > s:
+            totals[task_id] = get(task_id, 0) + e - s
+    return {None if k == POOL else k: v for k, v in totals.items()}
+
+
+def insert_slices(
+    conn: Connection,
+    slices: Iterable[ClosedSlice],
+    rules: TomatoRules,
+    origin: str = "auto",
+) -> int:
+    """
+    Insert closed slices in one executemany and add their work time to the
+    rollups; returns how many.
+    """
+    closed = list(slices)
+    rows = [
+        {
+            "task_id": s.task_id,
+            "start_ts": s.start_ts,
+            "end_ts": s.end_ts,
+            "type": s.type,
+            "origin": origin,
+        }
+        for s in closed
+    ]
+    if rows:
+        table = Slice.metadata.tables["slices"]
+        ids = conn.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+        index_slices(
+            conn, ((i, s.start_ts, s.end_ts) for i, s in zip(ids.scalars(), closed, strict=True))
+        )
+    for s in closed:
+        if s.type == "work":
+            apply_slice(conn, rules, s.task_id, s.end_ts - s.start_ts)
+    return len(rows)
+
+
+def save_slice(closed: ClosedSlice, settings: Settings | None = None) -> None:
+    """Persist one closed slice (the TimerService on_close hook)."""
+    with get_engine(settings).begin() as conn:
+        insert_slices(conn, [closed], TomatoRules.from_settings(settings))
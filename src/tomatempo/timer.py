@@ -0,0 +1,183 @@
+"""
+Timer and focus state machine.
+
+Time is kept in UTC seconds. Every run of the timer is recorded as a slice:
+pausing, stopping or switching focus closes the open slice and (on a switch)
+opens the next one at the very same second, so no time is lost.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Literal
+
+logger = logging.getLogger(__name__)
+
+SliceType = Literal["work", "break"]
+
+DEFAULT_DURATION = 25 * 60
+
+_DURATION_RE = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?$")
+
+
+class TimerError(RuntimeError):
+    """Invalid timer transition (e.g. pausing a timer that isn't running)."""
+
+
+def parse_duration(text: str) -> int:
+    """Parse durations like '25m', '90s' or '1h30m' into seconds."""
+    match = _DURATION_RE.match(text.strip().lower())
+    if not text.strip() or match is None:
+        raise ValueError(f"invalid duration {text!r}. Use e.g. 25m, 90s or 1h30m.")
+    hours, minutes, seconds = (int(g) if g else 0 for g in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+@dataclass(frozen=True)
+class ClosedSlice:
+    task_id: int | None  # None means Time Pool
+    start_ts: int
+    end_ts: int
+    type: SliceType = "work"
+
+
+@dataclass
+class TimerState:
+    running: bool = False
+    task_id: int | None = None
+    slice_start: int | None = None
+    duration: int = DEFAULT_DURATION
+    elapsed: int = 0  # seconds run before slice_start
+    type: SliceType = "work"
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TimerState":
+        # Unknown keys are ignored (e.g. journal_seq in a journal snapshot)
+        return cls(**{f.name: data[f.name] for f in fields(cls) if f.name in data})
+
+
+@dataclass
+class TimerService:
+    """
+    Applies timer and focus commands to a TimerState. Closed slices are
+    handed to `on_close`.
+    """
+
+    state: TimerState = field(default_factory=TimerState)
+    on_close: Callable[[ClosedSlice], None] | None = None
+    clock: Callable[[], float] = time.time
+
+    def now(self) -> int:
+        return int(self.clock())
+
+    def start(self, duration: int | None = None) -> dict[str, Any]:
+        if self.state.running:
+            raise TimerError("timer is already running")
+        if duration is not None:
+            self.state.duration = duration
+            self.state.elapsed = 0
+        self.state.running = True
+        self.state.slice_start = self.now()
+        return self.status()
+
+    def pause(self) -> dict[str, Any]:
+        if not self.state.running:
+            raise TimerError("timer is not running")
+        now = self.now()
+        self._close_slice(now)
+        self.state.running = False
+        return self.status()
+
+    def stop(self) -> dict[str, Any]:
+        if self.state.running:
+            self._close_slice(self.now())
+        self.state.running = False
+        self.state.elapsed = 0
+        self.state.duration = DEFAULT_DURATION
+        return self.status()
+
+    def focus(self, task_id: int | None) -> dict[str, Any]:
+        """Switch focus; a running timer closes its slice and opens the next one."""
+        if self.state.running:
+            now = self.now()
+            self._close_slice(now)
+            self.state.slice_start = now
+        self.state.task_id = task_id
+        return self.status()
+
+    def status(self) -> dict[str, Any]:
+        elapsed = self.state.elapsed
+        if self.state.running and self.state.slice_start is not None:
+            elapsed += self.now() - self.state.slice_start
+        return {
+            **self.state.to_dict(),
+            "elapsed": elapsed,
+            "remaining": max(self.state.duration - elapsed, 0),
+        }
+
+    def call(self, command: str, args: dict[str, Any]) -> dict[str, Any]:
+        """Run a protocol command (see COMMANDS) against this service."""
+        try:
+            method = COMMANDS[command]
+        except KeyError:
+            raise TimerError(f"unknown command {command!r}") from None
+        before = replace(self.state)
+        try:
+            return method(self, **args)
+        except Exception:
+            # e.g. on_close could not record the slice: keep the slice open
+            # rather than losing its time
+            self.state = before
+            raise
+
+    def _close_slice(self, end_ts: int) -> None:
+        start_ts = self.state.slice_start
+        if start_ts is None:
+            return
+        self.state.elapsed += end_ts - start_ts
+        self.state.slice_start = None
+        if end_ts <= start_ts:
+            return
+
+        closed = ClosedSlice(self.state.task_id, start_ts, end_ts, self.state.type)
+        logger.debug("slice closed", extra={"slice": asdict(closed)})
+        if self.on_close is not None:
+            self.on_close(closed)
+
+
+COMMANDS: dict[str, Callable[..., dict[str, Any]]] = {
+    "timer.start": TimerService.start,
+    "timer.pause": TimerService.pause,
+    "timer.stop": TimerService.stop,
+    "timer.status": TimerService.status,
+    "focus.set": TimerService.focus,
+}
+
+
+def load_state(path: Path) -> TimerState:
+    """Read the persisted timer state, or a fresh one if there is none."""
+    try:
+        return TimerState.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    except FileNotFoundError:
+        return TimerState()
+
+
+def save_state(path: Path, state: TimerState) -> None:
+    """Atomically replace the persisted timer state."""
+    tmp = path.with_suffix(".tmp")
+    data = json.dumps(state.to_dict())
+    try:
+        tmp.write_text(data, encoding="utf-8")
+    except FileNotFoundError:
+        # First save: create the state dir then, not on every call
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(data, encoding="utf-8")
+    os.replace(tmp, path)
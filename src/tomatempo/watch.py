@@ -0,0 +1,262 @@
+"""
+Watch engine for `view ... --watch`.
+
+Each tick the dashboard is asked whether anything changed since the last
+one, using a check that costs no real query (a file stat, SQLite's
+data_version); only then does it reload its data. The screen is repainted
+line by line, rewriting only the lines whose text changed, and ticks are
+scheduled on the monotonic clock so refreshes don't drift.
+"""
+
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from itertools import zip_longest
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Protocol
+
+from tomatempo.instrument import span
+from tomatempo.journal import current_state
+from tomatempo.timer import TimerService, TimerState, load_state
+
+if TYPE_CHECKING:
+    # Only the progress view needs the database; `view timer` stays light
+    from sqlalchemy import Connection
+
+    from tomatempo.events import ChangeCounter
+
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+
+
+class Dashboard(Protocol):
+    def changed(self) -> bool:
+        """Cheap check: did the underlying data change since refresh()?"""
+        ...
+
+    def refresh(self) -> None:
+        """Reload the data (the expensive part)."""
+        ...
+
+    def lines(self, now: float) -> list[str]:
+        """The frame for `now`, from the data loaded last."""
+        ...
+
+
+class LineRenderer:
+    """Repaints only the lines that differ from the previous frame."""
+
+    def __init__(self, stream: IO[str] | None = None):
+        self.stream = stream or sys.stdout
+        self.previous: list[str] | None = None
+
+    def render(self, lines: list[str]) -> int:
+        """Draw a frame; returns the number of characters written."""
+        if lines is self.previous:
+            return 0
+        if self.previous is None:
+            out = [HIDE_CURSOR, CLEAR_SCREEN, "\n".join(lines)]
+        else:
+            out = [
+                f"\x1b[{row};1H{line}\x1b[K"
+                for row, (line, old) in enumerate(
+                    zip_longest(lines, self.previous, fillvalue=""), start=1
+                )
+                if line != old
+            ]
+        self.previous = lines
+        if not out:
+            return 0
+        data = "".join(out)
+        self.stream.write(data)
+        self.stream.flush()
+        return len(data)
+
+    def close(self) -> None:
+        if self.previous is not None:
+            self.stream.write(f"\x1b[{len(self.previous) + 1};1H{SHOW_CURSOR}")
+            self.stream.flush()
+
+
+@dataclass
+class Ticker:
+    """
+    Ticks every `interval` seconds on the monotonic clock. Tick k is due at
+    start + k * interval, so sleeping late never shifts later ticks; ticks
+    missed altogether are skipped rather than run back to back.
+    """
+
+    interval: float
+    clock: Callable[[], float] = time.monotonic
+    sleep: Callable[[float], None] = time.sleep
+    start: float = field(init=False)
+    ticks: int = field(init=False, default=0)
+
+    def __post_init__(self) -> None:
+        self.start = self.clock()
+
+    def wait(self) -> None:
+        self.ticks += 1
+        due = self.start + self.ticks * self.interval
+        now = self.clock()
+        if now > due:
+            self.ticks = int((now - self.start) // self.interval) + 1
+            due = self.start + self.ticks * self.interval
+        self.sleep(due - now)
+
+
+def watch(
+    dashboard: Dashboard,
+    renderer: LineRenderer,
+    ticker: Ticker,
+    wall_clock: Callable[[], float] = time.time,
+    max_ticks: int | None = None,
+) -> None:
+    """Run the refresh loop until interrupted (or for `max_ticks` frames)."""
+    frames = 0
+    try:
+        while max_ticks is None or frames < max_ticks:
+            if dashboard.changed():
+                dashboard.refresh()
+            renderer.render(dashboard.lines(wall_clock()))
+            frames += 1
+            if max_ticks is None or frames < max_ticks:
+                ticker.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        renderer.close()
+
+
+class Notified:
+    """
+    Gates a dashboard on the events counter (see tomatempo.events): its own
+    change check only runs after a writer published something.
+    """
+
+    def __init__(self, dashboard: Dashboard, counter: "ChangeCounter"):
+        self.dashboard = dashboard
+        self.counter = counter
+        self._seen: int | None = None
+
+    def changed(self) -> bool:
+        value = self.counter.value
+        if value == self._seen:
+            return False
+        self._seen = value
+        return self.dashboard.changed()
+
+    def refresh(self) -> None:
+        self.dashboard.refresh()
+
+    def lines(self, now: float) -> list[str]:
+        return self.dashboard.lines(now)
+
+
+# ------- Dashboards ------
+
+
+def _file_token(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def format_seconds(seconds: int) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class TimerDashboard:
+    """
+    Timer state, reloaded from the state file (plus the daemon's journal, if
+    given) only when they change.
+    """
+
+    def __init__(self, state_file: Path, journal_file: Path | None = None):
+        self.state_file = state_file
+        self.journal_file = journal_file
+        self.state = TimerState()
+        self._token: Any = object()
+
+    def _files_token(self) -> Any:
+        if self.journal_file is None:
+            return _file_token(self.state_file)
+        return _file_token(self.state_file), _file_token(self.journal_file)
+
+    def changed(self) -> bool:
+        return self._files_token() != self._token
+
+    def refresh(self) -> None:
+        self._token = self._files_token()
+        if self.journal_file is None:
+            self.state = load_state(self.state_file)
+        else:
+            self.state = current_state(self.journal_file, self.state_file)
+
+    def lines(self, now: float) -> list[str]:
+        status = TimerService(self.state, clock=lambda: now).status()
+        state = "running" if status["running"] else "paused" if status["elapsed"] else "stopped"
+        focus = f"task {status['task_id']}" if status["task_id"] is not None else "Time Pool"
+        return [
+            f"Timer    {state}",
+            f"Focus    {focus}",
+            f"Elapsed  {format_seconds(status['elapsed'])}",
+            f"Left     {format_seconds(status['remaining'])}",
+        ]
+
+
+_PROGRESS_SQL = """
+SELECT r.entity_type, r.entity_id, t.name, r.seconds, r.tomatoes
+FROM rollups r
+LEFT JOIN tasks t ON r.entity_type = 'task' AND t.id = r.entity_id
+WHERE r.entity_type IN ('task', 'pool') AND r.seconds > 0
+ORDER BY r.entity_type = 'pool', r.seconds DESC
+"""
+
+
+class ProgressDashboard:
+    """
+    Time and tomatoes per task from the rollups. On SQLite the query only
+    runs again after another connection committed (PRAGMA data_version).
+    """
+
+    def __init__(self, conn: "Connection"):
+        self.conn = conn
+        self.rows: list[Any] = []
+        self._lines: list[str] = []
+        self._sqlite = conn.dialect.name == "sqlite"
+        self._version: int | None = None
+
+    def _data_version(self) -> int:
+        return self.conn.exec_driver_sql("PRAGMA data_version").scalar_one()
+
+    def changed(self) -> bool:
+        return not self._sqlite or self._data_version() != self._version
+
+    def refresh(self) -> None:
+        if self._sqlite:
+            self._version = self._data_version()
+        with span("db.query"):
+            self.rows = list(self.conn.exec_driver_sql(_PROGRESS_SQL))
+        # End the read transaction so the next data_version sees new commits
+        self.conn.rollback()
+        self._lines = self._format()
+
+    def _format(self) -> list[str]:
+        if not self.rows:
+            return ["No time recorded yet."]
+        out = [f"{'':<28} {'time':>9} {'tomatoes':>8}"]
+        for kind, entity_id, name, seconds, tomatoes in self.rows:
+            label = "Time Pool" if kind == "pool" else name or f"task {entity_id}"
+            out.append(f"{label[:28]:<28} {format_seconds(seconds):>9} {tomatoes:>8}")
+        return out
+
+    def lines(self, now: float) -> list[str]:
+        # Nothing here depends on the clock: the frame only changes on refresh
+        return self._lines
@@ -5,6 +5,7 @@ from pathlib import Path
 import pytest
 from freezegun import freeze_time
 
+from tomatempo import db, logs
 from tomatempo.logs import JSONFormatter
 from tomatempo.settings import Settings, get_settings
 
@@ -21,6 +22,7 @@ def clean_settings(tmp_path):
         m.delenv("XDG_CONFIG_HOME", raising=False)
         m.delenv("XDG_STATE_HOME", raising=False)
         m.delenv("XDG_CACHE_HOME", raising=False)
+        m.delenv("XDG_DATA_HOME", raising=False)
 
         # Limpa variáveis de ambiente da aplicação
         for v in list(os.environ):
@@ -34,6 +36,7 @@ def clean_settings(tmp_path):
         m.setenv("XDG_CONFIG_HOME", str(tmp / "config"))
         m.setenv("XDG_STATE_HOME", str(tmp / "state"))
         m.setenv("XDG_CACHE_HOME", str(tmp / "cache"))
+        m.setenv("XDG_DATA_HOME", str(tmp / "data"))
 
         # Limpa o cache da singleton
         get_settings.cache_clear()
@@ -73,16 +76,25 @@ def tsettings_prod(clean_settings, tmp_path, monkeypatch):
     return Settings(log_level="DEBUG", environment="prod")
 
 
+@pytest.fixture
+def db_settings(clean_settings, monkeypatch, tmp_path):
+    """
+    Settings com um banco SQLite temporário; descarta os engines no final.
+    """
+    clean_settings(monkeypatch, tmp_path)
+    yield Settings(database_url=f"sqlite:///{tmp_path / 'tomatempo.db'}")
+    db.dispose_engines()
+
+
 @pytest.fixture
 def assert_dirs_empty():
     """
-    Verifica se os diretórios de cache, logs e config estão vazios.
+    Verifica se os diretórios de cache, logs e config não existem ou estão vazios.
     """
 
     def _check(settings: Settings):
-        assert list(settings.cache_dir.iterdir()) == []
-        assert list(settings.logs_dir.iterdir()) == []
-        assert list(settings.config_dir.iterdir()) == []
+        for d in (settings.cache_dir, settings.logs_dir, settings.config_dir):
+            assert not d.exists() or list(d.iterdir()) == []
         return _check
 
     return _check
@@ -149,3 +161,26 @@ def json_formatter():
     }
 
     return JSONFormatter(fmt_keys=format_keys)
+
+
+@pytest.fixture
+def logging_settings(tsettings_test, monkeypatch, tmp_path):
+    """
+    Settings for setup_logging tests. Restores the root logger and stops the
+    listener afterwards.
+    """
+    # logging.yaml comes from the package, whatever the working directory
+    monkeypatch.chdir(tmp_path)
+
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+
+    yield tsettings_test
+
+    logs._stop_listener()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+        h.close()
+    for h in handlers:
+        root.addHandler(h)
+    root.setLevel(level)
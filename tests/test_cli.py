@@ -0,0 +1,154 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+import tomatempo
+from tomatempo.cli import COMMANDS, LazyCommand, app
+
+# Modules that must stay out of --help, --version and completion
+HEAVY_MODULES = {
+    "alembic",
+    "platformdirs",
+    "pydantic",
+    "pydantic_settings",
+    "sqlalchemy",
+    "sqlmodel",
+    "yaml",
+}
+
+# Cumulative `import tomatempo.cli` time, Typer included
+IMPORT_BUDGET_US = int(os.environ.get("TOMATEMPO_IMPORT_BUDGET_US", 300_000))
+
+SRC = str(Path(tomatempo.__file__).parents[1])
+
+PROBE = """
+import sys
+from tomatempo.cli import app
+try:
+    app(sys.argv[1:], prog_name="tomatempo")
+except SystemExit:
+    pass
+print(" ".join(sorted({m.split(".")[0] for m in sys.modules})), file=sys.stderr)
+"""
+
+
+def run_python(*args: str, **env: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": SRC, **env},
+        check=True,
+    )
+
+
+def imported_modules(*argv: str, **env: str) -> set[str]:
+    result = run_python("-c", PROBE, *argv, **env)
+    return set(result.stderr.splitlines()[-1].split())
+
+
+def test_help_lists_lazy_commands_without_loading_them():
+    """
+    Ensure that the top level --help shows registered commands from the registry alone.
+    """
+
+    result = CliRunner().invoke(app, ["--help"])
+
+    assert result.exit_code == 0
+    for name in COMMANDS:
+        assert name in result.output
+
+
+def test_version():
+    result = CliRunner().invoke(app, ["--version"])
+
+    assert result.exit_code == 0
+    assert result.output.strip() == f"tomatempo {tomatempo.__version__}"
+
+
+def test_lazy_command_runs():
+    result = CliRunner().invoke(app, ["hello", "Tomato"])
+
+    assert result.exit_code == 0
+    assert result.output == "Hello, Tomato\n"
+
+
+def test_lazy_command_loads_target_once():
+    command = LazyCommand("hello", COMMANDS["hello"])
+
+    assert command.command is command.command
+    assert command.command.name == "hello"
+
+
+@pytest.mark.parametrize("name", ["timer", "export"])
+def test_subcommands_leave_completion_to_the_root(name):
+    result = CliRunner().invoke(app, [name, "--help"])
+
+    assert result.exit_code == 0
+    assert "--install-completion" not in result.output
+    assert "--install-completion" in CliRunner().invoke(app, ["--help"]).output
+
+
+@pytest.mark.perf
+@pytest.mark.parametrize("argv", [("--help",), ("--version",)])
+def test_cli_does_not_import_heavy_modules(argv):
+    """
+    Check that --help and --version never import the settings/DB stack.
+    """
+
+    assert imported_modules(*argv) & HEAVY_MODULES == set()
+
+
+@pytest.mark.perf
+def test_completion_does_not_import_heavy_modules():
+    """
+    Check that completing a command name works without importing the settings/DB stack.
+    """
+
+    modules = imported_modules(
+        _TOMATEMPO_COMPLETE="complete_bash", COMP_WORDS="tomatempo he", COMP_CWORD="1"
+    )
+
+    assert modules & HEAVY_MODULES == set()
+
+
+@pytest.mark.perf
+def test_task_ids_do_not_import_heavy_modules():
+    """
+    Check that a command given a task id (`focus task 12`) parses it without the settings stack.
+    """
+
+    probe = (
+        "import sys\n"
+        "from tomatempo.commands.focus import task\n"
+        "from tomatempo.names import EntityRef\n"
+        "assert EntityRef('task').convert('12', None, None) == 12\n"
+        "print(' '.join(sorted({m.split('.')[0] for m in sys.modules})), file=sys.stderr)\n"
+    )
+    modules = set(run_python("-c", probe).stderr.splitlines()[-1].split())
+
+    assert modules & HEAVY_MODULES == set()
+
+
+@pytest.mark.perf
+def test_import_time_under_budget():
+    """
+    Measure `import tomatempo.cli` with -X importtime against a fixed budget.
+    """
+
+    result = run_python("-X", "importtime", "-c", "import tomatempo.cli")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        _, _, times = line.partition("import time:")
+        if "|" not in times:
+            continue
+        _self, total, name = times.split("|")
+        cumulative[name.strip()] = total.strip()
+
+    assert set(cumulative) & HEAVY_MODULES == set()
+    assert int(cumulative["tomatempo.cli"]) < IMPORT_BUDGET_US
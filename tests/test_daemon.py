@@ -0,0 +1,213 @@
+import json
+import socket
+import sqlite3
+import tempfile
+import threading
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from tomatempo import client
+from tomatempo.client import CommandError, DaemonError, DaemonUnavailable, execute, request
+from tomatempo.daemon import DaemonServer, handle_request, state_path
+from tomatempo.events import EventFeed
+from tomatempo.journal import TimerJournal
+from tomatempo.timer import TimerService, load_state
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs AF_UNIX")
+
+
+@pytest.fixture
+def short_dir():
+    # Unix socket paths are limited to ~100 bytes, pytest's tmp_path may be longer
+    with tempfile.TemporaryDirectory(prefix="tt") as d:
+        yield Path(d)
+
+
+@pytest.fixture
+def daemon(short_dir):
+    path = short_dir / "daemon.sock"
+    server = DaemonServer(path, TimerService(), short_dir / "state.json")
+    thread = threading.Thread(target=server.serve_until_stopped, args=(0.05,))
+    thread.start()
+
+    yield server
+
+    if not server.stopping:
+        request(path, "daemon.stop")
+    thread.join()
+    server.server_close()
+
+
+def test_handle_request_reports_errors():
+    service = TimerService()
+
+    assert handle_request(service, {"cmd": "timer.start"})["ok"] is True
+    assert handle_request(service, {"cmd": "timer.start"}) == {
+        "ok": False,
+        "error": "timer is already running",
+    }
+    assert handle_request(service, {"cmd": "focus.set", "args": {"bogus": 1}})["ok"] is False
+
+
+def test_failed_slice_write_keeps_the_slice_open():
+    def on_close(closed):
+        raise sqlite3.OperationalError("database is locked")
+
+    now = [1000]
+    service = TimerService(on_close=on_close, clock=lambda: now[0])
+    handle_request(service, {"cmd": "timer.start"})
+    before = replace(service.state)
+    now[0] += 60
+
+    response = handle_request(service, {"cmd": "timer.pause"})
+
+    assert response == {"ok": False, "error": "command failed: database is locked"}
+    assert service.state == before
+
+
+def test_daemon_answers_malformed_requests(daemon):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(daemon.path))
+        sock.sendall(b"[1, 2]\n")
+        with sock.makefile("rb") as reader:
+            assert json.loads(reader.readline())["ok"] is False
+
+    assert request(daemon.path, "daemon.ping")["ok"] is True
+
+
+def test_daemon_answers_requests(daemon):
+    """
+    Ensure that the daemon keeps the timer state across client connections and persists it.
+    """
+
+    assert request(daemon.path, "focus.set", {"task_id": 5})["result"]["task_id"] == 5
+    assert request(daemon.path, "timer.start")["result"]["running"] is True
+    assert request(daemon.path, "timer.status")["result"]["task_id"] == 5
+
+    assert load_state(daemon.state_file).running is True
+
+
+def test_daemon_stop_request_ends_loop(daemon):
+    assert request(daemon.path, "daemon.ping")["ok"] is True
+    assert request(daemon.path, "daemon.stop")["ok"] is True
+    assert daemon.stopping is True
+
+    daemon.server_close()
+
+    with pytest.raises(DaemonUnavailable):
+        request(daemon.path, "daemon.ping")
+
+
+def test_daemon_refuses_second_instance(daemon):
+    with pytest.raises(RuntimeError, match="already listening"):
+        DaemonServer(daemon.path, TimerService(), daemon.state_file)
+
+
+def test_stale_socket_is_replaced(short_dir):
+    path = short_dir / "daemon.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(path))
+    stale.close()
+
+    server = DaemonServer(path, TimerService(), short_dir / "state.json")
+    server.server_close()
+
+    assert not path.exists()
+
+
+def test_request_without_daemon_raises(short_dir):
+    with pytest.raises(DaemonUnavailable):
+        request(short_dir / "missing.sock", "daemon.ping")
+
+
+def test_daemon_publishes_changes(short_dir):
+    feed = EventFeed(short_dir / "cache")
+    server = DaemonServer(short_dir / "d.sock", TimerService(), short_dir / "state.json", feed)
+    try:
+        server.dispatch({"cmd": "focus.set", "args": {"task_id": 3}})
+        server.dispatch({"cmd": "timer.status"})
+        server.dispatch({"cmd": "timer.pause"})  # rejected: not running
+    finally:
+        server.server_close()
+
+    assert [(e["kind"], e["data"]["task_id"]) for e in feed.read()] == [("focus.set", 3)]
+
+
+def test_daemon_journals_commands(short_dir):
+    journal = TimerJournal(short_dir / "timer.journal", short_dir / "state.json")
+    journal.recover()
+    server = DaemonServer(
+        short_dir / "d.sock", TimerService(), short_dir / "state.json", journal=journal
+    )
+    try:
+        server.dispatch({"cmd": "focus.set", "args": {"task_id": 3}})
+        server.dispatch({"cmd": "timer.start"})
+        server.dispatch({"cmd": "timer.status"})
+    finally:
+        server.server_close()
+        journal.close()
+
+    assert not (short_dir / "state.json").exists()
+    recovery = TimerJournal(short_dir / "timer.journal", short_dir / "state.json").recover()
+    assert recovery.events == 2
+    assert recovery.state == server.service.state
+
+
+def test_execute_uses_daemon(daemon, monkeypatch):
+    monkeypatch.setattr(client, "default_socket_path", lambda: daemon.path)
+
+    assert execute("focus.set", task_id=9)["task_id"] == 9
+    assert daemon.service.state.task_id == 9
+
+
+def test_unanswered_request_is_not_rerun_in_process(short_dir, monkeypatch):
+    path = short_dir / "mute.sock"
+    mute = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    mute.bind(str(path))
+    mute.listen()
+
+    def accept_and_close():
+        conn, _ = mute.accept()
+        conn.recv(1024)
+        conn.close()
+
+    thread = threading.Thread(target=accept_and_close)
+    thread.start()
+    monkeypatch.setattr(client, "default_socket_path", lambda: path)
+    monkeypatch.setattr(client, "execute_in_process", pytest.fail)
+    try:
+        with pytest.raises(DaemonError):
+            execute("timer.start")
+    finally:
+        thread.join()
+        mute.close()
+
+
+def test_execute_finds_the_daemon_through_settings(tsettings, daemon, short_dir, monkeypatch):
+    # e.g. the socket is set in .env, which the fast path doesn't read
+    monkeypatch.setattr(client, "default_socket_path", lambda: short_dir / "missing.sock")
+    monkeypatch.setenv("APP_DAEMON_SOCKET", str(daemon.path))
+
+    execute("focus.set", task_id=6)
+
+    assert daemon.service.state.task_id == 6
+    assert not state_path(tsettings).exists()
+
+
+def test_execute_falls_back_in_process(tsettings, short_dir, monkeypatch):
+    """
+    Check that without a daemon commands run in-process against the state file.
+    """
+
+    monkeypatch.setenv("APP_DAEMON_SOCKET", str(short_dir / "missing.sock"))
+
+    execute("focus.set", task_id=2)
+    execute("timer.start")
+
+    assert execute("timer.status")["running"] is True
+    assert load_state(state_path(tsettings)).task_id == 2
+
+    with pytest.raises(CommandError, match="already running"):
+        execute("timer.start")
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from tomatempo import db
+from tomatempo.settings import Settings, SqlitePragmas
+
+
+def pragma(conn, name):
+    return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_engine_applies_pragmas(db_settings):
+    with db.get_engine(db_settings).connect() as conn:
+        assert pragma(conn, "journal_mode") == "wal"
+        assert pragma(conn, "synchronous") == 1  # NORMAL
+        assert pragma(conn, "foreign_keys") == 1
+        assert pragma(conn, "temp_store") == 2  # MEMORY
+        assert pragma(conn, "busy_timeout") == 5_000
+        assert pragma(conn, "cache_size") == -16_000
+
+
+def test_pragmas_from_env(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+    monkeypatch.setenv("APP_SQLITE__SYNCHRONOUS", "full")
+    monkeypatch.setenv("APP_SQLITE__CACHE_SIZE", "-2000")
+
+    settings = Settings(database_url=f"sqlite:///{tmp_path / 'env.db'}")
+
+    assert settings.sqlite == SqlitePragmas(synchronous="FULL", cache_size=-2000)
+    with db.get_engine(settings).connect() as conn:
+        assert pragma(conn, "synchronous") == 2  # FULL
+    db.dispose_engines()
+
+
+def test_default_database_lives_in_data_dir(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+    monkeypatch.chdir(tmp_path)
+    settings = Settings()
+
+    db.get_engine(settings)
+    db.dispose_engines()
+
+    assert (settings.data_dir / "tomatempo.db").exists()
+    assert not (tmp_path / "data.db").exists()
+
+
+def test_engine_is_cached_and_reuses_connection(db_settings):
+    engine = db.get_engine(db_settings)
+
+    assert db.get_engine(db_settings) is engine
+    with engine.connect() as first:
+        first_dbapi = first.connection.dbapi_connection
+    with engine.connect() as second:
+        assert second.connection.dbapi_connection is first_dbapi
+
+
+def test_read_only_engine(db_settings):
+    with db.get_session(db_settings) as session:
+        session.exec(text("CREATE TABLE t (x INTEGER)"))  # type: ignore[call-overload]
+        session.exec(text("INSERT INTO t VALUES (1)"))  # type: ignore[call-overload]
+        session.commit()
+
+    reader = db.get_engine(db_settings, read_only=True)
+
+    assert reader is not db.get_engine(db_settings)
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 1
+        assert pragma(conn, "query_only") == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+
+
+def test_read_only_needs_a_file():
+    with pytest.raises(ValueError, match="database file"):
+        db.build_engine("sqlite://", SqlitePragmas(), read_only=True)
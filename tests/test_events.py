@@ -0,0 +1,103 @@
+import json
+
+from typer.testing import CliRunner
+
+from tomatempo import events
+from tomatempo.cli import app
+from tomatempo.events import ChangeCounter, EventFeed
+
+
+def test_publish_bumps_counter_and_appends(tmp_path):
+    feed = EventFeed(tmp_path / "cache")
+    counter = feed.counter()
+    assert counter.value == 0
+
+    assert feed.publish("timer.start", task_id=1) == 1
+    assert feed.publish("timer.pause") == 2
+
+    assert counter.value == 2
+    assert [(e["seq"], e["kind"], e["data"]) for e in feed.read()] == [
+        (1, "timer.start", {"task_id": 1}),
+        (2, "timer.pause", {}),
+    ]
+
+
+def test_wait_times_out_without_events(tmp_path):
+    feed = EventFeed(tmp_path)
+    feed.publish("timer.start")
+
+    assert feed.counter().wait(1, timeout=0.01, interval=0.001) == 1
+    assert feed.counter().wait(0) == 1
+
+
+def test_follow(tmp_path):
+    feed = EventFeed(tmp_path)
+    feed.publish("a")
+
+    everything = feed.follow(interval=0.001)
+    new_only = feed.follow(from_start=False, interval=0.001)
+    feed.publish("b")
+
+    assert next(everything)["kind"] == "a"
+    assert next(everything)["kind"] == "b"
+    assert next(new_only)["kind"] == "b"
+    feed.publish("c")
+    assert next(everything)["kind"] == "c"
+    assert next(new_only)["kind"] == "c"
+
+
+def test_follow_across_rotation(tmp_path, monkeypatch):
+    monkeypatch.setattr(events, "MAX_FEED_BYTES", 100)
+    feed = EventFeed(tmp_path)
+    early = feed.follow(interval=0.001)
+    feed.publish("tick", i=0)
+    assert next(early)["data"]["i"] == 0
+
+    for i in range(1, 10):
+        feed.publish("tick", i=i)
+    late = feed.follow(interval=0.001)
+
+    assert (tmp_path / "events.jsonl.3").exists()
+    assert [e["data"]["i"] for e in feed.read()] == list(range(10))
+    assert [next(early)["data"]["i"] for _ in range(9)] == list(range(1, 10))
+    assert [next(late)["data"]["i"] for _ in range(10)] == list(range(10))
+
+
+def test_counter_follows_a_recreated_file(tmp_path):
+    feed = EventFeed(tmp_path)
+    counter = feed.counter()
+    feed.publish("a")
+    feed.publish("b")
+    assert counter.value == 2
+
+    feed.counter_path.unlink()
+    feed.feed_path.unlink()
+    assert counter.value == 0
+    feed.publish("c")
+
+    assert counter.value == 1
+
+
+def test_half_written_line_is_not_read(tmp_path):
+    feed = EventFeed(tmp_path)
+    feed.publish("a")
+    with open(feed.feed_path, "a") as f:
+        f.write('{"seq": 2, "kind"')
+
+    assert [e["kind"] for e in feed.read()] == ["a"]
+
+
+def test_counter_before_first_event(tmp_path):
+    (tmp_path / "events.counter").touch()
+
+    assert ChangeCounter(tmp_path / "events.counter").value == 0
+
+
+def test_events_command(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+    EventFeed.from_settings().publish("focus.set", task_id=4)
+
+    result = CliRunner().invoke(app, ["events"])
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["data"] == {"task_id": 4}
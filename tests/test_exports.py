@@ -0,0 +1,140 @@
+import csv
+import gzip
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from tomatempo import db
+from tomatempo.cli import app
+from tomatempo.exports import ExportError, export, iter_batches, write_atomic
+from tomatempo.rollups import TomatoRules
+from tomatempo.slices import insert_slices
+from tomatempo.timer import ClosedSlice
+
+DAY = 86_400
+SLICES = [
+    ClosedSlice(1, 1_700_000_000, 1_700_000_090),
+    ClosedSlice(None, 1_700_000_090, 1_700_000_100, "break"),
+    ClosedSlice(2, 1_700_000_000 + 3 * DAY, 1_700_000_060 + 3 * DAY),
+]
+
+
+@pytest.fixture
+def conn(db_settings):
+    with db.get_engine(db_settings).begin() as conn:
+        insert_slices(conn, SLICES, TomatoRules())
+        yield conn
+
+
+def test_export_csv(conn, tmp_path):
+    out = tmp_path / "slices.csv"
+
+    assert export(conn, out, "csv") == 3
+
+    rows = list(csv.DictReader(out.open()))
+    assert [r["id"] for r in rows] == ["1", "2", "3"]
+    assert rows[0] == {
+        "id": "1",
+        "task_id": "1",
+        "start": "2023-11-14T22:13:20+00:00",
+        "end": "2023-11-14T22:14:50+00:00",
+        "seconds": "90",
+        "type": "work",
+        "origin": "auto",
+    }
+    assert rows[1]["task_id"] == ""
+
+
+def test_export_json_and_jsonl(conn, tmp_path):
+    export(conn, tmp_path / "slices.json", "json")
+    export(conn, tmp_path / "slices.jsonl", "jsonl")
+
+    records = json.loads((tmp_path / "slices.json").read_text())
+    lines = (tmp_path / "slices.jsonl").read_text().splitlines()
+    assert [json.loads(line) for line in lines] == records
+    assert records[1] == {
+        "id": 2,
+        "task_id": None,
+        "start": "2023-11-14T22:14:50+00:00",
+        "end": "2023-11-14T22:15:00+00:00",
+        "seconds": 10,
+        "type": "break",
+        "origin": "auto",
+    }
+
+
+def test_export_range(conn, tmp_path):
+    out = tmp_path / "week.json"
+    start = 1_700_000_000 + 2 * DAY
+
+    assert export(conn, out, "json", start, start + 7 * DAY) == 1
+    assert [r["id"] for r in json.loads(out.read_text())] == [3]
+
+    assert export(conn, out, "json", start, start + 60) == 0
+    assert json.loads(out.read_text()) == []
+
+
+def test_export_batches(conn):
+    batches = list(iter_batches(conn, batch_size=2))
+
+    assert [len(b) for b in batches] == [2, 1]
+
+
+def test_export_gzip(conn, tmp_path):
+    out = tmp_path / "slices.jsonl.gz"
+
+    export(conn, out, "jsonl")
+
+    assert len(gzip.decompress(out.read_bytes()).splitlines()) == 3
+
+
+def test_export_zstd(conn, tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    out = tmp_path / "slices.csv.zst"
+
+    export(conn, out, "csv")
+
+    with zstandard.open(out, "rt") as f:
+        assert len(f.read().splitlines()) == 4
+
+
+def test_failed_export_keeps_the_old_file(tmp_path):
+    out = tmp_path / "slices.csv"
+    out.write_text("previous export")
+
+    def chunks():
+        yield "id\n"
+        raise RuntimeError("disk on fire")
+
+    with pytest.raises(RuntimeError):
+        write_atomic(chunks(), out)
+
+    assert out.read_text() == "previous export"
+    assert list(tmp_path.iterdir()) == [out]
+
+
+def test_compressed_stdout_is_rejected(conn):
+    with pytest.raises(ExportError):
+        export(conn, None, "csv", compression="gzip")
+
+
+def test_export_command(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+    with db.get_engine().begin() as c:
+        insert_slices(c, SLICES, TomatoRules())
+
+    runner = CliRunner()
+    result = runner.invoke(app, ["export", "--format", "jsonl", "--out", "out.jsonl"])
+    assert result.exit_code == 0, result.output
+    assert len((tmp_path / "out.jsonl").read_text().splitlines()) == 3
+
+    result = runner.invoke(app, ["export", "--range", "2023-11-14"])
+    assert result.exit_code == 0
+    assert result.output.startswith("id,task_id,start,end,seconds,type,origin\n")
+
+    result = runner.invoke(app, ["export", "--out", "missing/out.csv"])
+    assert result.exit_code == 1
+    assert result.output.startswith("error: ")
+    assert isinstance(result.exception, SystemExit)  # not the FileNotFoundError
+    db.dispose_engines()
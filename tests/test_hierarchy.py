@@ -0,0 +1,189 @@
+import pytest
+from sqlalchemy import text
+from typer.testing import CliRunner
+
+from tomatempo import db, hierarchy
+from tomatempo.cli import app
+from tomatempo.hierarchy import HierarchyError, ancestors, descendants, move, tree
+from tomatempo.models import Deliverable, Initiative, Project, Task
+from tomatempo.rollups import TomatoRules, check, get_counts
+from tomatempo.settings import get_settings
+from tomatempo.slices import insert_slices
+from tomatempo.timer import ClosedSlice
+
+MIN = 60
+RULES = TomatoRules(25 * MIN)
+
+
+@pytest.fixture
+def engine(db_settings):
+    engine = db.get_engine(db_settings)
+    with db.get_session(db_settings) as session:
+        for row in (
+            Project(id=1, name="Thesis"),
+            Initiative(id=2, project_id=1, name="Chapter 1"),
+            Initiative(id=3, project_id=1, name="Chapter 2"),
+            Deliverable(id=4, initiative_id=2, name="Draft"),
+            Deliverable(id=5, initiative_id=3, name="Outline"),
+            Task(id=10, deliverable_id=4, name="Read"),
+            Task(id=11, deliverable_id=4, name="Write"),
+            Task(id=12, deliverable_id=5, name="Plan"),
+            Task(id=13, name="Loose"),
+        ):
+            session.add(row)
+            session.flush()
+        session.commit()
+    with engine.begin() as conn:
+        insert_slices(
+            conn, [ClosedSlice(10, 0, 30 * MIN), ClosedSlice(11, 30 * MIN, 80 * MIN)], RULES
+        )
+    return engine
+
+
+def links(conn):
+    return set(conn.execute(text("SELECT * FROM hierarchy")))
+
+
+def test_triggers_link_new_entities(engine):
+    with engine.connect() as conn:
+        assert ancestors(conn, "task", 10) == [
+            ("deliverable", 4),
+            ("initiative", 2),
+            ("project", 1),
+        ]
+        assert ancestors(conn, "task", 13) == []
+        assert descendants(conn, "project", 1) == [10, 11, 12]
+        assert descendants(conn, "initiative", 2, of_type="deliverable") == [4]
+        assert descendants(conn, "task", 12) == [12]
+
+
+def test_rebuild_matches_the_triggers(engine):
+    with engine.begin() as conn:
+        maintained = links(conn)
+        assert hierarchy.rebuild(conn) == len(maintained)
+        assert links(conn) == maintained
+
+
+def test_tree_with_totals(engine):
+    with engine.connect() as conn:
+        root = tree(conn, "project", 1)
+        shallow = tree(conn, "project", 1, depth=1)
+        with pytest.raises(HierarchyError, match="project 9 not found"):
+            tree(conn, "project", 9)
+
+    assert (root.name, root.seconds, root.tomatoes) == ("Thesis", 80 * MIN, 3)
+    assert [i.name for i in root.children] == ["Chapter 1", "Chapter 2"]
+    draft = root.children[0].children[0]
+    assert [(t.id, t.seconds, t.tomatoes) for t in draft.children] == [
+        (10, 30 * MIN, 1),
+        (11, 50 * MIN, 2),
+    ]
+    assert root.children[1].tomatoes == 0
+    assert [i.children for i in shallow.children] == [[], []]
+
+
+def test_move_deliverable_carries_its_subtree(engine):
+    with engine.begin() as conn:
+        assert move(conn, RULES, "deliverable", 4, 3) == [("initiative", 3), ("project", 1)]
+
+    with engine.connect() as conn:
+        assert ancestors(conn, "task", 11) == [
+            ("deliverable", 4),
+            ("initiative", 3),
+            ("project", 1),
+        ]
+        assert descendants(conn, "initiative", 2) == []
+        assert descendants(conn, "initiative", 3) == [10, 11, 12]
+        assert get_counts(conn, ("initiative", 2)).seconds == 0
+        assert get_counts(conn, ("initiative", 3)).tomatoes == 3
+        assert check(conn, RULES) == {}
+        maintained = links(conn)
+    with engine.begin() as conn:
+        hierarchy.rebuild(conn)
+        assert links(conn) == maintained
+
+
+def test_move_task(engine):
+    with engine.begin() as conn:
+        move(conn, RULES, "task", 11, 5)
+        move(conn, RULES, "task", 10, None)
+        move(conn, RULES, "task", 13, 5)
+
+    with engine.connect() as conn:
+        assert descendants(conn, "deliverable", 5) == [11, 12, 13]
+        assert ancestors(conn, "task", 10) == []
+        assert get_counts(conn, ("deliverable", 4)).seconds == 0
+        assert get_counts(conn, ("initiative", 3)).tomatoes == 2
+        assert check(conn, RULES) == {}
+
+
+def test_move_checks_the_entities(engine):
+    with engine.begin() as conn:
+        with pytest.raises(HierarchyError, match="can't move a project"):
+            move(conn, RULES, "project", 1, None)
+        with pytest.raises(HierarchyError, match="deliverable 9 not found"):
+            move(conn, RULES, "task", 10, 9)
+        with pytest.raises(HierarchyError, match="task 99 not found"):
+            move(conn, RULES, "task", 99, 4)
+        with pytest.raises(HierarchyError, match="can't leave its initiative"):
+            move(conn, RULES, "deliverable", 4, None)
+
+
+def test_delete_unlinks(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM tasks WHERE id = 12"))
+        assert descendants(conn, "project", 1) == [10, 11]
+        assert descendants(conn, "task", 12) == []
+
+
+def test_closure_is_added_to_existing_databases(engine, db_settings):
+    with engine.begin() as conn:
+        for kind in hierarchy.LEVELS:
+            for action in ("insert", "delete", "move"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS hierarchy_{kind}_{action}"))
+        conn.execute(text("DROP TABLE hierarchy"))
+    db.dispose_engines()
+
+    with db.get_engine(db_settings).connect() as conn:
+        assert descendants(conn, "project", 1) == [10, 11, 12]
+
+
+def test_hierarchy_commands(engine, db_settings, monkeypatch):
+    monkeypatch.setenv("APP_DATABASE_URL", db_settings.database_url)
+    get_settings.cache_clear()
+    runner = CliRunner()
+
+    result = runner.invoke(app, ["project", "show", "1", "--deep"])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        "project 1 Thesis [active]  1:20:00  3 tomatoes",
+        "  initiative 2 Chapter 1 [active]  1:20:00  3 tomatoes",
+        "    deliverable 4 Draft [open]  1:20:00  3 tomatoes",
+        "      task 10 Read [todo]  30:00  1 tomatoes",
+        "      task 11 Write [todo]  50:00  2 tomatoes",
+        "  initiative 3 Chapter 2 [active]  00:00  0 tomatoes",
+        "    deliverable 5 Outline [open]  00:00  0 tomatoes",
+        "      task 12 Plan [todo]  00:00  0 tomatoes",
+    ]
+
+    result = runner.invoke(app, ["deliverable", "move", "4", "--to", "3"])
+    assert result.exit_code == 0, result.output
+    assert "moved deliverable 4 to initiative 3" in result.output
+
+    result = runner.invoke(app, ["initiative", "show", "3"])
+    assert result.output.splitlines() == [
+        "initiative 3 Chapter 2 [active]  1:20:00  3 tomatoes",
+        "  deliverable 4 Draft [open]  1:20:00  3 tomatoes",
+        "  deliverable 5 Outline [open]  00:00  0 tomatoes",
+    ]
+
+    result = runner.invoke(app, ["task", "move", "10"])
+    assert "moved task 10 to no deliverable" in result.output
+
+    result = runner.invoke(app, ["task", "move", "10", "--to", "8"])
+    assert result.exit_code == 1
+    assert "deliverable 8 not found" in result.output
+
+    result = runner.invoke(app, ["index", "rebuild"])
+    assert result.exit_code == 0, result.output
+    assert "rebuilt the hierarchy (" in result.output
@@ -0,0 +1,155 @@
+import datetime as dt
+import json
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import text
+from typer.testing import CliRunner
+
+from tomatempo import db, imports
+from tomatempo.cli import app
+from tomatempo.exports import export
+from tomatempo.imports import (
+    ImportFileError,
+    detect_format,
+    import_file,
+    normalize,
+    to_utc_seconds,
+)
+from tomatempo.rollups import TomatoRules, check
+from tomatempo.slices import insert_slices, query_columns
+from tomatempo.timer import ClosedSlice
+
+T0 = 1_700_000_000
+LISBON = ZoneInfo("Europe/Lisbon")
+
+TOGGL_HEADER = "User,Email,Project,Description,Start date,Start time,End date,End time,Duration\n"
+
+
+def slices_in(settings):
+    with db.get_engine(settings).connect() as conn:
+        return conn.execute(
+            text("SELECT task_id, start_ts, end_ts, type, origin FROM slices ORDER BY start_ts")
+        ).all()
+
+
+def test_to_utc_seconds():
+    assert to_utc_seconds(T0) == T0
+    assert to_utc_seconds(str(T0)) == T0
+    assert to_utc_seconds("2023-11-14T22:13:20+00:00") == T0
+    # Naive values are in the given zone, with its DST rules
+    assert to_utc_seconds("2024-07-01T10:00:00", LISBON) == to_utc_seconds(
+        "2024-07-01T09:00:00+00:00"
+    )
+    assert to_utc_seconds("2024-01-01T10:00:00", LISBON) == to_utc_seconds(
+        "2024-01-01T10:00:00+00:00"
+    )
+
+
+def test_normalize_rejects_invalid_records():
+    with pytest.raises(ValueError, match="not after start"):
+        normalize({"start": T0, "end": T0}, "tomatempo")
+    with pytest.raises(ValueError, match="invalid type"):
+        normalize({"start": T0, "end": T0 + 1, "type": "nap"}, "tomatempo")
+    with pytest.raises(ValueError, match="missing end"):
+        normalize({"start": T0}, "tomatempo")
+
+
+def test_detect_format(tmp_path):
+    toggl = tmp_path / "toggl.csv"
+    toggl.write_text(TOGGL_HEADER)
+    ours = tmp_path / "slices.csv"
+    ours.write_text("id,task_id,start,end,seconds,type,origin\n")
+    other = tmp_path / "other.csv"
+    other.write_text("a,b\n")
+
+    assert detect_format(toggl) == "toggl"
+    assert detect_format(ours) == "tomatempo"
+    assert detect_format(tmp_path / "slices.jsonl") == "tomatempo"
+    with pytest.raises(ImportFileError, match="unknown format"):
+        detect_format(other)
+
+
+def test_export_round_trips_through_import(db_settings, tmp_path):
+    source = [ClosedSlice(1, T0, T0 + 1500), ClosedSlice(None, T0 + 1500, T0 + 1800, "break")]
+    with db.get_engine(db_settings).begin() as conn:
+        insert_slices(conn, source, TomatoRules())
+        export(conn, tmp_path / "slices.jsonl", "jsonl")
+        conn.execute(text("DELETE FROM slice_buckets"))
+        conn.execute(text("DELETE FROM slices"))
+        conn.execute(text("DELETE FROM rollups"))
+
+    result = import_file(tmp_path / "slices.jsonl", settings=db_settings)
+
+    assert (result.inserted, result.skipped) == (2, 0)
+    assert slices_in(db_settings) == [
+        (1, T0, T0 + 1500, "work", "import"),
+        (None, T0 + 1500, T0 + 1800, "break", "import"),
+    ]
+    with db.get_engine(db_settings).connect() as conn:
+        assert check(conn, TomatoRules()) == {}
+        assert len(query_columns(conn, T0, T0 + 60)) == 1  # the bucket index is rebuilt
+
+
+def test_toggl_import_goes_to_the_pool(db_settings, tmp_path):
+    path = tmp_path / "toggl.csv"
+    path.write_text(
+        TOGGL_HEADER
+        + "ana,a@x,Site,Copy,2024-07-01,10:00:00,2024-07-01,10:25:00,00:25:00\n"
+        + "ana,a@x,Site,Bad,2024-07-01,11:00:00,2024-07-01,10:00:00,00:00:00\n"
+    )
+
+    result = import_file(path, tz=LISBON, settings=db_settings)
+
+    start = int(dt.datetime(2024, 7, 1, 9, tzinfo=dt.UTC).timestamp())
+    assert slices_in(db_settings) == [(None, start, start + 1500, "work", "import")]
+    assert (result.rows_read, result.inserted, result.skipped) == (2, 1, 1)
+    assert result.errors == [f"record 2: end {start} is not after start {start + 3600}"]
+
+
+def test_interrupted_import_resumes(db_settings, tmp_path, monkeypatch):
+    path = tmp_path / "slices.jsonl"
+    path.write_text(
+        "".join(
+            json.dumps({"start": T0 + i * 100, "end": T0 + i * 100 + 50}) + "\n" for i in range(10)
+        )
+    )
+    real_save = imports._save_run
+    calls = []
+
+    def crash_on_second_batch(conn, run):
+        calls.append(run.rows_read)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        real_save(conn, run)
+
+    monkeypatch.setattr(imports, "_save_run", crash_on_second_batch)
+    with pytest.raises(KeyboardInterrupt):
+        import_file(path, settings=db_settings, batch_size=4)
+    assert len(slices_in(db_settings)) == 4  # the second batch was rolled back
+
+    monkeypatch.setattr(imports, "_save_run", real_save)
+    result = import_file(path, settings=db_settings, batch_size=4)
+
+    assert result.resumed_at == 4
+    assert result.inserted == 10
+    assert [row[1] for row in slices_in(db_settings)] == [T0 + i * 100 for i in range(10)]
+
+    again = import_file(path, settings=db_settings)
+    assert again.already_done
+    assert len(slices_in(db_settings)) == 10
+
+
+def test_import_command(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+    path = tmp_path / "slices.csv"
+    path.write_text(f"task_id,start,end\n3,{T0},{T0 + 600}\n,{T0 + 600},oops\n")
+    runner = CliRunner()
+
+    result = runner.invoke(app, ["import", str(path)])
+
+    assert result.exit_code == 0, result.output
+    assert "imported 1 slices (1 skipped)" in result.output
+    assert "rows/s" in result.output
+    assert "already imported" in runner.invoke(app, ["import", str(path)]).output
+    db.dispose_engines()
@@ -28,7 +28,7 @@ def test_smoke_imports_help(tsettings_test):
 
     runner = CliRunner()
 
-    result = runner.invoke(app, ["tomatempo", "--help"])
+    result = runner.invoke(app, ["hello", "--help"])
 
     assert result.exit_code == 0
     assert "Arguments" in result.output
@@ -0,0 +1,81 @@
+import logging
+
+import pytest
+from typer.testing import CliRunner
+
+from tomatempo import instrument
+from tomatempo.cli import app
+from tomatempo.instrument import span, timed
+
+
+@pytest.fixture
+def enabled():
+    """Liga a instrumentação durante o teste e desliga ao final."""
+    instrument.enable()
+    yield
+    instrument.disable()
+
+
+def test_disabled_spans_record_nothing():
+    @timed()
+    def work():
+        return 42
+
+    with span("outer"):
+        assert work() == 42
+
+    assert span("a") is span("b")
+    assert not instrument.is_enabled()
+
+
+def test_spans_nest(enabled):
+    @timed("inner")
+    def inner():
+        pass
+
+    with span("outer"):
+        inner()
+        inner()
+
+    records = instrument.spans()
+    assert [(r.path, r.depth) for r in records] == [
+        ("outer/inner", 1),
+        ("outer/inner", 1),
+        ("outer", 0),
+    ]
+    assert records[-1].duration >= records[0].duration + records[1].duration
+
+
+def test_span_is_logged_with_extras(enabled, caplog):
+    with caplog.at_level(logging.DEBUG, logger="tomatempo.instrument"), span("db.open"):
+        pass
+
+    (record,) = caplog.records
+    assert (record.span, record.span_path) == ("db.open", "db.open")
+    assert record.duration_ms >= 0
+
+
+def test_summary_lists_parents_before_children(enabled):
+    with span("command"):
+        with span("settings"):
+            pass
+        with span("settings"):
+            pass
+
+    lines = instrument.summary().splitlines()
+    assert lines[0].split() == ["phase", "calls", "ms"]
+    assert lines[1].startswith("command ")
+    assert lines[2].startswith("  settings ")
+    assert lines[2].split()[1] == "2"
+    assert lines[-1].startswith("total")
+
+
+def test_profile_flag_prints_summary(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+
+    result = CliRunner().invoke(app, ["--profile", "view", "timer"])
+    instrument.disable()
+
+    assert result.exit_code == 0, result.output
+    assert "command view" in result.output
+    assert "render" in result.output
@@ -0,0 +1,194 @@
+import json
+import os
+
+import pytest
+
+from tomatempo import journal as journal_module
+from tomatempo.journal import (
+    RECORD_SIZE,
+    TimerJournal,
+    current_state,
+    fold,
+    read_journal,
+    read_snapshot,
+    replay,
+    write_snapshot,
+)
+from tomatempo.timer import ClosedSlice, TimerService, TimerState, load_state, save_state
+from tomatempo.watch import TimerDashboard
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return tmp_path / "state" / "timer.journal", tmp_path / "state" / "state.json"
+
+
+def run(journal, service, cmd, utc, **args):
+    """Run a command at `utc` and journal it, like the daemon does."""
+    service.clock = lambda: utc
+    service.call(cmd, args)
+    journal.append(cmd, args, utc, service.state)
+
+
+def session(journal):
+    """Start at 1000, switch to task 7 at 1300, pause at 1500."""
+    service = TimerService()
+    run(journal, service, "timer.start", 1000, duration=1500)
+    run(journal, service, "focus.set", 1300, task_id=7)
+    run(journal, service, "timer.pause", 1500)
+    run(journal, service, "timer.start", 1600)
+    return service
+
+
+def test_recovery_replays_events_into_slices(paths):
+    journal = TimerJournal(*paths)
+    assert journal.recover().state == TimerState()
+    service = session(journal)
+    journal.close()  # no snapshot: everything comes from the journal
+
+    recovery = TimerJournal(*paths).recover()
+
+    assert recovery.state == service.state
+    assert recovery.state.running
+    assert recovery.state.slice_start == 1600
+    assert recovery.events == 4
+    assert replay(TimerState(), read_journal(paths[0])[0])[1] == [
+        ClosedSlice(None, 1000, 1300),
+        ClosedSlice(7, 1300, 1500),
+    ]
+
+
+def test_torn_tail_is_dropped(paths):
+    journal = TimerJournal(*paths)
+    journal.recover()
+    session(journal)
+    journal.close()
+    path = paths[0]
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")  # a partially written record
+    size = path.stat().st_size
+
+    recovery = TimerJournal(*paths).recover()
+
+    assert recovery.events == 4
+    assert recovery.torn_bytes == 3
+    assert path.stat().st_size == size - 3
+
+
+def test_corrupt_record_ends_the_replay(paths):
+    journal = TimerJournal(*paths)
+    journal.recover()
+    session(journal)
+    journal.close()
+    data = bytearray(paths[0].read_bytes())
+    data[4 + 2 * RECORD_SIZE + 10] ^= 0xFF  # inside the pause record
+    paths[0].write_bytes(bytes(data))
+
+    journal = TimerJournal(*paths)
+    recovery = journal.recover()
+
+    assert recovery.events == 2
+    assert recovery.state.running
+    assert recovery.state.task_id == 7
+    assert recovery.torn_bytes == 2 * RECORD_SIZE
+    # Appends continue after the last good record
+    service = TimerService(recovery.state)
+    run(journal, service, "timer.stop", 1400)
+    journal.close()
+    assert TimerJournal(*paths).recover().state == service.state
+    assert replay(TimerState(), read_journal(paths[0])[0])[1][-1] == ClosedSlice(7, 1300, 1400)
+
+
+def test_compaction_writes_the_snapshot(paths):
+    journal = TimerJournal(*paths, compact_bytes=4 + 3 * RECORD_SIZE)
+    journal.recover()
+    service = session(journal)
+
+    # Compacted on the third event, the fourth is in the journal
+    assert paths[0].stat().st_size == 4 + RECORD_SIZE
+    assert read_snapshot(paths[1])[1] == 3
+    assert load_state(paths[1]) == TimerState(task_id=7, duration=1500, elapsed=500)
+    assert current_state(*paths) == service.state
+
+    journal.close(service.state)
+    assert paths[0].stat().st_size == 4
+    assert read_snapshot(paths[1]) == (service.state, 4)
+    assert TimerJournal(*paths).recover().seq == 4
+
+
+def test_crash_between_snapshot_and_truncation(paths):
+    journal = TimerJournal(*paths)
+    journal.recover()
+    service = session(journal)
+    journal.close()
+    write_snapshot(paths[1], service.state, 4)  # the journal still holds events 1-4
+
+    recovery = TimerJournal(*paths).recover()
+
+    assert recovery.state == service.state
+    assert recovery.events == 0
+
+
+def test_group_commit(paths, monkeypatch):
+    syncs = []
+    monkeypatch.setattr(journal_module.os, "fsync", syncs.append)
+    journal = TimerJournal(*paths, sync_every=3, sync_interval=60)
+    journal.recover()
+
+    session(journal)
+    assert len(syncs) == 1  # after the third event
+
+    journal.sync_interval = 0
+    journal.sync_if_due()
+    assert len(syncs) == 2
+    journal.sync_if_due()  # nothing new to sync
+    assert len(syncs) == 2
+
+
+def test_fold_compacts_a_left_over_journal(paths):
+    journal = TimerJournal(*paths)
+    journal.recover()
+    service = session(journal)
+    os.close(journal._fd)  # the daemon died without closing it
+
+    assert fold(*paths) == service.state
+    assert paths[0].stat().st_size == 4
+    assert json.loads(paths[1].read_text())["journal_seq"] == 4
+    assert fold(*paths) == service.state
+
+
+def test_in_process_run_after_a_crash_before_truncation(paths):
+    """
+    Ensure that events a snapshot already includes aren't replayed once an
+    in-process run has saved the state without a sequence number.
+    """
+    journal = TimerJournal(*paths)
+    journal.recover()
+    service = session(journal)
+    os.close(journal._fd)
+    write_snapshot(paths[1], service.state, 4)  # crashed before the truncation
+
+    state = fold(*paths)
+    assert state == service.state
+    assert paths[0].stat().st_size == 4
+    # The in-process command, saved like client.execute_in_process does
+    service = TimerService(state, clock=lambda: 1700)
+    service.call("timer.stop", {})
+    save_state(paths[1], service.state)
+
+    assert TimerJournal(*paths).recover().state == service.state
+    assert current_state(*paths) == service.state
+
+
+def test_timer_dashboard_reads_the_journal(paths):
+    dashboard = TimerDashboard(paths[1], paths[0])
+    dashboard.refresh()
+    journal = TimerJournal(*paths)
+    journal.recover()
+    service = TimerService()
+    run(journal, service, "timer.start", 1000, duration=1500)
+
+    assert dashboard.changed()
+    dashboard.refresh()
+    assert dashboard.lines(1090)[0] == "Timer    running"
+    journal.close()
@@ -1,6 +1,30 @@
+import copy
+import datetime as dt
+import io
 import json
-
-from tomatempo.logs import LOGGER, NonErrorFilter
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+import pytest
+
+from tomatempo import logs
+from tomatempo.logs import (
+    DEFAULT_LOGGING_CONFIG,
+    LOGGER,
+    LOGGING_CACHE_FILE,
+    BatchingQueueListener,
+    BoundedQueueHandler,
+    JSONFormatter,
+    NonErrorFilter,
+    RateLimitFilter,
+    SampleFilter,
+    load_logging_config,
+    setup_logging,
+    validate_logging_config,
+)
 
 
 def test_json_formatter_formats_record(log_records, json_formatter):
@@ -59,6 +83,111 @@ def test_json_formatter_handles_exceptions(caplog):
     assert "division by zero" in caplog.text
 
 
+@pytest.fixture
+def compiled_formatter(json_formatter):
+    return JSONFormatter(fmt_keys=json_formatter.fmt_keys, compiled=True)
+
+
+def test_compiled_formatter_is_byte_identical(log_records, json_formatter, compiled_formatter):
+    """
+    Ensure that the compiled mode writes exactly the same bytes as the default mode,
+    including extra fields.
+    """
+
+    for record in log_records:
+        assert compiled_formatter.format(record) == json_formatter.format(record)
+
+
+def test_compiled_formatter_is_byte_identical_with_exc_and_stack(
+    json_formatter, compiled_formatter
+):
+    """
+    Ensure that exc_info and stack_info are serialized in the same position and format.
+    """
+
+    try:
+        raise ZeroDivisionError("division by zero")
+    except ZeroDivisionError:
+        exc_info = sys.exc_info()
+
+    record = logging.LogRecord(
+        "test", 40, __file__, 10, "Failed %s", ("here",), exc_info, sinfo="Stack (most recent)"
+    )
+    record.payload = {"a": dt.date(2023, 1, 1)}
+
+    assert compiled_formatter.format(record) == json_formatter.format(record)
+
+
+@pytest.mark.parametrize(
+    "fmt_keys",
+    [
+        {},
+        {"line": "lineno"},
+        {"msg": "message", "again": "message"},
+        {"error": "exc_info", "when": "timestamp", "level": "levelname"},
+        {"level": "levelname", "test_field": "test_field"},
+    ],
+)
+def test_compiled_formatter_handles_unusual_fmt_keys(log_record_info, fmt_keys):
+    """
+    Check that the extraction plan mirrors the default mode for duplicated, missing
+    and extra-field keys.
+    """
+
+    log_record_info.message = "stale"
+    log_record_info.test_field = "Test field"
+    default = JSONFormatter(fmt_keys=fmt_keys)
+    compiled = JSONFormatter(fmt_keys=fmt_keys, compiled=True)
+
+    assert compiled.format(log_record_info) == default.format(log_record_info)
+
+
+def test_compiled_timestamp_matches_datetime(compiled_formatter):
+    """
+    Confirm that the cached timestamp matches datetime.isoformat, including
+    microsecond rounding across second boundaries.
+    """
+
+    rng = random.Random(42)
+    samples = [0.0, 1.9999996, 1672574400.0, 1672574400.5, 1672574400.9999995]
+    samples += [rng.uniform(0, 2_000_000_000) for _ in range(2000)]
+
+    for created in sorted(samples):
+        expected = dt.datetime.fromtimestamp(created, tz=dt.UTC).isoformat()
+        assert compiled_formatter.iso_timestamp(created) == expected
+
+
+def test_json_backend_auto_falls_back_to_stdlib(monkeypatch, log_record_info, json_formatter):
+    """
+    Ensure that json_backend='auto' uses the stdlib serializer when orjson is missing.
+    """
+
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    formatter = JSONFormatter(fmt_keys=json_formatter.fmt_keys, compiled=True, json_backend="auto")
+
+    assert formatter.format(log_record_info) == json_formatter.format(log_record_info)
+
+
+def test_json_backend_orjson_is_equivalent(log_record_info, json_formatter):
+    """
+    Ensure that the orjson backend produces the same JSON document.
+    """
+
+    pytest.importorskip("orjson")
+    formatter = JSONFormatter(
+        fmt_keys=json_formatter.fmt_keys, compiled=True, json_backend="orjson"
+    )
+
+    assert json.loads(formatter.format(log_record_info)) == json.loads(
+        json_formatter.format(log_record_info)
+    )
+
+
+def test_invalid_json_backend_raises():
+    with pytest.raises(ValueError, match="invalid json_backend"):
+        JSONFormatter(json_backend="pickle")
+
+
 def test_non_error_filter_allows_info_and_below_and_block_above(log_records):
     """
     Ensure that NonErrorFilter allows DEBUG and INFO log records.
@@ -73,49 +202,334 @@ def test_non_error_filter_allows_info_and_below_and_block_above(log_records):
     assert f.filter(log_records[5]) is False
 
 
-def test_setup_logging_creates_log_file():
+def make_record(msg, created, level=logging.INFO, name="tomatempo.test", args=()):
+    record = logging.makeLogRecord(
+        {"name": name, "msg": msg, "args": args, "levelno": level, "levelname": "INFO"}
+    )
+    record.created = created
+    return record
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def collected():
+    """Records that reach the "tomatempo.test" logger, summaries included."""
+    logger = logging.getLogger("tomatempo.test")
+    handler = Collect()
+    logger.addHandler(handler)
+    logger.propagate = False
+    yield handler.records
+    logger.removeHandler(handler)
+    logger.propagate = True
+
+
+def test_rate_limit_filter_is_a_token_bucket_per_template():
+    """
+    Ensure that RateLimitFilter lets a burst through, then `rate` records per second, per template.
+    """
+
+    f = RateLimitFilter(rate=2, burst=3)
+
+    kept = [f.filter(make_record("tick %d", 100.0, args=(i,))) for i in range(5)]
+    assert kept == [True, True, True, False, False]
+    assert f.filter(make_record("other", 100.0))
+    assert f.filter(make_record("tick %d", 100.5, args=(5,)))
+    assert not f.filter(make_record("tick %d", 100.5, args=(6,)))
+    assert f.filter(make_record("tick %d", 100.0, level=logging.WARNING))
+
+
+def test_sample_filter_keeps_one_in_n_debug_records():
+    """
+    Ensure that SampleFilter keeps the first of every N DEBUG records and leaves INFO alone.
+    """
+
+    f = SampleFilter(every=3)
+
+    kept = [f.filter(make_record("tick", 100.0, level=logging.DEBUG)) for _ in range(7)]
+    assert kept == [True, False, False, True, False, False, True]
+    assert all(f.filter(make_record("info", 100.0)) for _ in range(3))
+
+
+def test_suppressing_filters_need_a_policy():
+    class NoPolicy(logs._SuppressingFilter):
+        pass
+
+    with pytest.raises(TypeError, match="allow"):
+        NoPolicy()
+
+
+def test_suppressed_records_are_summarized(collected):
+    """
+    Verify that dropped records are reported once per interval as a summary record.
+    """
+
+    f = RateLimitFilter(rate=1, burst=1, summary_interval=5)
+
+    for i in range(4):
+        f.filter(make_record("tick", 100.0 + i / 10))
+    assert collected == []
+
+    assert f.filter(make_record("tick", 106.0))
+    (summary,) = collected
+    assert summary.getMessage() == "suppressed 3 similar messages"
+    assert (summary.suppressed, summary.template) == (3, "tick")
+    assert f.filter(summary)
+
+
+def test_bounded_queue_handler_drops_and_counts_when_full(log_records):
+    """
+    Ensure that a full BoundedQueueHandler with the drop policy discards records and counts them.
+    """
+
+    handler = BoundedQueueHandler(maxsize=2, policy="drop")
+
+    for record in log_records:
+        handler.handle(record)
+
+    assert handler.bounded_queue.qsize() == 2
+    assert handler.dropped == len(log_records) - 2
+
+
+def test_bounded_queue_handler_invalid_policy_raises():
+    with pytest.raises(ValueError, match="invalid policy"):
+        BoundedQueueHandler(policy="spill")
+
+
+def test_batching_listener_writes_each_batch_once(log_records):
+    """
+    Check that BatchingQueueListener writes a whole batch to a stream handler with one write.
+    """
+
+    class CountingStream(io.StringIO):
+        writes = 0
+
+        def write(self, s):
+            self.writes += 1
+            return super().write(s)
+
+    stream = CountingStream()
+    handler = logging.StreamHandler(stream)
+    records: queue.Queue = queue.Queue()
+    for i in range(100):
+        records.put(logging.LogRecord("test", 20, "", i, "line %d", (i,), None))
+
+    listener = BatchingQueueListener(records, handler, batch_size=50, flush_interval=1)
+    listener.start()
+    listener.stop()
+
+    assert stream.getvalue().splitlines() == [f"line {i}" for i in range(100)]
+    assert stream.writes == 2
+
+
+def test_batching_listener_respects_handler_level(log_records):
+    """
+    Ensure that handler levels are applied per record inside a batch.
+    """
+
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setLevel(logging.WARNING)
+    records: queue.Queue = queue.Queue()
+    for record in log_records:
+        records.put(record)
+
+    listener = BatchingQueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    listener.stop()
+
+    assert len(stream.getvalue().splitlines()) == 3
+
+
+def test_batching_listener_rolls_over_per_batch(tmp_path):
+    """
+    Confirm that RotatingFileHandler rolls over when a batch would exceed maxBytes.
+    """
+
+    log_file = tmp_path / "log.jsonl"
+    handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=200, backupCount=3)
+    listener = BatchingQueueListener(queue.Queue(), handler, batch_size=10, flush_interval=0)
+
+    for batch in range(3):
+        listener.handle_batch(
+            [
+                logging.LogRecord("test", 20, "", i, f"batch {batch} {i:03d}", None, None)
+                for i in range(10)
+            ]
+        )
+    handler.close()
+
+    assert log_file.read_text().splitlines()[0] == "batch 2 000"
+    assert (tmp_path / "log.jsonl.1").read_text().splitlines()[0] == "batch 1 000"
+
+
+def test_setup_logging_creates_log_file(logging_settings):
     """
     Confirm that setup_logging creates the expected log directory and file handler output file.
     """
-    # TODO
-    ...
+
+    setup_logging(logging_settings)
+    logging.getLogger("test").info("hello")
+    logs._stop_listener()
+
+    log_file = logging_settings.logs_dir / "log_tomatempo.jsonl"
+    assert log_file.exists()
+    assert json.loads(log_file.read_text())["message"] == "hello"
 
 
-def test_setup_logging_replaces_log_level():
+def test_setup_logging_replaces_log_level(logging_settings):
     """
     Verify that setup_logging applies the configured log level from Settings to the root logger.
     """
-    # TODO
-    ...
 
+    setup_logging(logging_settings)
 
-def test_queue_listener_is_started():
+    assert logging.getLogger().level == logging_settings.log_level_numeric
+
+
+def test_queue_listener_is_started(logging_settings):
     """
     Ensure that setup_logging attaches a QueueListener and that it is started.
     """
-    # TODO
-    ...
+
+    setup_logging(logging_settings)
+
+    assert isinstance(logs._listener, BatchingQueueListener)
+    assert logs._listener._thread is not None
+    assert logs._listener._thread.is_alive()
+    assert logs._listener.batch_size == logging_settings.log_batch_size
 
 
-def test_queue_handler_passes_logs_to_targets():
+def test_queue_handler_passes_logs_to_targets(logging_settings):
     """
     Check that log messages sent to the QueueHandler are passed to target handlers.
     """
-    # TODO
-    ...
 
+    setup_logging(logging_settings)
 
-def test_at_exit_listener_stops():
+    root = logging.getLogger()
+    assert len(root.handlers) == 1
+    assert isinstance(root.handlers[0], BoundedQueueHandler)
+    assert root.handlers[0].bounded_queue.maxsize == logging_settings.log_queue_size
+
+    target = logging.StreamHandler(io.StringIO())
+    logs._listener.handlers = (*logs._listener.handlers, target)
+    logging.getLogger("test").warning("to targets")
+    logs._stop_listener()
+
+    assert target.stream.getvalue() == "to targets\n"
+
+
+def test_at_exit_listener_stops(logging_settings):
     """
     Verify that the QueueListener is stopped on interpreter exit (atexit hook).
     """
-    # TODO
-    ...
+
+    setup_logging(logging_settings)
+    thread = logs._listener._thread
+
+    logs._stop_listener()
+
+    assert logs._listener is None
+    assert not thread.is_alive()
+
+
+def test_setup_logging_configures_producer_filters(logging_settings):
+    """
+    Verify that the queue handler gets the rate limit and DEBUG sampling filters from Settings.
+    """
+
+    logging_settings.log_rate_limit = 5
+    logging_settings.log_debug_sample = 4
+    setup_logging(logging_settings)
+
+    (qh,) = logging.getLogger().handlers
+    rate, sample = qh.filters
+    assert isinstance(rate, RateLimitFilter)
+    assert (rate.rate, rate.burst) == (5, logging_settings.log_rate_burst)
+    assert isinstance(sample, SampleFilter)
+    assert sample.every == 4
+
+    logging_settings.log_rate_limit = 0
+    logging_settings.log_debug_sample = 1
+    setup_logging(logging_settings)
+    assert logging.getLogger().handlers[0].filters == []
 
 
-def test_logging_yaml_formatters_are_loaded():
+def test_logging_yaml_formatters_are_loaded(logging_settings):
     """
     Confirm that the YAML configuration file correctly initializes both the 'simple' and 'json' formatters.
     """
-    # TODO
-    ...
+
+    setup_logging(logging_settings)
+
+    formatters = {type(h.formatter) for h in logs._listener.handlers}
+
+    assert formatters == {logging.Formatter, JSONFormatter}
+
+
+def test_default_logging_config_matches_packaged_yaml():
+    """
+    Keep the pure-Python default in sync with config/logging.yaml.
+    """
+
+    from importlib import resources
+
+    import yaml
+
+    packaged = resources.files("tomatempo") / "config" / "logging.yaml"
+    assert yaml.safe_load(packaged.read_text(encoding="utf-8")) == DEFAULT_LOGGING_CONFIG
+    validate_logging_config(DEFAULT_LOGGING_CONFIG)
+
+
+def test_logging_config_is_cached_and_skips_yaml(logging_settings, monkeypatch):
+    """
+    Verify that the parsed config is cached in cache_dir and reused without importing PyYAML.
+    """
+
+    assert load_logging_config(logging_settings) == DEFAULT_LOGGING_CONFIG
+    cache = logging_settings.cache_dir / LOGGING_CACHE_FILE
+    assert json.loads(cache.read_text())["config"] == DEFAULT_LOGGING_CONFIG
+
+    monkeypatch.setitem(sys.modules, "yaml", None)  # importing it now fails
+    assert load_logging_config(logging_settings) == DEFAULT_LOGGING_CONFIG
+
+
+def test_stale_logging_cache_is_rebuilt(logging_settings, monkeypatch):
+    """
+    Ensure that a cache written for another version or file is ignored, and that no PyYAML falls back to the default.
+    """
+
+    cache = logging_settings.ensure_dir(logging_settings.cache_dir) / LOGGING_CACHE_FILE
+    cache.write_text(json.dumps({"key": "0.0.0:stale", "config": {"version": 1}}))
+    monkeypatch.setitem(sys.modules, "yaml", None)
+
+    assert load_logging_config(logging_settings) == DEFAULT_LOGGING_CONFIG
+    assert json.loads(cache.read_text())["key"] != "0.0.0:stale"
+
+
+@pytest.mark.parametrize(
+    ("change", "error"),
+    [
+        (lambda cfg: cfg.update(version=2), "version must be 1"),
+        (lambda cfg: cfg["handlers"].pop("file_json"), "missing handler 'file_json'"),
+        (lambda cfg: cfg["root"]["handlers"].append("nope"), "undefined handler 'nope'"),
+        (
+            lambda cfg: cfg["handlers"]["stderr"].update(formatter="nope"),
+            "undefined formatter 'nope'",
+        ),
+    ],
+)
+def test_validate_logging_config_rejects_broken_configs(change, error):
+    cfg = copy.deepcopy(DEFAULT_LOGGING_CONFIG)
+    change(cfg)
+
+    with pytest.raises(ValueError, match=error):
+        validate_logging_config(cfg)
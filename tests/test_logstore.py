@@ -0,0 +1,153 @@
+import datetime as dt
+import gzip
+import json
+import logging
+
+import pytest
+from typer.testing import CliRunner
+
+from tomatempo import logs
+from tomatempo.cli import app
+from tomatempo.logs import JSONFormatter, setup_logging
+from tomatempo.logstore import (
+    INDEX_SUFFIX,
+    CompressingRotatingFileHandler,
+    LogQuery,
+    compress_segment,
+    parse_since,
+    query,
+    segments,
+)
+
+T0 = 1_700_000_000.0
+
+
+def entry(i, level="INFO", logger="tomatempo.timer"):
+    ts = dt.datetime.fromtimestamp(T0 + i, tz=dt.UTC).isoformat()
+    return {"timestamp": ts, "level": level, "logger": logger, "message": f"m{i}"}
+
+
+def write_segment(path, entries):
+    path.write_text("".join(json.dumps(e) + "\n" for e in entries))
+
+
+def make_handler(log_file, **kwargs):
+    handler = CompressingRotatingFileHandler(log_file, **kwargs)
+    handler.setFormatter(
+        JSONFormatter(fmt_keys={"level": "levelname", "message": "message", "logger": "name"})
+    )
+    return handler
+
+
+def test_compressed_segment_is_plain_gzip_with_an_index(tmp_path):
+    raw = tmp_path / "log.1.jsonl"
+    write_segment(raw, [entry(i, "ERROR" if i == 7 else "INFO") for i in range(25)])
+
+    target = compress_segment(raw, block_lines=10)
+
+    assert not raw.exists()
+    assert target.name == "log.1.jsonl.gz"
+    lines = gzip.decompress(target.read_bytes()).splitlines()
+    assert [json.loads(line)["message"] for line in lines] == [f"m{i}" for i in range(25)]
+
+    index = json.loads(target.with_name(target.name + INDEX_SUFFIX).read_text())
+    assert index["levels"] == {"INFO": 24, "ERROR": 1}
+    assert (index["first"], index["last"]) == (T0, T0 + 24)
+    assert [b["lines"] for b in index["blocks"]] == [10, 10, 5]
+    assert index["blocks"][0]["levels"] == {"INFO": 9, "ERROR": 1}
+    assert index["blocks"][1]["offset"] == index["blocks"][0]["length"]
+
+
+def test_query_filters_by_time_level_and_logger(tmp_path):
+    log_file = tmp_path / "log.jsonl"
+    write_segment(tmp_path / "log.1.jsonl", [entry(i) for i in range(10)])
+    compress_segment(tmp_path / "log.1.jsonl", block_lines=4)
+    write_segment(tmp_path / "log.2.jsonl", [entry(10, "WARNING", "tomatempo.db")])
+    write_segment(log_file, [entry(11, "ERROR"), entry(12, "DEBUG", "other")])
+
+    def messages(**kwargs):
+        return [e["message"] for e in query(log_file, LogQuery(**kwargs))]
+
+    assert messages() == [f"m{i}" for i in range(13)]
+    assert messages(since=T0 + 8) == ["m8", "m9", "m10", "m11", "m12"]
+    assert messages(level="warning") == ["m10", "m11"]
+    assert messages(logger="tomatempo") == [f"m{i}" for i in range(12)]
+    assert messages(logger="tomatempo.db") == ["m10"]
+
+
+def test_query_decompresses_only_matching_blocks(tmp_path, monkeypatch):
+    raw = tmp_path / "log.1.jsonl"
+    write_segment(raw, [entry(i, "ERROR" if i == 25 else "INFO") for i in range(30)])
+    compress_segment(raw, block_lines=10)
+    decompressed = []
+    real = gzip.decompress
+    monkeypatch.setattr(gzip, "decompress", lambda data: decompressed.append(1) or real(data))
+
+    found = list(query(tmp_path / "log.jsonl", LogQuery(level="ERROR")))
+    assert [e["message"] for e in found] == ["m25"]
+    assert len(decompressed) == 1
+
+    assert list(query(tmp_path / "log.jsonl", LogQuery(since=T0 + 100))) == []
+    assert len(decompressed) == 1
+
+
+def test_handler_compresses_rotated_segments_in_background(tmp_path):
+    log_file = tmp_path / "log.jsonl"
+    handler = make_handler(log_file, maxBytes=2_000, backupCount=2, block_lines=5)
+    log = logging.getLogger("test.logstore")
+
+    for i in range(200):
+        handler.handle(log.makeRecord(log.name, logging.INFO, __file__, 0, f"r{i}", None, None))
+    handler.wait()
+    rotated = segments(log_file)
+    handler.close()
+
+    assert len(rotated) == 2
+    assert all(p.suffix == ".gz" for p in rotated)
+    assert all(p.with_name(p.name + INDEX_SUFFIX).exists() for p in rotated)
+    messages = [e["message"] for e in query(log_file, LogQuery())]
+    assert messages[-1] == "r199"
+    assert messages == sorted(messages, key=lambda m: int(m[1:]))
+
+
+def test_handler_recovers_uncompressed_segments(tmp_path):
+    write_segment(tmp_path / "log.5.jsonl", [entry(0)])
+
+    handler = make_handler(tmp_path / "log.jsonl")
+    handler.close()
+
+    assert [p.name for p in segments(tmp_path / "log.jsonl")] == ["log.5.jsonl.gz"]
+
+
+def test_handler_reports_compression_failures(tmp_path, monkeypatch, capsys):
+    def fail(raw, *args):
+        raise OSError(f"disk full: {raw.name}")
+
+    monkeypatch.setattr("tomatempo.logstore.compress_segment", fail)
+    write_segment(tmp_path / "log.5.jsonl", [entry(0)])
+
+    handler = make_handler(tmp_path / "log.jsonl")
+    handler.close()
+
+    err = capsys.readouterr().err
+    assert "Can't compress a segment of" in err
+    assert "OSError: disk full: log.5.jsonl" in err
+
+
+def test_parse_since():
+    assert parse_since("1h", now=T0) == T0 - 3600
+    assert parse_since("2023-11-14T22:13:20+00:00") == T0
+    with pytest.raises(ValueError, match="invalid time"):
+        parse_since("yesterday")
+
+
+def test_logs_query_command(logging_settings):
+    setup_logging(logging_settings)
+    logging.getLogger("tomatempo.test").warning("kept")
+    logging.getLogger("tomatempo.test").info("filtered out")
+    logs._stop_listener()
+
+    result = CliRunner().invoke(app, ["logs", "query", "--since", "1h", "--level", "warning"])
+
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line)["message"] for line in result.output.splitlines()] == ["kept"]
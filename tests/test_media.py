@@ -0,0 +1,174 @@
+import importlib.util
+import os
+import struct
+import zlib
+
+import pytest
+
+from tomatempo.media import (
+    MediaError,
+    MediaStore,
+    ThumbnailCache,
+    file_digest,
+    ingest_file,
+    metadata_ranges,
+)
+from tomatempo.settings import Settings
+
+HAS_PIL = importlib.util.find_spec("PIL") is not None
+
+
+def segment(marker, payload):
+    return b"\xff" + bytes([marker]) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+JFIF = segment(0xE0, b"JFIF\x00\x01\x01")
+DQT = segment(0xDB, bytes(65))
+SCAN = segment(0xDA, b"\x01\x02") + b"scan data \xff\x00 more\xff\xd9"
+JPEG = b"\xff\xd8" + JFIF + segment(0xE1, b"Exif\x00\x00GPS...") + DQT + segment(0xFE, b"hi") + SCAN
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+IHDR = chunk(b"IHDR", bytes(13))
+IDAT = chunk(b"IDAT", b"pixels" * 100)
+PNG = (
+    PNG_SIGNATURE
+    + IHDR
+    + chunk(b"tEXt", b"Author\x00me")
+    + chunk(b"eXIf", b"MM\x00*")
+    + IDAT
+    + chunk(b"IEND", b"")
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MediaStore(tmp_path / "media", workers=1)
+
+
+def test_jpeg_metadata_is_stripped(store, tmp_path):
+    source = tmp_path / "photo.JPG"
+    source.write_bytes(JPEG)
+
+    [media] = store.ingest([source])
+
+    assert media.stored == "stripped"
+    assert media.path == store.root / media.digest[:2] / f"{media.digest}.jpg"
+    assert media.path.read_bytes() == b"\xff\xd8" + JFIF + DQT + SCAN
+    assert source.read_bytes() == JPEG
+
+
+def test_png_metadata_is_stripped(store, tmp_path):
+    source = tmp_path / "shot.png"
+    source.write_bytes(PNG)
+
+    [media] = store.ingest([source])
+
+    assert media.path.read_bytes() == PNG_SIGNATURE + IHDR + IDAT + chunk(b"IEND", b"")
+    assert metadata_ranges(media.path) == []
+
+
+def test_files_are_deduplicated(store, tmp_path):
+    a, b = tmp_path / "a.png", tmp_path / "b.png"
+    a.write_bytes(PNG)
+    b.write_bytes(PNG)
+
+    first, second = store.ingest([a, b])
+
+    assert first.digest == second.digest == file_digest(a)[0]
+    assert (first.stored, second.stored) == ("stripped", "existing")
+    assert len(list(store.root.rglob("*.png"))) == 1
+
+
+def test_clean_files_are_linked(tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_text("no metadata here")
+
+    [media] = MediaStore(tmp_path / "media", link="hardlink").ingest([source])
+    assert media.stored == "hardlink"
+    assert media.path.stat().st_ino == source.stat().st_ino
+
+    # No reflinks on most test filesystems: falls back to a copy
+    [copied] = MediaStore(tmp_path / "other", link="reflink").ingest([source])
+    assert copied.stored in ("reflink", "copy")
+    assert copied.path.read_text() == "no metadata here"
+
+
+def test_strip_exif_can_be_turned_off(tmp_path):
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(JPEG)
+
+    media = ingest_file(source, tmp_path / "media", strip_exif=False, link="copy")
+
+    assert media.path.read_bytes() == JPEG
+
+
+def test_batch_runs_in_a_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr("tomatempo.media.POOL_MIN_BYTES", 0)
+    sources = []
+    for i in range(3):
+        sources.append(tmp_path / f"{i}.jpg")
+        sources[-1].write_bytes(JPEG + bytes([i]))
+    store = MediaStore(tmp_path / "media", workers=2)
+
+    results = store.ingest(sources)
+
+    assert [r.source for r in results] == sources
+    assert {r.stored for r in results} == {"stripped"}
+    assert len({r.digest for r in results}) == 3
+
+
+def test_missing_file_is_an_error(store, tmp_path):
+    with pytest.raises(MediaError, match="not a file"):
+        store.ingest([tmp_path / "missing.png"])
+
+
+def test_thumbnail_cache_evicts_least_recently_used(tmp_path):
+    cache = ThumbnailCache(tmp_path / "thumbs", budget=250)
+    cache.root.mkdir()
+    for i, digest in enumerate("abc"):
+        cache.path(digest).write_bytes(bytes(100))
+        os.utime(cache.path(digest), ns=(i * 10**9, i * 10**9))
+
+    assert cache.get("a") is not None  # now the most recently used
+    assert cache.get("z") is None
+    assert cache.evict() == 1
+
+    assert not cache.path("b").exists()
+    assert cache.path("a").exists()
+    assert cache.path("c").exists()
+
+
+@pytest.mark.skipif(HAS_PIL, reason="Pillow is installed")
+def test_thumbnails_need_pillow(tmp_path):
+    with pytest.raises(MediaError, match="Pillow"):
+        MediaStore(tmp_path, thumbnails=ThumbnailCache(tmp_path / "thumbs", 1 << 20))
+
+
+@pytest.mark.skipif(not HAS_PIL, reason="needs Pillow")
+def test_thumbnails_are_cached(tmp_path):
+    from PIL import Image
+
+    source = tmp_path / "big.png"
+    Image.new("RGB", (1024, 512), "red").save(source)
+    cache = ThumbnailCache(tmp_path / "thumbs", 1 << 20)
+
+    [media] = MediaStore(tmp_path / "media", thumbnails=cache).ingest([source])
+
+    assert media.thumbnail == cache.path(media.digest)
+    with Image.open(media.thumbnail) as thumb:
+        assert thumb.size == (256, 128)
+
+
+def test_store_from_settings(tmp_path):
+    settings = Settings(media_link="copy", media_strip_exif=False)
+    settings.__dict__["data_dir"] = tmp_path
+
+    store = MediaStore.from_settings(settings)
+
+    assert store.root == tmp_path / "media"
+    assert store.root.is_dir()
+    assert (store.link, store.strip_exif, store.thumbnails) == ("copy", False, None)
@@ -0,0 +1,163 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import text
+from typer.testing import CliRunner
+
+from tomatempo import db, names
+from tomatempo.cli import app
+from tomatempo.models import Deliverable, Initiative, Project, Task
+from tomatempo.names import INDEX_FILE, NameIndex, ResolveError, fold, get_index, resolve
+from tomatempo.settings import get_settings
+
+
+@pytest.fixture
+def settings(db_settings, monkeypatch):
+    monkeypatch.setenv("APP_DATABASE_URL", db_settings.database_url)
+    get_settings.cache_clear()
+    settings = get_settings()
+    with db.get_session(settings) as session:
+        for row in (
+            Project(id=1, name="Thesis"),
+            Initiative(id=2, project_id=1, name="Chapter 1"),
+            Deliverable(id=3, initiative_id=2, name="Draft"),
+            Deliverable(id=4, initiative_id=2, name="Outline"),
+            Task(id=10, deliverable_id=3, name="Read"),
+            Task(id=11, deliverable_id=3, name="Reading notes"),
+            Task(id=12, deliverable_id=3, name="Revisão bibliográfica"),
+            Task(id=13, deliverable_id=3, name="Plan"),
+            Task(id=14, deliverable_id=4, name="plan"),
+            Task(id=15, name="Extract quotes"),
+        ):
+            session.add(row)
+            session.flush()
+        session.commit()
+    yield settings
+    get_settings.cache_clear()
+
+
+def test_fold():
+    assert fold("  Revisão   BIBLIOGRÁFICA ") == "revisao bibliografica"
+
+
+def test_ids_and_exact_names(settings):
+    assert resolve("task", "99", settings) == 99  # ids are used as given
+    assert resolve("task", "reading NOTES", settings) == 11
+    assert resolve("task", '"Read"', settings) == 10
+    assert resolve("task", "revisao bibliografica", settings) == 12
+    assert resolve("deliverable", "Outline", settings) == 4
+
+
+def test_unknown_and_ambiguous_names(settings):
+    with pytest.raises(ResolveError, match='no task named "Extract quote"') as e:
+        resolve("task", "Extract quote", settings)
+    assert [m.id for m in e.value.candidates] == [15]
+
+    with pytest.raises(ResolveError, match='task "Plan" is ambiguous') as e:
+        resolve("task", "Plan", settings)
+    assert {m.id for m in e.value.candidates} == {13, 14}
+    assert "    13  Plan" in str(e.value)
+
+
+def test_fuzzy_names(settings):
+    assert resolve("task", "~xtract quot", settings) == 15
+    assert resolve("task", "~revisao", settings) == 12
+    assert resolve("task", "~read", settings) == 10  # the exact match wins
+
+    with pytest.raises(ResolveError, match='task "~rea" is ambiguous') as e:
+        resolve("task", "~rea", settings)
+    assert [m.id for m in e.value.candidates] == [10, 11]
+    with pytest.raises(ResolveError, match='task "~plan" is ambiguous') as e:
+        resolve("task", "~plan", settings)
+    assert {m.id for m in e.value.candidates} == {13, 14}
+    with pytest.raises(ResolveError, match='no task like "zzz"'):
+        resolve("task", "~zzz", settings)
+
+
+def test_complete(settings):
+    index = get_index(settings)
+
+    assert [m.name for m in index.complete("task", "re")] == [
+        "Read",
+        "Reading notes",
+        "Revisão bibliográfica",
+    ]
+    assert [m.name for m in index.complete("task", '"rev')] == ["Revisão bibliográfica"]
+    assert [m.id for m in index.complete("task", "~quotes")] == [15]
+    assert index.complete("project", "x") == []
+
+
+def test_index_is_reused_until_a_name_changes(settings, monkeypatch):
+    get_index(settings)
+    assert (settings.cache_dir / INDEX_FILE).exists()
+
+    def no_build(*args):
+        raise AssertionError("rebuilt")
+
+    with monkeypatch.context() as m:
+        m.setattr(NameIndex, "build", no_build)
+        assert get_index(settings).revision == names.current_revision(settings)
+        # Time, not names: the index stays
+        with db.get_engine(settings).begin() as conn:
+            conn.execute(text("UPDATE tasks SET status = 'done' WHERE id = 10"))
+        assert resolve("task", "Read", settings) == 10
+
+    with db.get_engine(settings).begin() as conn:
+        conn.execute(text("UPDATE tasks SET name = 'Skim' WHERE id = 10"))
+    assert resolve("task", "skim", settings) == 10
+    with pytest.raises(ResolveError):
+        resolve("task", "Read", settings)
+
+
+def test_unreadable_index_is_rebuilt(settings):
+    (settings.cache_dir / INDEX_FILE).parent.mkdir(parents=True, exist_ok=True)
+    (settings.cache_dir / INDEX_FILE).write_bytes(b"garbage")
+
+    assert resolve("deliverable", "Draft", settings) == 3
+
+
+def test_commands_take_names(settings):
+    runner = CliRunner()
+
+    result = runner.invoke(app, ["task", "move", "~xtract", "--to", "Outline"])
+    assert result.exit_code == 0, result.output
+    assert "moved task 15 to deliverable 4" in result.output
+
+    result = runner.invoke(app, ["deliverable", "show", "outline"])
+    assert "task 15 Extract quotes" in result.output
+
+    result = runner.invoke(app, ["task", "move", "Plan"])
+    assert result.exit_code == 2
+    assert 'task "Plan" is ambiguous' in result.output
+
+
+@pytest.mark.perf
+def test_completion_uses_the_index(settings):
+    """
+    Check that completing a task name reads the saved index, without SQLAlchemy.
+    """
+    get_index(settings)
+    probe = (
+        "import sys\n"
+        "from tomatempo.cli import app\n"
+        "try:\n"
+        "    app([], prog_name='tomatempo')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(' '.join(sorted(m.split('.')[0] for m in sys.modules)), file=sys.stderr)\n"
+    )
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.path.dirname(os.path.dirname(names.__file__)),
+        "_TOMATEMPO_COMPLETE": "complete_bash",
+        "COMP_WORDS": "tomatempo focus task Rea",
+        "COMP_CWORD": "3",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", probe], capture_output=True, text=True, env=env, check=True
+    )
+
+    assert result.stdout.splitlines() == ["Read", "Reading notes"]
+    assert "sqlalchemy" not in result.stderr.splitlines()[-1].split()
@@ -0,0 +1,74 @@
+import pytest
+from typer.testing import CliRunner
+
+from tomatempo import db
+from tomatempo.cli import app
+from tomatempo.pool import AssignError, assign, balance, reassign
+from tomatempo.rollups import Counts, TomatoRules, check, get_counts
+from tomatempo.slices import insert_slices, query_columns
+from tomatempo.timer import ClosedSlice
+
+MIN = 60
+RULES = TomatoRules(25 * MIN)
+
+
+@pytest.fixture
+def conn(db_settings):
+    with db.get_engine(db_settings).begin() as conn:
+        insert_slices(
+            conn,
+            [
+                ClosedSlice(None, 0, 10 * MIN),
+                ClosedSlice(None, 10 * MIN, 30 * MIN),
+                ClosedSlice(None, 30 * MIN, 40 * MIN, "break"),
+                ClosedSlice(1, 40 * MIN, 70 * MIN),
+            ],
+            RULES,
+        )
+        yield conn
+
+
+def test_assign_splits_the_last_slice(conn):
+    assign(conn, RULES, 15 * MIN, 2)
+
+    assert balance(conn, None) == 15 * MIN
+    assert balance(conn, 2) == 15 * MIN
+    columns = query_columns(conn)
+    assert list(zip(columns.task_id, columns.start_ts, columns.end_ts, strict=True)) == [
+        (2, 0, 10 * MIN),
+        (2, 10 * MIN, 15 * MIN),
+        (-1, 15 * MIN, 30 * MIN),
+        (-1, 30 * MIN, 40 * MIN),
+        (1, 40 * MIN, 70 * MIN),
+    ]
+    assert check(conn, RULES) == {}
+
+
+def test_reassign_moves_time(conn):
+    reassign(conn, RULES, 25 * MIN, 1, 2)
+
+    assert get_counts(conn, ("task", 1)) == Counts(5 * MIN, 0, 5 * MIN)
+    assert get_counts(conn, ("task", 2)) == Counts(25 * MIN, 1, 0)
+    assert check(conn, RULES) == {}
+
+
+def test_assign_needs_enough_time(conn):
+    with pytest.raises(AssignError, match="available"):
+        assign(conn, RULES, 31 * MIN, 2)
+    with pytest.raises(AssignError, match="same"):
+        reassign(conn, RULES, MIN, 1, 1)
+
+
+def test_assign_command(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+    with db.get_engine().begin() as c:
+        insert_slices(c, [ClosedSlice(None, 0, 30 * MIN)], TomatoRules())
+
+    runner = CliRunner()
+    result = runner.invoke(app, ["assign", "20m", "5"])
+    assert result.exit_code == 0, result.output
+    assert "moved 20m from pool to task 5" in result.output
+
+    result = runner.invoke(app, ["reassign", "30m", "--from", "5", "--to", "6"])
+    assert result.exit_code == 1
+    db.dispose_engines()
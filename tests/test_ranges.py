@@ -0,0 +1,135 @@
+import random
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from tomatempo import db
+from tomatempo.pool import assign
+from tomatempo.ranges import (
+    BUCKET_SECONDS,
+    buckets,
+    overlapping_ids,
+    parse_range,
+    rebuild_index,
+    seconds_by_task,
+)
+from tomatempo.rollups import TomatoRules
+from tomatempo.slices import insert_slices, query_columns, totals_by_task
+from tomatempo.timer import ClosedSlice
+
+DAY = BUCKET_SECONDS
+
+
+def bucket_rows(conn):
+    return conn.execute(text("SELECT bucket, slice_id FROM slice_buckets ORDER BY 1, 2")).all()
+
+
+@pytest.fixture
+def engine(db_settings):
+    return db.get_engine(db_settings)
+
+
+def test_buckets():
+    assert list(buckets(0, DAY)) == [0]
+    assert list(buckets(DAY - 1, DAY + 1)) == [0, 1]
+    assert list(buckets(5 * DAY, 7 * DAY + 10)) == [5, 6, 7]
+    assert list(buckets(10, 10)) == []
+
+
+def test_slices_are_indexed_on_insert(engine):
+    with engine.begin() as conn:
+        insert_slices(
+            conn,
+            [ClosedSlice(1, DAY - 60, DAY + 60), ClosedSlice(2, 3 * DAY, 3 * DAY + 60)],
+            TomatoRules(),
+        )
+
+        assert bucket_rows(conn) == [(0, 1), (1, 1), (3, 2)]
+
+
+def test_overlapping_finds_slices_started_before_the_window(engine):
+    with engine.begin() as conn:
+        insert_slices(
+            conn,
+            [
+                ClosedSlice(1, 0, 10),
+                ClosedSlice(1, 2 * DAY - 100, 2 * DAY + 100),  # crosses midnight
+                ClosedSlice(2, 2 * DAY + 200, 2 * DAY + 300),
+                ClosedSlice(2, 3 * DAY, 3 * DAY + 10),
+            ],
+            TomatoRules(),
+        )
+
+        assert overlapping_ids(conn, 2 * DAY, 3 * DAY) == [2, 3]
+        assert seconds_by_task(conn, 2 * DAY, 3 * DAY) == {1: 100, 2: 100}
+
+
+def test_seconds_by_task_matches_a_full_scan(engine):
+    rng = random.Random(7)
+    slices = []
+    for _ in range(300):
+        start = rng.randrange(0, 20 * DAY)
+        end = start + rng.randrange(1, DAY // 2)
+        slices.append(
+            ClosedSlice(rng.choice([None, 1, 2, 3]), start, end, rng.choice(["work", "break"]))
+        )
+
+    with engine.begin() as conn:
+        insert_slices(conn, slices, TomatoRules())
+        everything = query_columns(conn)
+        for _ in range(30):
+            a = rng.randrange(0, 20 * DAY)
+            b = a + rng.randrange(1, 5 * DAY)
+            expected = totals_by_task(everything, a, b)
+
+            assert seconds_by_task(conn, a, b) == expected
+            assert totals_by_task(query_columns(conn, a, b), a, b) == expected
+
+
+def test_split_slices_are_reindexed(engine):
+    with engine.begin() as conn:
+        insert_slices(conn, [ClosedSlice(None, DAY - 600, DAY + 600)], TomatoRules())
+        assign(conn, TomatoRules(), 300, 4)
+        maintained = bucket_rows(conn)
+
+        rebuild_index(conn)
+
+        assert bucket_rows(conn) == maintained == [(0, 1), (0, 2), (1, 2)]
+        assert seconds_by_task(conn, 0, DAY) == {4: 300, None: 300}
+
+
+def test_derived_tables_are_backfilled(engine, db_settings):
+    with engine.begin() as conn:
+        insert_slices(conn, [ClosedSlice(1, DAY - 60, DAY + 60)], TomatoRules())
+        conn.execute(text("DROP TABLE slice_buckets"))
+        conn.execute(text("DROP TABLE rollups"))
+    db.dispose_engines()
+
+    with db.get_engine(db_settings).connect() as conn:
+        assert bucket_rows(conn) == [(0, 1), (1, 1)]
+        assert conn.execute(text("SELECT seconds FROM rollups WHERE entity_id = 1")).scalar() == 120
+
+
+def ts(*args):
+    return int(datetime(*args).timestamp())
+
+
+def test_parse_range():
+    now = datetime(2025, 3, 13, 15, 30).timestamp()  # a Thursday
+
+    assert parse_range("today", now) == (ts(2025, 3, 13), ts(2025, 3, 14))
+    assert parse_range("yesterday", now) == (ts(2025, 3, 12), ts(2025, 3, 13))
+    assert parse_range("this-week", now) == (ts(2025, 3, 10), ts(2025, 3, 17))
+    assert parse_range("this-week", now, "sunday") == (ts(2025, 3, 9), ts(2025, 3, 16))
+    assert parse_range("last-week", now) == (ts(2025, 3, 3), ts(2025, 3, 10))
+    assert parse_range("this-month", now) == (ts(2025, 3, 1), ts(2025, 4, 1))
+    assert parse_range("last-month", now) == (ts(2025, 2, 1), ts(2025, 3, 1))
+    assert parse_range("2024-12-31") == (ts(2024, 12, 31), ts(2025, 1, 1))
+    assert parse_range("2024-12-30..2025-01-02") == (ts(2024, 12, 30), ts(2025, 1, 3))
+
+
+@pytest.mark.parametrize("spec", ["someday", "2025-13-01", "2025-01-05..2025-01-01"])
+def test_parse_range_rejects(spec):
+    with pytest.raises(ValueError, match="invalid range"):
+        parse_range(spec)
@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import text
+from typer.testing import CliRunner
+
+from tomatempo import db
+from tomatempo.cli import app
+from tomatempo.models import Deliverable, Initiative, Project, Task
+from tomatempo.rollups import Counts, TomatoRules, check, get_counts, rebuild
+from tomatempo.slices import insert_slices
+from tomatempo.timer import ClosedSlice
+
+MIN = 60
+
+
+@pytest.fixture
+def engine(db_settings):
+    engine = db.get_engine(db_settings)
+    with db.get_session(db_settings) as session:
+        for row in (
+            Project(id=1, name="P"),
+            Initiative(id=2, project_id=1, name="I"),
+            Deliverable(id=3, initiative_id=2, name="D"),
+            Task(id=10, deliverable_id=3, name="A"),
+            Task(id=11, deliverable_id=3, name="B"),
+        ):
+            session.add(row)
+            session.flush()  # no relationships, so no FK-aware ordering
+        session.commit()
+    return engine
+
+
+def add(engine, rules, *slices):
+    with engine.begin() as conn:
+        insert_slices(conn, slices, rules)
+
+
+def counts(engine, key):
+    with engine.connect() as conn:
+        return get_counts(conn, key)
+
+
+def test_cumulative_counts():
+    rules = TomatoRules(25 * MIN, "cumulative")
+
+    assert rules.tomatoes_delta(0, 49 * MIN) == 1
+    assert rules.tomatoes_delta(20 * MIN, 10 * MIN) == 1
+    assert rules.tomatoes_delta(30 * MIN, -10 * MIN) == -1
+
+
+def test_segment_strict_counts():
+    rules = TomatoRules(25 * MIN, "segment-strict")
+
+    assert rules.tomatoes_delta(0, 49 * MIN) == 1
+    assert rules.tomatoes_delta(20 * MIN, 10 * MIN) == 0
+    assert rules.tomatoes_delta(60 * MIN, -50 * MIN) == -2
+
+
+def test_rollups_follow_slices_and_propagate(engine):
+    rules = TomatoRules(25 * MIN)
+    add(engine, rules, ClosedSlice(10, 0, 20 * MIN), ClosedSlice(11, 20 * MIN, 40 * MIN))
+    add(engine, rules, ClosedSlice(10, 40 * MIN, 50 * MIN))
+
+    assert counts(engine, ("task", 10)) == Counts(30 * MIN, 1, 5 * MIN)
+    assert counts(engine, ("task", 11)) == Counts(20 * MIN, 0, 20 * MIN)
+    # Parents add up their tasks' tomatoes
+    for key in (("deliverable", 3), ("initiative", 2), ("project", 1)):
+        assert counts(engine, key) == Counts(50 * MIN, 1, 25 * MIN)
+
+
+def test_breaks_and_pool(engine):
+    rules = TomatoRules(25 * MIN)
+    add(engine, rules, ClosedSlice(None, 0, 30 * MIN), ClosedSlice(10, 30 * MIN, 40 * MIN, "break"))
+
+    assert counts(engine, ("pool", 0)) == Counts(30 * MIN, 1, 5 * MIN)
+    assert counts(engine, ("task", 10)) == Counts(0, 0, 0)
+
+
+@pytest.mark.parametrize("mode", ["cumulative", "segment-strict"])
+def test_incremental_matches_recount(engine, mode):
+    rules = TomatoRules(25 * MIN, mode)
+    for i in range(20):
+        task = (10, 11, None, 99)[i % 4]  # 99 has no row in tasks
+        add(engine, rules, ClosedSlice(task, i * 1000, i * 1000 + 700 + i * 40))
+
+    with engine.connect() as conn:
+        assert check(conn, rules) == {}
+
+
+def test_rebuild_repairs_rollups(engine):
+    rules = TomatoRules(25 * MIN)
+    add(engine, rules, ClosedSlice(10, 0, 60 * MIN))
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE rollups SET tomatoes = 7 WHERE entity_type = 'task'"))
+        conn.execute(text("DELETE FROM rollups WHERE entity_type = 'project'"))
+
+        diffs = check(conn, rules)
+        assert diffs[("task", 10)] == (Counts(60 * MIN, 7, 10 * MIN), Counts(60 * MIN, 2, 10 * MIN))
+        assert diffs[("project", 1)] == (Counts(0, 0, 0), Counts(60 * MIN, 2, 10 * MIN))
+
+        assert rebuild(conn, rules) == 4
+        assert check(conn, rules) == {}
+
+
+def test_rollup_commands(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+    with db.get_engine().begin() as conn:
+        insert_slices(conn, [ClosedSlice(10, 0, 30 * MIN)], TomatoRules())
+        conn.execute(text("DELETE FROM rollups"))
+
+    runner = CliRunner()
+    result = runner.invoke(app, ["rollup", "check"])
+    assert result.exit_code == 1
+    assert "task 10" in result.output
+
+    assert runner.invoke(app, ["rollup", "rebuild"]).exit_code == 0
+    result = runner.invoke(app, ["rollup", "check"])
+    assert result.exit_code == 0
+    assert "consistent" in result.output
+    db.dispose_engines()
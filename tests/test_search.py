@@ -0,0 +1,135 @@
+import pytest
+from sqlalchemy import text
+from typer.testing import CliRunner
+
+from tomatempo import db, search
+from tomatempo.cli import app
+from tomatempo.models import Project, Task
+from tomatempo.notes import NoteError, add_note, parse_tags
+from tomatempo.search import has_index, make_snippet, match_query
+from tomatempo.search import search as search_notes
+from tomatempo.settings import get_settings
+
+
+@pytest.fixture
+def engine(db_settings):
+    engine = db.get_engine(db_settings)
+    with db.get_session(db_settings) as session:
+        session.add(Project(id=1, name="Thesis"))
+        session.add(Task(id=10, name="Read"))
+        session.commit()
+    with engine.begin() as conn:
+        add_note(conn, "project", 1, "Kickoff: scope, risks and the reading list")
+        add_note(conn, "task", 10, "Reading notes on Montaigne's essays", tags="reading")
+        add_note(conn, "task", 10, "Edge cases to verify before the defence", tags="blocked")
+    return engine
+
+
+def ids(hits):
+    return [hit.note_id for hit in hits]
+
+
+def test_match_query_quotes_words():
+    assert match_query('scope AND "risks" read*') == '"scope" "AND" "risks" "read"*'
+    assert match_query("?!") == ""
+
+
+def test_parse_tags():
+    assert parse_tags(" plan, reading,,plan ") == "plan,reading"
+    assert parse_tags(None) == ""
+
+
+def test_search_ranks_and_highlights(engine):
+    with engine.connect() as conn:
+        assert has_index(conn)
+        hits = search_notes(conn, "reading")
+
+    # The tag match ranks first
+    assert ids(hits) == [2, 1]
+    assert hits[0].rank < hits[1].rank
+    assert "**Reading**" in hits[0].snippet
+    assert "**reading**" in hits[1].snippet
+
+
+def test_prefix_and_scope(engine):
+    with engine.connect() as conn:
+        assert ids(search_notes(conn, "read")) == []
+        assert set(ids(search_notes(conn, "read*"))) == {1, 2}
+        assert ids(search_notes(conn, "read*", entity_type="project")) == [1]
+        assert ids(search_notes(conn, "montaigne essays")) == [2]
+        assert ids(search_notes(conn, "")) == []
+
+
+def test_triggers_keep_the_index_current(engine):
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE notes SET body = 'Defence date moved' WHERE id = 3"))
+        conn.execute(text("DELETE FROM notes WHERE id = 1"))
+
+    with engine.connect() as conn:
+        assert ids(search_notes(conn, "verify")) == []
+        assert ids(search_notes(conn, "moved")) == [3]
+        assert ids(search_notes(conn, "kickoff")) == []
+
+
+def test_like_fallback(engine, monkeypatch):
+    monkeypatch.setattr(search, "has_index", lambda conn: False)
+    with engine.connect() as conn:
+        hits = search_notes(conn, "READ* list")
+        assert ids(hits) == [1]
+        assert hits[0].rank == 0.0
+        assert hits[0].snippet.endswith("**read**ing **list**")
+        assert set(ids(search_notes(conn, "read", entity_type="task"))) == {2}
+
+
+def test_make_snippet():
+    body = "x" * 100 + " needle " + "y" * 100
+    snippet = make_snippet(body, ["needle"], ("[", "]"), width=40)
+    assert snippet.startswith("…")
+    assert snippet.endswith("…")
+    assert "[needle]" in snippet
+
+
+def test_index_is_added_to_existing_databases(engine, db_settings):
+    with engine.begin() as conn:
+        for name in ("notes_fts_insert", "notes_fts_delete", "notes_fts_update"):
+            conn.execute(text(f"DROP TRIGGER {name}"))
+        conn.execute(text("DROP TABLE notes_fts"))
+    db.dispose_engines()
+
+    with db.get_engine(db_settings).connect() as conn:
+        assert ids(search_notes(conn, "kickoff")) == [1]
+
+
+def test_add_note_checks_the_entity(engine):
+    with engine.begin() as conn, pytest.raises(NoteError, match="task 99 not found"):
+        add_note(conn, "task", 99, "nope")
+    with engine.begin() as conn, pytest.raises(NoteError, match="empty"):
+        add_note(conn, "task", 10, "  ")
+
+
+def test_note_commands(engine, db_settings, tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATABASE_URL", db_settings.database_url)
+    get_settings.cache_clear()
+    attachment = tmp_path / "shot.png"
+    attachment.write_bytes(b"\x89PNG\r\n\x1a\n")
+    runner = CliRunner()
+
+    result = runner.invoke(
+        app,
+        ["note", "add", "--on", "task", "10", "Quotes from *Essais*", "--file", str(attachment)],
+    )
+    assert result.exit_code == 0, result.output
+    assert "added note 4 to task 10 with 1 attachments" in result.output
+
+    result = runner.invoke(app, ["note", "search", "essa*", "--on", "task"])
+    assert result.exit_code == 0, result.output
+    assert "#4 task 10: Quotes from ***Essais***" in result.output
+    assert "#2 task 10" in result.output
+
+    result = runner.invoke(app, ["index", "rebuild"])
+    assert result.exit_code == 0, result.output
+    assert "rebuilt the search index (4 notes)" in result.output
+
+    result = runner.invoke(app, ["note", "add", "--on", "project", "7", "text"])
+    assert result.exit_code == 1
+    assert "project 7 not found" in result.output
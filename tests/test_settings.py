@@ -1,9 +1,18 @@
+import json
+from pathlib import Path
 from platform import system
 
 import pytest
 from pydantic import ValidationError
 
-from tomatempo.settings import Settings, get_settings, reload_settings
+from tomatempo.settings import (
+    Settings,
+    SqlitePragmas,
+    get_settings,
+    reload_settings,
+    settings_fingerprint,
+    snapshot_path,
+)
 
 # ---------------------------
 # Construction & Defaults
@@ -23,7 +32,7 @@ def test_settings_defaults(tsettings):
     assert tsettings.ensure_dirs
     assert tsettings.environment == "dev"
     assert tsettings.log_level == "INFO"
-    assert tsettings.database_url == "sqlite:///./data.db"
+    assert tsettings.database_url == f"sqlite:///{tsettings.data_dir / 'tomatempo.db'}"
     assert tsettings.log_level_numeric == 20
     assert tsettings.is_prod is False
     if system() == "Linux":
@@ -123,6 +132,26 @@ def test_invalid_environment_raises():
         Settings(environment="stages")
 
 
+def test_invalid_log_ship_address_raises():
+    """Ensure that a log collector address must be unix:PATH or HOST:PORT."""
+
+    with pytest.raises(ValidationError, match="invalid log collector address"):
+        Settings(log_ship_address="localhost")
+    assert Settings(log_ship_address="tcp:127.0.0.1:5170").log_ship_address == "tcp:127.0.0.1:5170"
+
+
+def test_tomato_length_accepts_durations(clean_settings, monkeypatch, tmp_path):
+    """Ensure that tomato_length takes seconds or a duration like 50m."""
+
+    clean_settings(monkeypatch, tmp_path)
+    monkeypatch.setenv("APP_TOMATO_LENGTH", "50m")
+
+    assert Settings().tomato_length == 3000
+    assert Settings(tomato_length=90).tomato_length == 90
+    with pytest.raises(ValidationError, match="invalid duration"):
+        Settings(tomato_length="soon")
+
+
 # ---------------------------
 # Computed Fields
 # ---------------------------
@@ -190,34 +219,57 @@ def test_debug_true_in_dev_and_test(clean_settings, monkeypatch, tmp_path):
 # ---------------------------
 
 
-def test_cache_dir_created(clean_settings, monkeypatch, tmp_path):
-    """Ensure that cache_dir creates the directory if ensure_dirs=True."""
+def test_dirs_not_created_on_read(clean_settings, monkeypatch, tmp_path):
+    """Ensure that reading (or dumping) the dir properties never touches the disk."""
 
     clean_settings(monkeypatch, tmp_path)
 
     settings = Settings(ensure_dirs=True)
+    calls = []
+    monkeypatch.setattr(Path, "mkdir", lambda self, *a, **kw: calls.append(self))
 
-    assert settings.cache_dir.exists()
+    for _ in range(3):
+        dirs = [settings.cache_dir, settings.logs_dir, settings.config_dir]
+        dirs += [settings.data_dir, settings.state_dir]
+        settings.model_dump()
 
+    assert calls == []
 
-def test_logs_dir_created(clean_settings, monkeypatch, tmp_path):
-    """Ensure that logs_dir creates the directory if ensure_dirs=True."""
+
+def test_dirs_resolved_once(clean_settings, monkeypatch, tmp_path):
+    """Ensure that each directory is computed once per instance."""
 
     clean_settings(monkeypatch, tmp_path)
 
-    settings = Settings(ensure_dirs=True)
+    settings = Settings()
 
-    assert settings.logs_dir.exists()
+    assert settings.logs_dir is settings.logs_dir
+    assert settings.data_dir is settings.data_dir
 
 
-def test_config_dir_created(clean_settings, monkeypatch, tmp_path):
-    """Ensure that config_dir creates the directory if ensure_dirs=True."""
+def test_ensure_dir_creates_once(clean_settings, monkeypatch, tmp_path):
+    """Ensure that ensure_dir creates the directory on first use only."""
 
     clean_settings(monkeypatch, tmp_path)
 
     settings = Settings(ensure_dirs=True)
+    real_mkdir = Path.mkdir
+    calls = []
+
+    def mkdir(self, *args, **kwargs):
+        calls.append(self)
+        real_mkdir(self, *args, **kwargs)
 
-    assert settings.config_dir.exists()
+    monkeypatch.setattr(Path, "mkdir", mkdir)
+
+    assert settings.ensure_dir(settings.logs_dir) == settings.logs_dir
+    assert settings.logs_dir.is_dir()
+    assert calls
+
+    calls.clear()
+    settings.ensure_dir(settings.logs_dir)
+
+    assert calls == []
 
 
 def test_dirs_not_created_if_disabled(clean_settings, monkeypatch, tmp_path):
@@ -227,9 +279,9 @@ def test_dirs_not_created_if_disabled(clean_settings, monkeypatch, tmp_path):
 
     settings = Settings(ensure_dirs=False)
 
-    assert not settings.cache_dir.exists()
-    assert not settings.logs_dir.exists()
-    assert not settings.config_dir.exists()
+    for d in (settings.cache_dir, settings.logs_dir, settings.config_dir, settings.data_dir):
+        settings.ensure_dir(d)
+        assert not d.exists()
 
 
 # ---------------------------
@@ -280,3 +332,103 @@ def test_reload_settings_creates_new_instance(clean_settings, monkeypatch, tmp_p
     settings2 = reload_settings()
 
     assert settings1 is not settings2
+
+
+# ---------------------------
+# Snapshot cache
+# ---------------------------
+
+
+def test_get_settings_writes_snapshot(clean_settings, monkeypatch, tmp_path):
+    """Ensure that get_settings() stores the resolved values under the cache dir."""
+
+    clean_settings(monkeypatch, tmp_path)
+    monkeypatch.setenv("APP_LOG_LEVEL", "warning")
+
+    settings = get_settings()
+
+    snapshot = json.loads(snapshot_path().read_text())
+    assert snapshot_path().parent == settings.cache_dir
+    assert snapshot["fingerprint"] == settings_fingerprint()
+    assert snapshot["values"]["log_level"] == "WARNING"
+
+
+def test_snapshot_skips_settings_construction(clean_settings, monkeypatch, tmp_path):
+    """Ensure that an unchanged environment rebuilds Settings from the snapshot."""
+
+    clean_settings(monkeypatch, tmp_path)
+    monkeypatch.setenv("APP_ENVIRONMENT", "prod")
+    monkeypatch.setenv("APP_DAEMON_SOCKET", str(tmp_path / "d.sock"))
+    monkeypatch.setenv("APP_SQLITE__SYNCHRONOUS", "FULL")
+    first = get_settings()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Settings() should not run")
+
+    monkeypatch.setattr(Settings, "__init__", fail)
+    second = reload_settings()
+
+    assert second is not first
+    assert second.model_dump() == first.model_dump()
+    assert second.model_fields_set == first.model_fields_set
+    assert isinstance(second.daemon_socket, Path)
+    assert second.sqlite == SqlitePragmas(synchronous="FULL")
+
+
+def test_snapshot_invalidated_by_env_change(clean_settings, monkeypatch, tmp_path):
+    """Ensure that changing an APP_* variable invalidates the snapshot."""
+
+    clean_settings(monkeypatch, tmp_path)
+    assert get_settings().log_level == "INFO"
+
+    monkeypatch.setenv("APP_LOG_LEVEL", "ERROR")
+
+    assert reload_settings().log_level == "ERROR"
+
+
+def test_snapshot_invalidated_by_data_dir_change(clean_settings, monkeypatch, tmp_path):
+    """Ensure that moving XDG_DATA_HOME moves the default database with it."""
+
+    clean_settings(monkeypatch, tmp_path)
+    assert get_settings().database_url.startswith(f"sqlite:///{tmp_path / 'data'}")
+
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "other"))
+    settings = reload_settings()
+
+    assert settings.database_url.startswith(f"sqlite:///{tmp_path / 'other'}")
+    assert settings.data_dir.is_relative_to(tmp_path / "other")
+
+
+def test_snapshot_invalidated_by_env_file_change(clean_settings, write_env, monkeypatch, tmp_path):
+    """Ensure that creating or editing .env invalidates the snapshot."""
+
+    clean_settings(monkeypatch, tmp_path)
+    assert get_settings().environment == "dev"
+
+    write_env(tmp_path, "APP_ENVIRONMENT=staging\n")
+    assert reload_settings().environment == "staging"
+
+    write_env(tmp_path, "APP_ENVIRONMENT=prod\n")
+    assert reload_settings().environment == "prod"
+
+
+def test_snapshot_invalidated_by_config_file_change(clean_settings, monkeypatch, tmp_path):
+    """Ensure that the config file takes part in the fingerprint."""
+
+    clean_settings(monkeypatch, tmp_path)
+    config = tmp_path / "config.yaml"
+    monkeypatch.setenv("TOMATEMPO_CONFIG", str(config))
+    before = settings_fingerprint()
+
+    config.write_text("tomato-length: 25m\n")
+
+    assert settings_fingerprint() != before
+
+
+def test_corrupt_snapshot_is_ignored(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+    get_settings()
+    snapshot_path().write_text("{not json")
+
+    assert reload_settings().log_level == "INFO"
+    assert json.loads(snapshot_path().read_text())["fingerprint"] == settings_fingerprint()
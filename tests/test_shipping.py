@@ -0,0 +1,172 @@
+import json
+import logging
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from tomatempo import logs
+from tomatempo.logs import JSONFormatter, setup_logging
+from tomatempo.logstore import segments
+from tomatempo.shipping import ShipHandler, parse_address
+
+
+class Collector:
+    """Socket server that keeps every byte it receives."""
+
+    def __init__(self, family, address):
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.bind(address)
+        self.sock.listen()
+        self.data = b""
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        try:
+            while True:
+                conn, _ = self.sock.accept()
+                with conn:
+                    while chunk := conn.recv(65536):
+                        self.data += chunk
+        except OSError:
+            pass
+
+    def lines(self):
+        return [json.loads(line)["message"] for line in self.data.splitlines()]
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def short_dir():
+    # Unix socket paths are limited to ~100 bytes, pytest's tmp_path may be longer
+    with tempfile.TemporaryDirectory(prefix="tt") as d:
+        yield Path(d)
+
+
+def make_handler(address, **kwargs):
+    handler = ShipHandler(address, flush_interval=0.01, reconnect_delay=0.01, **kwargs)
+    handler.setFormatter(JSONFormatter(fmt_keys={"message": "message"}))
+    return handler
+
+
+def log(handler, *messages):
+    for message in messages:
+        handler.handle(logging.makeLogRecord({"msg": message, "levelno": 20}))
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_parse_address():
+    assert parse_address("unix:/run/c.sock") == ("unix", "/run/c.sock")
+    assert parse_address("tcp:127.0.0.1:5170") == ("127.0.0.1", 5170)
+    assert parse_address("localhost:5170") == ("localhost", 5170)
+    with pytest.raises(ValueError, match="invalid log collector address"):
+        parse_address("localhost")
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs AF_UNIX")
+def test_ships_to_unix_collector(short_dir):
+    collector = Collector(socket.AF_UNIX, str(short_dir / "c.sock"))
+    handler = make_handler(f"unix:{short_dir / 'c.sock'}")
+
+    log(handler, "a", "b", "c")
+    handler.close()
+    collector.close()
+    collector.thread.join(1)
+
+    assert collector.lines() == ["a", "b", "c"]
+    assert handler.metrics() == {
+        "queued": 3,
+        "sent": 3,
+        "spilled": 0,
+        "dropped": 0,
+        "buffered": 0,
+    }
+
+
+def test_ships_over_tcp():
+    collector = Collector(socket.AF_INET, ("127.0.0.1", 0))
+    host, port = collector.sock.getsockname()
+    handler = make_handler(f"tcp:{host}:{port}")
+
+    log(handler, "over tcp")
+    wait_for(lambda: collector.data)
+    handler.close()
+    collector.close()
+
+    assert collector.lines() == ["over tcp"]
+
+
+def test_spills_while_collector_is_down_then_reconnects(short_dir):
+    spill = short_dir / "log.jsonl"
+    handler = make_handler(f"unix:{short_dir / 'c.sock'}", spill_file=spill)
+
+    log(handler, "spilled")
+    wait_for(lambda: handler.spilled == 1)
+    assert json.loads(spill.read_text())["message"] == "spilled"
+
+    collector = Collector(socket.AF_UNIX, str(short_dir / "c.sock"))
+    wait_for(lambda: handler._writer is not None)
+    log(handler, "sent")
+    wait_for(lambda: collector.data)
+    handler.close()
+    collector.close()
+
+    assert collector.lines() == ["sent"]
+    assert handler.metrics()["spilled"] == 1
+
+
+def test_full_buffer_drops_without_blocking(short_dir):
+    spill = short_dir / "log.jsonl"
+    handler = make_handler(
+        "unix:/nonexistent.sock", spill_file=spill, buffer_size=2, autostart=False
+    )
+
+    log(handler, *"abcde")
+    assert handler.metrics()["dropped"] == 3
+    handler.close()
+
+    assert len(spill.read_text().splitlines()) == 2
+    assert handler.metrics()["spilled"] == 2
+
+
+def test_spill_file_is_rotated(short_dir):
+    """Ensure that spills go through the rotating handler: the file doesn't grow without limit."""
+
+    spill = short_dir / "log.jsonl"
+    handler = make_handler(
+        "unix:/nonexistent.sock", spill_file=spill, spill_max_bytes=300, spill_backup_count=2
+    )
+
+    for i in range(8):
+        log(handler, *(f"batch {i} line {n}" for n in range(5)))
+        wait_for(lambda i=i: handler.spilled == 5 * (i + 1))
+    handler.close()
+
+    assert spill.stat().st_size < 2 * 300  # rotated before a batch, so one batch over at most
+    assert [p.suffix for p in segments(spill)] == [".gz", ".gz"]
+
+
+def test_setup_logging_ships_instead_of_writing_the_file(logging_settings, short_dir):
+    logging_settings.log_ship_address = f"unix:{short_dir / 'missing.sock'}"
+    setup_logging(logging_settings)
+
+    (handler,) = [h for h in logs._listener.handlers if isinstance(h, ShipHandler)]
+    assert not any(isinstance(h, logging.FileHandler) for h in logs._listener.handlers)
+    logging.getLogger("test").info("nobody listening")
+    logs._stop_listener()
+    handler.close()
+
+    log_file = logging_settings.logs_dir / "log_tomatempo.jsonl"
+    assert json.loads(log_file.read_text())["message"] == "nobody listening"
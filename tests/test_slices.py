@@ -0,0 +1,102 @@
+import pytest
+from sqlmodel import select
+
+from tomatempo import db
+from tomatempo.models import Slice
+from tomatempo.rollups import TomatoRules
+from tomatempo.slices import (
+    POOL,
+    insert_slices,
+    query_columns,
+    save_slice,
+    totals_by_task,
+)
+from tomatempo.timer import ClosedSlice, TimerService
+
+SLICES = [
+    ClosedSlice(1, 100, 200),
+    ClosedSlice(None, 200, 260),
+    ClosedSlice(2, 260, 300),
+    ClosedSlice(None, 300, 400, "break"),
+    ClosedSlice(1, 400, 500),
+]
+
+
+@pytest.fixture
+def engine(db_settings):
+    engine = db.get_engine(db_settings)
+    with engine.begin() as conn:
+        insert_slices(conn, SLICES, TomatoRules())
+    return engine
+
+
+def test_query_columns(engine):
+    with engine.connect() as conn:
+        columns = query_columns(conn)
+
+    assert len(columns) == 5
+    assert list(columns.task_id) == [1, POOL, 2, POOL, 1]
+    assert list(columns.start_ts) == [100, 200, 260, 300, 400]
+    assert list(columns.end_ts) == [200, 260, 300, 400, 500]
+    assert list(columns.is_break) == [0, 0, 0, 1, 0]
+
+
+def test_query_columns_range_and_chunks(engine):
+    with engine.connect() as conn:
+        columns = query_columns(conn, start=250, end=450, chunk_size=1)
+
+    # Overlapping slices only, including the ones cut by the range
+    assert list(columns.start_ts) == [200, 260, 300, 400]
+
+
+@pytest.mark.parametrize(("start", "end"), [(None, None), (250, 450), (250, None)])
+def test_query_columns_without_the_sqlite_cursor(engine, monkeypatch, start, end):
+    with engine.connect() as conn:
+        expected = query_columns(conn, start, end)
+        # The path other databases take: SQLAlchemy text() with streaming
+        monkeypatch.setattr(conn.dialect, "name", "postgresql")
+        columns = query_columns(conn, start, end, chunk_size=2)
+
+    assert columns == expected
+
+
+def test_totals_by_task(engine):
+    with engine.connect() as conn:
+        columns = query_columns(conn)
+
+    assert totals_by_task(columns) == {1: 200, None: 60, 2: 40}
+    assert totals_by_task(columns, include_breaks=True) == {1: 200, None: 160, 2: 40}
+
+
+def test_totals_by_task_clips_to_range(engine):
+    with engine.connect() as conn:
+        columns = query_columns(conn, 150, 450)
+
+    assert totals_by_task(columns, 150, 450) == {1: 100, None: 60, 2: 40}
+
+
+def test_totals_match_orm(engine, db_settings):
+    with db.get_session(db_settings) as session:
+        rows = session.exec(select(Slice).where(Slice.type == "work")).all()
+    expected: dict[int | None, int] = {}
+    for row in rows:
+        expected[row.task_id] = expected.get(row.task_id, 0) + row.end_ts - row.start_ts
+
+    with engine.connect() as conn:
+        assert totals_by_task(query_columns(conn)) == expected
+
+
+def test_save_slice_from_timer(db_settings):
+    now = [1000.0]
+    service = TimerService(on_close=lambda s: save_slice(s, db_settings), clock=lambda: now[0])
+    service.focus(7)
+    service.start()
+    now[0] += 90
+    service.focus(None)
+    now[0] += 30
+    service.stop()
+
+    with db.get_engine(db_settings).connect() as conn:
+        columns = query_columns(conn)
+
+    assert totals_by_task(columns) == {7: 90, None: 30}
@@ -0,0 +1,126 @@
+import pytest
+
+from tomatempo.timer import (
+    DEFAULT_DURATION,
+    ClosedSlice,
+    TimerError,
+    TimerService,
+    TimerState,
+    load_state,
+    parse_duration,
+    save_state,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def closed():
+    return []
+
+
+@pytest.fixture
+def service(clock, closed):
+    return TimerService(on_close=closed.append, clock=clock)
+
+
+@pytest.mark.parametrize(
+    ("text", "seconds"),
+    [("25m", 1500), ("90s", 90), ("1h30m", 5400), ("1h", 3600), (" 5M ", 300)],
+)
+def test_parse_duration(text, seconds):
+    assert parse_duration(text) == seconds
+
+
+@pytest.mark.parametrize("text", ["", "25", "m", "1d", "-5m"])
+def test_parse_duration_rejects_invalid(text):
+    with pytest.raises(ValueError, match="invalid duration"):
+        parse_duration(text)
+
+
+def test_start_pause_closes_slice(service, clock, closed):
+    """
+    Ensure that pausing closes the open slice with the exact duration.
+    """
+
+    service.focus(7)
+    service.start()
+    clock.now += 600
+    status = service.pause()
+
+    assert closed == [ClosedSlice(7, 1_700_000_000, 1_700_000_600)]
+    assert status["running"] is False
+    assert status["remaining"] == DEFAULT_DURATION - 600
+
+
+def test_resume_keeps_countdown_and_stop_resets(service, clock):
+    service.start(120)
+    clock.now += 60
+    service.pause()
+    service.start()
+    clock.now += 30
+
+    assert service.status()["remaining"] == 30
+
+    assert service.stop()["remaining"] == DEFAULT_DURATION
+
+
+def test_focus_switch_loses_no_time(service, clock, closed):
+    """
+    Confirm that switching focus closes the previous slice and opens the next
+    one at the same second.
+    """
+
+    service.start()
+    clock.now += 100
+    service.focus(1)
+    clock.now += 50
+    service.focus(2)
+    clock.now += 25
+    service.stop()
+
+    assert closed == [
+        ClosedSlice(None, 1_700_000_000, 1_700_000_100),
+        ClosedSlice(1, 1_700_000_100, 1_700_000_150),
+        ClosedSlice(2, 1_700_000_150, 1_700_000_175),
+    ]
+
+
+def test_invalid_transitions_raise(service):
+    with pytest.raises(TimerError, match="not running"):
+        service.pause()
+
+    service.start()
+    with pytest.raises(TimerError, match="already running"):
+        service.start()
+
+
+def test_call_dispatches_commands(service):
+    assert service.call("focus.set", {"task_id": 3})["task_id"] == 3
+    assert service.call("timer.start", {})["running"] is True
+
+    with pytest.raises(TimerError, match="unknown command"):
+        service.call("timer.rewind", {})
+
+
+def test_state_round_trip(tmp_path):
+    path = tmp_path / "state" / "state.json"
+    state = TimerState(running=True, task_id=4, slice_start=10, duration=300, elapsed=20)
+
+    assert load_state(path) == TimerState()
+
+    save_state(path, state)
+
+    assert load_state(path) == state
+    assert not path.with_suffix(".tmp").exists()
@@ -0,0 +1,190 @@
+import io
+
+from typer.testing import CliRunner
+
+from tomatempo import db
+from tomatempo.cli import app
+from tomatempo.events import EventFeed
+from tomatempo.rollups import TomatoRules
+from tomatempo.slices import insert_slices
+from tomatempo.timer import ClosedSlice, TimerState, save_state
+from tomatempo.watch import (
+    CLEAR_SCREEN,
+    LineRenderer,
+    Notified,
+    ProgressDashboard,
+    Ticker,
+    TimerDashboard,
+    watch,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+def test_renderer_repaints_changed_lines_only():
+    stream = io.StringIO()
+    renderer = LineRenderer(stream)
+
+    renderer.render(["a", "b", "c"])
+    assert CLEAR_SCREEN in stream.getvalue()
+
+    assert renderer.render(["a", "b", "c"]) == 0
+
+    stream.seek(0)
+    stream.truncate()
+    renderer.render(["a", "B", "c"])
+    assert stream.getvalue() == "\x1b[2;1HB\x1b[K"
+
+    stream.seek(0)
+    stream.truncate()
+    renderer.render(["a"])
+    assert stream.getvalue() == "\x1b[2;1H\x1b[K\x1b[3;1H\x1b[K"
+
+
+def test_ticker_does_not_drift():
+    clock = FakeClock()
+    ticker = Ticker(1.0, clock=clock, sleep=clock.sleep)
+
+    clock.now += 0.25  # work done during the tick
+    ticker.wait()
+    clock.now += 0.5
+    ticker.wait()
+
+    assert clock.sleeps == [0.75, 0.5]
+    assert clock.now == 102.0
+
+
+def test_ticker_skips_missed_ticks():
+    clock = FakeClock()
+    ticker = Ticker(1.0, clock=clock, sleep=clock.sleep)
+
+    clock.now += 3.5
+    ticker.wait()
+
+    assert clock.sleeps == [0.5]
+    assert ticker.ticks == 4
+
+
+class CountingDashboard:
+    def __init__(self, changes):
+        self.changes = iter(changes)
+        self.refreshes = 0
+
+    def changed(self):
+        return next(self.changes)
+
+    def refresh(self):
+        self.refreshes += 1
+
+    def lines(self, now):
+        return [f"refreshes {self.refreshes}"]
+
+
+def test_watch_refreshes_only_on_change():
+    clock = FakeClock()
+    dashboard = CountingDashboard([True, False, False, True, False])
+    stream = io.StringIO()
+
+    watch(dashboard, LineRenderer(stream), Ticker(1.0, clock, clock.sleep), clock, max_ticks=5)
+
+    assert dashboard.refreshes == 2
+    assert len(clock.sleeps) == 4
+    assert stream.getvalue().endswith("\x1b[?25h")
+
+
+def test_notified_checks_dashboard_only_after_events(tmp_path):
+    feed = EventFeed(tmp_path)
+    inner = CountingDashboard([True, True])
+    dashboard = Notified(inner, feed.counter())
+
+    assert dashboard.changed()
+    assert not dashboard.changed()
+    feed.publish("timer.start")
+    assert dashboard.changed()
+    assert not dashboard.changed()
+
+
+def test_timer_dashboard(tmp_path):
+    state_file = tmp_path / "state.json"
+    dashboard = TimerDashboard(state_file)
+
+    assert dashboard.changed()
+    dashboard.refresh()
+    assert not dashboard.changed()
+
+    save_state(state_file, TimerState(running=True, task_id=3, slice_start=1000, duration=1500))
+    assert dashboard.changed()
+    dashboard.refresh()
+
+    assert dashboard.lines(1090) == [
+        "Timer    running",
+        "Focus    task 3",
+        "Elapsed  01:30",
+        "Left     23:30",
+    ]
+
+
+def test_progress_dashboard_skips_query_until_commit(db_settings):
+    writer = db.build_engine(db_settings.database_url, db_settings.sqlite)
+    db.create_schema(writer)
+
+    with db.get_engine(db_settings, read_only=True).connect() as conn:
+        dashboard = ProgressDashboard(conn)
+        assert dashboard.changed()
+        dashboard.refresh()
+        assert dashboard.lines(0) == ["No time recorded yet."]
+        assert not dashboard.changed()
+
+        with writer.begin() as w:
+            insert_slices(
+                w, [ClosedSlice(4, 0, 1800), ClosedSlice(None, 1800, 1900)], TomatoRules()
+            )
+
+        assert dashboard.changed()
+        dashboard.refresh()
+        assert not dashboard.changed()
+        assert dashboard.lines(0)[1:] == [
+            f"{'task 4':<28} {'30:00':>9} {1:>8}",
+            f"{'Time Pool':<28} {'01:40':>9} {0:>8}",
+        ]
+    writer.dispose()
+
+
+def test_view_timer_command(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+
+    result = CliRunner().invoke(app, ["view", "timer"])
+
+    assert result.exit_code == 0, result.output
+    assert "Timer    stopped" in result.output
+
+
+def test_view_progress_command(clean_settings, monkeypatch, tmp_path):
+    clean_settings(monkeypatch, tmp_path)
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+
+    result = runner.invoke(app, ["view", "progress"])
+    assert result.exit_code == 0, result.output
+    assert result.output == "No time recorded yet.\n"
+    assert not db.database_exists()
+    assert list(tmp_path.glob("*.db")) == []
+
+    with db.get_engine().begin() as conn:
+        insert_slices(conn, [ClosedSlice(2, 0, 600)], TomatoRules())
+    result = runner.invoke(app, ["view", "progress"])
+    db.dispose_engines()
+
+    assert result.exit_code == 0, result.output
+    assert "task 2" in result.output